@@ -0,0 +1,97 @@
+// Copyright (c) 2022. Geoff Twardokus
+// Reuse permitted under the MIT License as specified in the LICENSE file within this project.
+
+/*
+ * Compares frames received per second by the receiver's old DSRC frame handling (recvfrom into a 361-byte buffer,
+ * then a byte-by-byte copy and a memcpy into the SPDU) against receive_frame(), which scatters the header and SPDU
+ * into place. Frames are sent over a local datagram socket pair by a second thread; every Nth frame is cut short or
+ * padded to exercise the length checks.
+ *
+ * Usage: frame_benchmark [frames] [spdu length] [every Nth frame malformed, 0 for none]
+ */
+
+#include <sys/socket.h>
+#include <unistd.h>
+#include <chrono>
+#include <cstring>
+#include <iostream>
+#include <string>
+#include <thread>
+#include <vector>
+#include "DsrcFrame.h"
+
+
+// sends `frames` frames, making every `malformed_every`th one a byte short or a byte long
+void send_frames(int sockfd, int frames, size_t spdu_length, int malformed_every) {
+    std::vector<uint8_t> frame(DSRC_HEADER_LENGTH + spdu_length + 1, 0xab);
+    for(int i = 0; i < frames; i++) {
+        size_t length = DSRC_HEADER_LENGTH + spdu_length;
+        if(malformed_every > 0 && i % malformed_every == malformed_every - 1)
+            length += (i / malformed_every) % 2 == 0 ? -1 : 1;
+        if(send(sockfd, frame.data(), length, 0) < 0) {
+            perror("send failed");
+            exit(EXIT_FAILURE);
+        }
+    }
+}
+
+int main(int argc, char *argv[]) {
+
+    int num_frames = argc > 1 ? std::stoi(argv[1]) : 1000000;
+    size_t spdu_length = argc > 2 ? std::stoul(argv[2]) : 304;
+    int malformed_every = argc > 3 ? std::stoi(argv[3]) : 100;
+
+    using clock = std::chrono::steady_clock;
+    std::vector<uint8_t> spdu(spdu_length);
+
+    for(int method = 0; method < 2; method++) {
+        int sockets[2];
+        if(socketpair(AF_UNIX, SOCK_DGRAM, 0, sockets) < 0) {
+            perror("socketpair failed");
+            exit(EXIT_FAILURE);
+        }
+
+        auto start = clock::now();
+        std::thread sender(send_frames, sockets[0], num_frames, spdu_length, malformed_every);
+
+        unsigned long accepted = 0, rejected = 0;
+        if(method == 0) {
+            // as Vehicle::receive did before receive_frame()
+            std::vector<uint8_t> buffer(DSRC_HEADER_LENGTH + spdu_length);
+            std::vector<uint8_t> spdu_buffer(spdu_length);
+            for(int i = 0; i < num_frames; i++) {
+                if(recvfrom(sockets[1], buffer.data(), buffer.size(), 0, nullptr, nullptr) < 0) {
+                    perror("recvfrom failed");
+                    exit(EXIT_FAILURE);
+                }
+                for(int b = (int) buffer.size() - 1, j = (int) spdu_length - 1; b > DSRC_HEADER_LENGTH; b--, j--) {
+                    spdu_buffer[j] = buffer[b];
+                }
+                memcpy(spdu.data(), spdu_buffer.data(), spdu_length);
+                accepted++;
+            }
+        }
+        else {
+            uint8_t header[DSRC_HEADER_LENGTH];
+            for(int i = 0; i < num_frames; i++) {
+                frame_status status = receive_frame(sockets[1], header, sizeof(header), spdu.data(), spdu_length);
+                if(status == FRAME_ERROR) {
+                    perror("recvmsg failed");
+                    exit(EXIT_FAILURE);
+                }
+                status == FRAME_OK ? accepted++ : rejected++;
+            }
+        }
+
+        sender.join();
+        std::chrono::duration<double> elapsed = clock::now() - start;
+        close(sockets[0]);
+        close(sockets[1]);
+
+        std::cout << (method == 0 ? "recvfrom + copies: " : "receive_frame:     ")
+                  << (long) (num_frames / elapsed.count()) << " frames/sec (" << accepted << " accepted, "
+                  << rejected << " rejected)" << std::endl;
+    }
+
+    return 0;
+}
@@ -0,0 +1,69 @@
+// Copyright (c) 2022. Geoff Twardokus
+// Reuse permitted under the MIT License as specified in the LICENSE file within this project.
+
+/*
+ * Measures how many SPDUs per second the transmitter can build and sign, first on the calling thread (as the
+ * transmitter does without a signing pool) and then with SigningPool for 1, 2, 4, ... up to the given number of
+ * workers. Like v2verifier, it loads keys and traces from ../keys, ../cert_keys and ../trace_files, so run it from
+ * the build directory.
+ *
+ * Usage: sign_benchmark [vehicles] [messages] [max workers] [timesteps]
+ */
+
+#include <chrono>
+#include <future>
+#include <iostream>
+#include <string>
+#include <thread>
+#include <vector>
+#include "SigningPool.h"
+#include "Vehicle.h"
+
+
+int main(int argc, char *argv[]) {
+
+    int num_vehicles = argc > 1 ? std::stoi(argv[1]) : 1;
+    int num_messages = argc > 2 ? std::stoi(argv[2]) : 20000;
+    int max_workers = argc > 3 ? std::stoi(argv[3]) : (int) std::max(std::thread::hardware_concurrency(), 1u);
+    int num_timesteps = argc > 4 ? std::stoi(argv[4]) : 100;   // must not exceed the length of the traces
+
+    std::vector<Vehicle> vehicles;
+    for(int i = 0; i < num_vehicles; i++) {
+        vehicles.emplace_back(Vehicle(i));
+    }
+
+    using clock = std::chrono::steady_clock;
+    auto generated_time = std::chrono::time_point_cast<std::chrono::microseconds>(std::chrono::system_clock::now());
+
+    std::cout << num_messages << " SPDUs from " << num_vehicles << " vehicles" << std::endl;
+
+    auto start = clock::now();
+    for(int i = 0; i < num_messages; i++) {
+        vehicles[i % num_vehicles].prepare_spdu((i / num_vehicles) % num_timesteps, generated_time);
+    }
+    std::chrono::duration<double> inline_time = clock::now() - start;
+    double inline_rate = num_messages / inline_time.count();
+    std::cout << "inline:      " << (long) inline_rate << " msgs/sec" << std::endl;
+
+    for(int workers = 1; workers <= max_workers; workers *= 2) {
+        SigningPool pool(workers, num_messages);
+        std::vector<std::future<BatchSender::frame>> spdus;
+        spdus.reserve(num_messages);
+
+        start = clock::now();
+        for(int i = 0; i < num_messages; i++) {
+            spdus.push_back(pool.prepare(vehicles[i % num_vehicles], (i / num_vehicles) % num_timesteps,
+                                         generated_time));
+        }
+        for(auto &spdu : spdus) {
+            spdu.get();
+        }
+        std::chrono::duration<double> pool_time = clock::now() - start;
+
+        double rate = num_messages / pool_time.count();
+        std::cout << workers << " workers:" << std::string(workers < 10 ? 3 : 2, ' ') << (long) rate
+                  << " msgs/sec (" << rate / inline_rate << "x inline)" << std::endl;
+    }
+
+    return 0;
+}
@@ -0,0 +1,99 @@
+// Copyright (c) 2022. Geoff Twardokus
+// Reuse permitted under the MIT License as specified in the LICENSE file within this project.
+
+/*
+ * Compares verifies per second of the per-message ecdsa_verify() against BatchVerifier on a synthetic workload of
+ * many signatures from a small set of signers, optionally with every signature replayed several times.
+ *
+ * Usage: verify_benchmark [signers] [signatures] [replays] [batch size]
+ */
+
+#include <chrono>
+#include <iostream>
+#include <string>
+#include <vector>
+#include <openssl/ec.h>
+#include <openssl/obj_mac.h>
+#include <openssl/rand.h>
+#include "BatchVerifier.h"
+#include "v2vcrypto.h"
+
+
+struct signed_hash {
+    unsigned char hash[SHA256_DIGEST_LENGTH];
+    unsigned char signature[72];
+    unsigned int signature_length;
+    EC_KEY *key;
+};
+
+int main(int argc, char *argv[]) {
+
+    int num_signers = argc > 1 ? std::stoi(argv[1]) : 4;
+    int num_signatures = argc > 2 ? std::stoi(argv[2]) : 4000;
+    int replays = argc > 3 ? std::stoi(argv[3]) : 1;
+    int batch_size = argc > 4 ? std::stoi(argv[4]) : 64;
+
+    std::vector<EC_KEY *> keys;
+    for(int i = 0; i < num_signers; i++) {
+        EC_KEY *key = EC_KEY_new_by_curve_name(NID_X9_62_prime256v1);
+        if(key == nullptr || !EC_KEY_generate_key(key)) {
+            perror("Error generating key");
+            exit(EXIT_FAILURE);
+        }
+        keys.push_back(key);
+    }
+
+    // every replay of a signature is verified again, as a receiver would for a replayed trace
+    std::vector<signed_hash> workload;
+    for(int i = 0; i < num_signatures; i++) {
+        signed_hash item;
+        RAND_bytes(item.hash, sizeof(item.hash));
+        item.key = keys[i % num_signers];
+        ecdsa_sign(item.hash, item.key, &item.signature_length, item.signature);
+        for(int r = 0; r < replays; r++) {
+            workload.push_back(item);
+        }
+    }
+    // corrupt one signature so both paths have a failure to find
+    workload.back().hash[0] ^= 1;
+
+    using clock = std::chrono::steady_clock;
+
+    auto start = clock::now();
+    std::vector<bool> individual_results;
+    for(auto &item : workload) {
+        individual_results.push_back(ecdsa_verify(item.hash, item.signature, &item.signature_length, item.key) == 1);
+    }
+    std::chrono::duration<double> individual_time = clock::now() - start;
+
+    BatchVerifier verifier;
+    start = clock::now();
+    std::vector<bool> batch_results;
+    for(size_t i = 0; i < workload.size(); i++) {
+        verifier.add(workload[i].hash, workload[i].signature, workload[i].signature_length, workload[i].key);
+        if(verifier.size() == (size_t) batch_size || i + 1 == workload.size()) {
+            std::vector<bool> results = verifier.verify();
+            batch_results.insert(batch_results.end(), results.begin(), results.end());
+        }
+    }
+    std::chrono::duration<double> batch_time = clock::now() - start;
+
+    std::cout << workload.size() << " signatures from " << num_signers << " signers (" << replays
+              << " copies of each), batches of " << batch_size << std::endl;
+    std::cout << "ecdsa_verify:  " << (long) (workload.size() / individual_time.count()) << " verifies/sec" << std::endl;
+    std::cout << "BatchVerifier: " << (long) (workload.size() / batch_time.count()) << " verifies/sec ("
+              << verifier.get_duplicates() << " duplicates skipped, " << verifier.get_fallbacks()
+              << " individual fallbacks)" << std::endl;
+    std::cout << "speedup: " << individual_time.count() / batch_time.count() << "x" << std::endl;
+
+    for(EC_KEY *key : keys) {
+        EC_KEY_free(key);
+    }
+
+    if(batch_results != individual_results) {
+        std::cout << "Error: batched and individual results differ" << std::endl;
+        exit(EXIT_FAILURE);
+    }
+
+    return 0;
+}
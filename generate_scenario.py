@@ -0,0 +1,333 @@
+#  Copyright (c) 2022. Geoff Twardokus
+#  Reuse permitted under the MIT License as specified in the LICENSE file within this project.
+
+"""Synthetic scenario generator for scale tests
+
+Generates reproducible trajectories for any number of vehicles driving on a square grid of two-way roads. Every
+road has the same number of lanes in each direction; vehicles keep their lane, drive at a constant speed drawn from a
+configurable distribution, and pick a new direction at every intersection (straight on, left or right, turning back
+only at the edge of the grid). All vehicles are advanced together, one NumPy step per row, so thousands of vehicles
+take seconds to generate.
+
+Traces are written to trace_files/ as compiled binary traces (see trace_tool.py) or as CSV, and the matching
+"scenario" block is printed or written into config.json:
+
+    python3 generate_scenario.py --vehicles 2000 --duration 60 --config config.json
+
+Binary traces take precedence over the shipped CSV traces; delete trace_files/*.bin to go back to them. Vehicles
+need keys (keys/<id>/ and cert_keys/<id>/) to transmit.
+"""
+
+import argparse
+import json
+import os
+
+import numpy as np
+
+import trace_tool
+
+# travel directions: east, north, west, south
+DIRECTION_X = np.array([1, 0, -1, 0])
+DIRECTION_Y = np.array([0, 1, 0, -1])
+
+# changes of direction index tried at an intersection, in order of preference after the random choice
+STRAIGHT, LEFT, BACK, RIGHT = 0, 1, 2, 3
+
+
+def draw_speeds(rng: np.random.Generator, count: int, distribution: str, mean: float, spread: float,
+                minimum: float = 5.0, maximum: float = 130.0) -> np.ndarray:
+    """Draw every vehicle's speed
+
+    :param rng: the random number generator
+    :type rng: np.random.Generator
+    :param count: the number of vehicles
+    :type count: int
+    :param distribution: "constant", "uniform" (mean +/- spread), "normal" (standard deviation spread) or
+        "lognormal" (median mean, spread as the standard deviation of the underlying normal distribution)
+    :type distribution: str
+    :param mean: the mean (median for "lognormal") speed in km/h
+    :type mean: float
+    :param spread: the distribution's spread
+    :type spread: float
+    :param minimum: the lowest speed in km/h, defaults to 5.0
+    :type minimum: float
+    :param maximum: the highest speed in km/h, defaults to 130.0
+    :type maximum: float
+    :return: speeds in km/h
+    :rtype: np.ndarray
+    """
+    if distribution == "constant":
+        speeds = np.full(count, mean, dtype=np.float64)
+    elif distribution == "uniform":
+        speeds = rng.uniform(mean - spread, mean + spread, count)
+    elif distribution == "normal":
+        speeds = rng.normal(mean, spread, count)
+    elif distribution == "lognormal":
+        speeds = mean * rng.lognormal(0.0, spread, count)
+    else:
+        raise ValueError(f"unknown speed distribution {distribution!r}")
+    return np.clip(speeds, minimum, maximum)
+
+
+def generate_trajectories(vehicles: int, rows: int, interval_ms: float = 100, grid: int = 5,
+                          block_length: float = 200.0, lanes: int = 2, lane_width: float = 3.5,
+                          speeds: np.ndarray = None, turn_probability: float = 0.4, seed: int = 0) -> np.ndarray:
+    """Simulate vehicles driving on a grid of roads
+
+    :param vehicles: the number of vehicles
+    :type vehicles: int
+    :param rows: the number of positions per vehicle
+    :type rows: int
+    :param interval_ms: milliseconds between positions, defaults to 100
+    :type interval_ms: float
+    :param grid: the number of roads in each direction, defaults to 5
+    :type grid: int
+    :param block_length: meters between intersections, defaults to 200.0
+    :type block_length: float
+    :param lanes: lanes per direction on every road, defaults to 2
+    :type lanes: int
+    :param lane_width: lane width in meters, defaults to 3.5
+    :type lane_width: float
+    :param speeds: every vehicle's speed in km/h, defaults to 50 km/h for all
+    :type speeds: np.ndarray
+    :param turn_probability: the chance of turning (left or right, equally likely) at an intersection, defaults to 0.4
+    :type turn_probability: float
+    :param seed: the random seed, defaults to 0
+    :type seed: int
+    :return: positions as a (vehicles, rows, 2) float32 array of x and y in meters
+    :rtype: np.ndarray
+    """
+    if grid < 2:
+        raise ValueError("the grid needs at least two roads in each direction")
+
+    rng = np.random.default_rng(seed)
+    if speeds is None:
+        speeds = np.full(vehicles, 50.0)
+    step = np.asarray(speeds, dtype=np.float64) / 3.6 * interval_ms / 1000   # meters per row
+
+    # lanes are on the right-hand side of the road, counted from the center line
+    lane_offset = (rng.integers(0, lanes, vehicles) + 0.5) * lane_width
+
+    # every vehicle drives toward a target intersection (node), where it will leave in next_direction; gap is the
+    # distance left to the point where its lane meets the lane it turns into
+    direction = rng.integers(0, 4, vehicles)
+    node_x = rng.integers(0, grid, vehicles)
+    node_y = rng.integers(0, grid, vehicles)
+    outside = ~within_grid(node_x + DIRECTION_X[direction], node_y + DIRECTION_Y[direction], grid)
+    direction[outside] = (direction[outside] + BACK) % 4
+    node_x += DIRECTION_X[direction]
+    node_y += DIRECTION_Y[direction]
+    next_direction = choose_directions(rng, node_x, node_y, direction, grid, turn_probability)
+    gap = rng.uniform(0, block_length, vehicles)
+
+    positions = np.empty((vehicles, rows, 2), dtype=np.float32)
+    for row in range(rows):
+        corner_x, corner_y = turn_corner(node_x, node_y, direction, next_direction, lane_offset, block_length)
+        positions[:, row, 0] = corner_x - DIRECTION_X[direction] * gap
+        positions[:, row, 1] = corner_y - DIRECTION_Y[direction] * gap
+
+        remaining = step.copy()
+        arriving = remaining >= gap
+        while arriving.any():
+            previous = direction[arriving]
+            current = direction[arriving] = next_direction[arriving]
+            node_x[arriving] += DIRECTION_X[current]
+            node_y[arriving] += DIRECTION_Y[current]
+            upcoming = next_direction[arriving] = choose_directions(rng, node_x[arriving], node_y[arriving], current,
+                                                                    grid, turn_probability)
+
+            # the next corner is a block further on, moved along the road by the lane offsets of both turns
+            offset = lane_offset[arriving]
+            next_gap = (block_length + perpendicular(current, upcoming) * right_dot(upcoming, current) * offset
+                        - right_dot(previous, current) * offset)
+
+            remaining[arriving] -= gap[arriving]
+            gap[arriving] = next_gap
+            arriving = remaining >= gap
+        gap -= remaining
+
+    return positions
+
+
+def right_dot(lane_direction: np.ndarray, direction: np.ndarray) -> np.ndarray:
+    """Component along direction of the unit vector pointing to the right of lane_direction
+
+    :param lane_direction: direction indices whose right-hand side is taken
+    :type lane_direction: np.ndarray
+    :param direction: direction indices to project onto
+    :type direction: np.ndarray
+    :return: -1, 0 or 1 for every pair
+    :rtype: np.ndarray
+    """
+    return DIRECTION_Y[lane_direction] * DIRECTION_X[direction] - DIRECTION_X[lane_direction] * DIRECTION_Y[direction]
+
+
+def perpendicular(direction: np.ndarray, other: np.ndarray) -> np.ndarray:
+    """Check which pairs of directions are at right angles (turns rather than going straight or turning back)
+
+    :param direction: direction indices
+    :type direction: np.ndarray
+    :param other: direction indices
+    :type other: np.ndarray
+    :return: 1 for perpendicular pairs, 0 otherwise
+    :rtype: np.ndarray
+    """
+    return (direction - other) % 2
+
+
+def turn_corner(node_x: np.ndarray, node_y: np.ndarray, direction: np.ndarray, next_direction: np.ndarray,
+                lane_offset: np.ndarray, block_length: float) -> tuple:
+    """Where a vehicle's lane meets the lane it leaves an intersection in
+
+    :param node_x: the intersections' column indices
+    :type node_x: np.ndarray
+    :param node_y: the intersections' row indices
+    :type node_y: np.ndarray
+    :param direction: the directions the vehicles arrive in
+    :type direction: np.ndarray
+    :param next_direction: the directions the vehicles leave in
+    :type next_direction: np.ndarray
+    :param lane_offset: the vehicles' distance from the center line
+    :type lane_offset: np.ndarray
+    :param block_length: meters between intersections
+    :type block_length: float
+    :return: the x and y coordinates of the corners
+    :rtype: tuple
+    """
+    turning = perpendicular(direction, next_direction) * lane_offset
+    corner_x = node_x * block_length + DIRECTION_Y[direction] * lane_offset + DIRECTION_Y[next_direction] * turning
+    corner_y = node_y * block_length - DIRECTION_X[direction] * lane_offset - DIRECTION_X[next_direction] * turning
+    return corner_x, corner_y
+
+
+def within_grid(node_x: np.ndarray, node_y: np.ndarray, grid: int) -> np.ndarray:
+    """Check which nodes are intersections of the grid
+
+    :param node_x: node column indices
+    :type node_x: np.ndarray
+    :param node_y: node row indices
+    :type node_y: np.ndarray
+    :param grid: the number of roads in each direction
+    :type grid: int
+    :return: a boolean array, True for nodes on the grid
+    :rtype: np.ndarray
+    """
+    return (node_x >= 0) & (node_x < grid) & (node_y >= 0) & (node_y < grid)
+
+
+def choose_directions(rng: np.random.Generator, node_x: np.ndarray, node_y: np.ndarray, direction: np.ndarray,
+                      grid: int, turn_probability: float) -> np.ndarray:
+    """Pick the direction every arriving vehicle leaves its intersection in
+
+    :param rng: the random number generator
+    :type rng: np.random.Generator
+    :param node_x: the intersections' column indices
+    :type node_x: np.ndarray
+    :param node_y: the intersections' row indices
+    :type node_y: np.ndarray
+    :param direction: the directions the vehicles arrived in
+    :type direction: np.ndarray
+    :param grid: the number of roads in each direction
+    :type grid: int
+    :param turn_probability: the chance of turning left or right
+    :type turn_probability: float
+    :return: the new directions
+    :rtype: np.ndarray
+    """
+    turn = rng.choice([STRAIGHT, LEFT, RIGHT], size=len(direction),
+                      p=[1 - turn_probability, turn_probability / 2, turn_probability / 2])
+    chosen = (direction + turn) % 4
+
+    # at the edge of the grid, fall back to the other ways out of the intersection, turning back last
+    for fallback in (STRAIGHT, LEFT, RIGHT, BACK):
+        blocked = ~within_grid(node_x + DIRECTION_X[chosen], node_y + DIRECTION_Y[chosen], grid)
+        if not blocked.any():
+            break
+        chosen[blocked] = (direction[blocked] + fallback) % 4
+    return chosen
+
+
+def write_traces(directory: str, positions: np.ndarray, interval_ms: float, trace_format: str = "binary") -> list:
+    """Write one trace per vehicle, named by vehicle ID
+
+    :param directory: the trace directory
+    :type directory: str
+    :param positions: a (vehicles, rows, 2) array of positions
+    :type positions: np.ndarray
+    :param interval_ms: milliseconds between rows
+    :type interval_ms: float
+    :param trace_format: "binary" (compiled traces) or "csv", defaults to "binary"
+    :type trace_format: str
+    :return: the paths written
+    :rtype: list
+    """
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+    for vehicle_id, vehicle_positions in enumerate(positions):
+        trace = np.column_stack((vehicle_positions, np.zeros(len(vehicle_positions), dtype=np.float32)))
+        compiled, flags = trace_tool.compile_trace(trace, time_msec=interval_ms)
+
+        if trace_format == "csv":
+            path = os.path.join(directory, f"{vehicle_id}.csv")
+            np.savetxt(path, compiled, fmt="%.9g", delimiter=",")
+        else:
+            path = os.path.join(directory, f"{vehicle_id}.bin")
+            trace_tool.write_binary(path, vehicle_id, compiled, flags)
+        paths.append(path)
+    return paths
+
+
+def scenario_block(vehicles: int, rows: int, interval_ms: float) -> dict:
+    """The config.json "scenario" block that replays the generated traces
+
+    :param vehicles: the number of vehicles
+    :type vehicles: int
+    :param rows: the number of positions per vehicle
+    :type rows: int
+    :param interval_ms: milliseconds between positions
+    :type interval_ms: float
+    :return: the block
+    :rtype: dict
+    """
+    return {"numVehicles": vehicles, "numMessages": rows, "updateIntervalMs": int(round(interval_ms))}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate synthetic trajectories for scale tests")
+    parser.add_argument("--vehicles", type=int, default=1000, help="number of vehicles")
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds of driving per vehicle")
+    parser.add_argument("--interval-ms", type=float, default=100, help="milliseconds between positions (BSMs)")
+    parser.add_argument("--grid", type=int, default=5, help="number of roads in each direction")
+    parser.add_argument("--block-length", type=float, default=200.0, help="meters between intersections")
+    parser.add_argument("--lanes", type=int, default=2, help="lanes per direction")
+    parser.add_argument("--lane-width", type=float, default=3.5, help="lane width in meters")
+    parser.add_argument("--speed-distribution", choices=("constant", "uniform", "normal", "lognormal"),
+                        default="normal", help="distribution of vehicle speeds")
+    parser.add_argument("--speed-mean", type=float, default=50.0, help="mean (median for lognormal) speed in km/h")
+    parser.add_argument("--speed-spread", type=float, default=10.0, help="spread of the speed distribution")
+    parser.add_argument("--turn-probability", type=float, default=0.4, help="chance of turning at an intersection")
+    parser.add_argument("--seed", type=int, default=0, help="random seed")
+    parser.add_argument("--format", choices=("binary", "csv"), default="binary", help="trace format")
+    parser.add_argument("--output", default="trace_files", help="trace directory")
+    parser.add_argument("--config", help="config file to write the scenario block into (printed otherwise)")
+    args = parser.parse_args()
+
+    rows = int(args.duration * 1000 / args.interval_ms)
+    speeds = draw_speeds(np.random.default_rng(args.seed + 1), args.vehicles, args.speed_distribution,
+                         args.speed_mean, args.speed_spread)
+    positions = generate_trajectories(args.vehicles, rows, args.interval_ms, args.grid, args.block_length, args.lanes,
+                                      args.lane_width, speeds, args.turn_probability, args.seed)
+    paths = write_traces(args.output, positions, args.interval_ms, args.format)
+    print(f"wrote {len(paths)} traces of {rows} rows to {args.output}")
+
+    block = scenario_block(args.vehicles, rows, args.interval_ms)
+    if args.config is not None:
+        with open(args.config) as config_file:
+            config = json.load(config_file)
+        config["scenario"] = block
+        with open(args.config, "w") as config_file:
+            json.dump(config, config_file, indent=2)
+            config_file.write("\n")
+        print(f"updated the scenario in {args.config}")
+    else:
+        print(json.dumps({"scenario": block}, indent=2))
@@ -0,0 +1,53 @@
+#  Copyright (c) 2022. Geoff Twardokus
+#  Reuse permitted under the MIT License as specified in the LICENSE file within this project.
+
+import argparse
+import asyncio
+import datetime
+
+import numpy as np
+
+from python_guis import capture
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Record V2Verifier GUI output or replay a recording to a GUI")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    record = commands.add_parser("record", help="record the records forwarded to the GUI")
+    record.add_argument("path", help="capture file (appended to if it exists)")
+    record.add_argument("--ports", type=int, nargs="+", default=[9999], help="UDP ports to listen on")
+    record.add_argument("--duration", type=float, default=None, help="stop after this many seconds")
+
+    replay = commands.add_parser("replay", help="send a capture to a GUI")
+    replay.add_argument("path", help="capture file")
+    replay.add_argument("--port", type=int, default=9999, help="UDP port of the GUI")
+    replay.add_argument("--speed", type=float, default=1.0, help="playback speed, 0 for as fast as possible")
+    replay.add_argument("--records-per-datagram", type=int, default=1, help="records sent in one datagram")
+
+    info = commands.add_parser("info", help="describe a capture")
+    info.add_argument("path", help="capture file")
+
+    args = parser.parse_args()
+
+    if args.command == "record":
+        recorder = capture.CaptureRecorder(args.path, ports=args.ports)
+        try:
+            asyncio.run(recorder.run(args.duration))
+        except KeyboardInterrupt:
+            pass
+        print(f"Recorded {recorder.recorded} records to {args.path}")
+
+    elif args.command == "replay":
+        replayer = capture.CaptureReplayer(args.path, port=args.port,
+                                           records_per_datagram=args.records_per_datagram)
+        replayer.replay(speed=args.speed)
+        print(f"Replayed {replayer.sent} records, at most {replayer.max_lag * 1000:.3f} ms behind schedule")
+
+    elif args.command == "info":
+        record_version, created = capture.read_header(args.path)
+        entries = capture.load(args.path)
+        print(f"{args.path}: GUI record version {record_version}, created "
+              f"{datetime.datetime.fromtimestamp(created / 1e9)}, {len(entries)} records")
+        if len(entries):
+            span = (int(entries["timestamp_ns"][-1]) - int(entries["timestamp_ns"][0])) / 1e9
+            print(f"spans {span:.3f} s, {len(np.unique(entries['record']['vehicle_id']))} vehicles")
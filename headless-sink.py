@@ -0,0 +1,23 @@
+#  Copyright (c) 2022. Geoff Twardokus
+#  Reuse permitted under the MIT License as specified in the LICENSE file within this project.
+
+import argparse
+import asyncio
+
+from python_guis.sink import HeadlessSink
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Summarize V2Verifier GUI output without a GUI")
+    parser.add_argument("--ports", type=int, nargs="+", default=[9999], help="UDP ports to listen on")
+    parser.add_argument("--interval", type=float, default=1.0, help="seconds between snapshots")
+    parser.add_argument("--duration", type=float, default=None, help="stop after this many seconds")
+    parser.add_argument("--export", default=None, help="append snapshots to this JSON-lines file")
+    parser.add_argument("--per-vehicle", action="store_true", help="print statistics for every vehicle")
+    args = parser.parse_args()
+
+    sink = HeadlessSink(ports=args.ports, interval=args.interval, export_path=args.export,
+                        per_vehicle=args.per_vehicle)
+    try:
+        asyncio.run(sink.run(args.duration))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,69 @@
+// Copyright (c) 2022. Geoff Twardokus
+// Reuse permitted under the MIT License as specified in the LICENSE file within this project.
+
+#ifndef V2VERIFIER_BATCHSENDER_H
+#define V2VERIFIER_BATCHSENDER_H
+
+#include <netinet/in.h>
+#include <array>
+#include <atomic>
+#include <memory>
+#include <string>
+#include <thread>
+#include <vector>
+
+#include "BlockingQueue.h"
+
+#define BATCH_SENDER_SIZE_BUCKETS 11     // batch sizes 1, 2-3, 4-7, ..., 512-1023, 1024 and more
+
+/*
+ * Batched egress for transmitting vehicles. Vehicles hand their signed SPDUs to one of a few sender threads (one per
+ * core by default, chosen by vehicle number) instead of calling sendto themselves. Every sender takes whatever has
+ * queued up, up to batch_size frames, and sends it with a single sendmmsg call, so a busy sender makes one system call
+ * per batch while a lone frame still goes out at once. All senders share one socket per destination port.
+ *
+ * The number of frames, sendmmsg calls, send errors and a histogram of batch sizes are counted for summary().
+ */
+class BatchSender {
+
+public:
+    using frame = std::vector<unsigned char>;
+
+    BatchSender(const struct sockaddr_in &destination, int senders, int batch_size, int queue_capacity);
+    ~BatchSender();
+
+    BatchSender(const BatchSender&) = delete;
+    BatchSender& operator=(const BatchSender&) = delete;
+
+    // queues one frame on the sender of `vehicle`; blocks while that sender's queue is full
+    bool send(int vehicle, frame data);
+
+    // sends everything still queued and stops the sender threads
+    void close();
+
+    std::string summary() const;
+
+private:
+    struct sender {
+        explicit sender(size_t capacity) : queue(capacity) {}
+        BlockingQueue<frame> queue;
+        std::thread thread;
+    };
+
+    struct sockaddr_in destination;
+    int sockfd;
+    size_t batch_size;
+    std::vector<std::unique_ptr<sender>> senders;
+
+    std::atomic<unsigned long> frames_sent{0};
+    std::atomic<unsigned long> send_calls{0};
+    std::atomic<unsigned long> send_errors{0};
+    std::array<std::atomic<unsigned long>, BATCH_SENDER_SIZE_BUCKETS> batch_sizes{};
+
+    static int shared_socket(uint16_t port);
+
+    void run(sender &queue_owner);
+    void send_batch(std::vector<frame> &batch);
+};
+
+#endif //V2VERIFIER_BATCHSENDER_H
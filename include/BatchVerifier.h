@@ -0,0 +1,65 @@
+// Copyright (c) 2022. Geoff Twardokus
+// Reuse permitted under the MIT License as specified in the LICENSE file within this project.
+
+#ifndef V2VERIFIER_BATCHVERIFIER_H
+#define V2VERIFIER_BATCHVERIFIER_H
+
+#include <string>
+#include <unordered_map>
+#include <vector>
+#include <openssl/bn.h>
+#include <openssl/ec.h>
+#include <openssl/sha.h>
+
+/*
+ * Verifies many ECDSA signatures (over SHA-256 hashes) at once. Signatures are added one by one and verified
+ * together by verify(), which returns one result per added signature in the order they were added.
+ *
+ * Identical (hash, signature, key) triples are verified only once. The remaining signatures are grouped by signer so
+ * the curve, order and public key are looked up once per signer, and each group shares its modular inversions:
+ * all s^-1 mod n come from a single inversion (Montgomery's trick) and all R = u1*G + u2*Q are converted to affine
+ * coordinates with a single field inversion. A signature that does not pass the batched check is verified again on
+ * its own with ecdsa_verify(), so batched and individual verification always give the same results.
+ *
+ * Keys must stay valid until verify() returns. A BatchVerifier is not safe to share between threads.
+ */
+class BatchVerifier {
+
+public:
+    BatchVerifier();
+    ~BatchVerifier();
+
+    BatchVerifier(const BatchVerifier &) = delete;
+    BatchVerifier &operator=(const BatchVerifier &) = delete;
+
+    size_t add(const unsigned char *hash, const unsigned char *signature, unsigned int signature_length,
+               EC_KEY *verification_key);
+    std::vector<bool> verify();
+    void clear();
+
+    size_t size() const { return entries.size(); }
+
+    unsigned long get_duplicates() const { return duplicates; }
+    unsigned long get_fallbacks() const { return fallbacks; }
+
+private:
+    struct entry {
+        unsigned char hash[SHA256_DIGEST_LENGTH];
+        unsigned char signature[72];
+        unsigned int signature_length;
+        EC_KEY *verification_key;
+        size_t duplicate_of;    // index of the first identical entry, or the entry's own index
+    };
+
+    BN_CTX *context;
+    std::vector<entry> entries;
+    std::unordered_map<std::string, size_t> first_seen;
+
+    unsigned long duplicates = 0;
+    unsigned long fallbacks = 0;
+
+    void verify_signer(const std::vector<size_t> &group, std::vector<bool> &results);
+    bool verify_individually(entry &e);
+};
+
+#endif //V2VERIFIER_BATCHVERIFIER_H
@@ -0,0 +1,111 @@
+// Copyright (c) 2022. Geoff Twardokus
+// Reuse permitted under the MIT License as specified in the LICENSE file within this project.
+
+#ifndef V2VERIFIER_BLOCKINGQUEUE_H
+#define V2VERIFIER_BLOCKINGQUEUE_H
+
+#include <algorithm>
+#include <chrono>
+#include <condition_variable>
+#include <deque>
+#include <mutex>
+#include <vector>
+
+/*
+ * Bounded multi-producer/multi-consumer FIFO used to hand work between the stages of the receive pipeline and to the
+ * transmitter's batched senders. push() blocks while the queue is full so a slow stage applies back pressure to the
+ * stage before it, and pop() blocks while it is empty. Once close() is called, push() fails and pop() returns the
+ * remaining items and then fails.
+ */
+template<typename T>
+class BlockingQueue {
+
+public:
+    explicit BlockingQueue(size_t capacity) : capacity(capacity > 0 ? capacity : 1) {}
+
+    BlockingQueue(const BlockingQueue &) = delete;
+    BlockingQueue &operator=(const BlockingQueue &) = delete;
+
+    bool push(T item) {
+        std::unique_lock<std::mutex> guard(lock);
+        not_full.wait(guard, [this] { return closed || items.size() < capacity; });
+        if(closed)
+            return false;
+        items.push_back(std::move(item));
+        guard.unlock();
+        not_empty.notify_one();
+        return true;
+    }
+
+    // returns false once the queue is closed and empty
+    bool pop(T &item) {
+        std::unique_lock<std::mutex> guard(lock);
+        not_empty.wait(guard, [this] { return closed || !items.empty(); });
+        return take(guard, item);
+    }
+
+    // like pop(), but also returns false if nothing arrives within `timeout`
+    bool pop(T &item, std::chrono::milliseconds timeout) {
+        std::unique_lock<std::mutex> guard(lock);
+        not_empty.wait_for(guard, timeout, [this] { return closed || !items.empty(); });
+        return take(guard, item);
+    }
+
+    // waits like pop(), then moves up to `max` items into `batch` at once; returns how many were moved
+    size_t pop_many(std::vector<T> &batch, size_t max) {
+        std::unique_lock<std::mutex> guard(lock);
+        not_empty.wait(guard, [this] { return closed || !items.empty(); });
+        size_t count = std::min(max, items.size());
+        for(size_t i = 0; i < count; i++) {
+            batch.push_back(std::move(items.front()));
+            items.pop_front();
+        }
+        guard.unlock();
+        if(count > 0)
+            not_full.notify_all();
+        return count;
+    }
+
+    void close() {
+        {
+            std::lock_guard<std::mutex> guard(lock);
+            closed = true;
+        }
+        not_full.notify_all();
+        not_empty.notify_all();
+    }
+
+    // true once the queue is closed and every item has been popped
+    bool drained() {
+        std::lock_guard<std::mutex> guard(lock);
+        return closed && items.empty();
+    }
+
+    size_t size() {
+        std::lock_guard<std::mutex> guard(lock);
+        return items.size();
+    }
+
+    size_t get_capacity() const { return capacity; }
+
+private:
+    bool take(std::unique_lock<std::mutex> &guard, T &item) {
+        if(items.empty())
+            return false;
+        item = std::move(items.front());
+        items.pop_front();
+        guard.unlock();
+        not_full.notify_one();
+        return true;
+    }
+
+    const size_t capacity;
+    bool closed = false;
+
+    std::mutex lock;
+    std::condition_variable not_full;
+    std::condition_variable not_empty;
+    std::deque<T> items;
+};
+
+#endif //V2VERIFIER_BLOCKINGQUEUE_H
@@ -0,0 +1,60 @@
+// Copyright (c) 2022. Geoff Twardokus
+// Reuse permitted under the MIT License as specified in the LICENSE file within this project.
+
+#ifndef V2VERIFIER_CERTIFICATECACHE_H
+#define V2VERIFIER_CERTIFICATECACHE_H
+
+#include <array>
+#include <atomic>
+#include <chrono>
+#include <cstring>
+#include <list>
+#include <mutex>
+#include <unordered_map>
+#include <openssl/sha.h>
+
+/*
+ * Remembers certificates that were already verified successfully, identified by a SHA-256 digest over the
+ * certificate, its signature and the key that verified it. A certificate found in the cache does not need another
+ * ECDSA verification. Entries expire after `ttl` and at most `capacity` entries are kept (least recently used entries
+ * are evicted first). Failed verifications are never cached. The cache is safe to use from several threads.
+ */
+class CertificateCache {
+
+public:
+    using digest = std::array<unsigned char, SHA256_DIGEST_LENGTH>;
+
+    explicit CertificateCache(size_t capacity = 4096, std::chrono::seconds ttl = std::chrono::seconds(60));
+
+    bool contains(const digest &certificate_digest);
+    void insert(const digest &certificate_digest);
+
+    unsigned long get_hits() const { return hits; }
+    unsigned long get_misses() const { return misses; }
+
+private:
+    struct digest_hash {
+        size_t operator()(const digest &d) const {
+            size_t h;
+            memcpy(&h, d.data(), sizeof(h));
+            return h;
+        }
+    };
+
+    struct entry {
+        digest certificate_digest;
+        std::chrono::steady_clock::time_point expires;
+    };
+
+    size_t capacity;
+    std::chrono::seconds ttl;
+
+    std::mutex lock;
+    std::list<entry> entries;   // most recently used first
+    std::unordered_map<digest, std::list<entry>::iterator, digest_hash> index;
+
+    std::atomic<unsigned long> hits{0};
+    std::atomic<unsigned long> misses{0};
+};
+
+#endif //V2VERIFIER_CERTIFICATECACHE_H
@@ -0,0 +1,29 @@
+// Copyright (c) 2022. Geoff Twardokus
+// Reuse permitted under the MIT License as specified in the LICENSE file within this project.
+
+#ifndef V2VERIFIER_DSRCFRAME_H
+#define V2VERIFIER_DSRCFRAME_H
+
+#include <cstddef>
+
+// frames from the GNU Radio flowgraph carry a 57-byte DSRC/LLC header in front of the SPDU
+#define DSRC_HEADER_LENGTH 57
+
+enum frame_status {
+    FRAME_OK,
+    FRAME_TRUNCATED,    // shorter than a header and a whole SPDU
+    FRAME_OVERSIZED,    // longer than a header and a whole SPDU
+    FRAME_ERROR         // the receive itself failed, see errno
+};
+
+/*
+ * Receives one datagram from `sockfd` with recvmsg, scattering the first header_length bytes into `header` and the
+ * next payload_length bytes straight into `payload`, so the payload needs no further copying. MSG_TRUNC makes
+ * recvmsg return the datagram's real length, so frames of any other length than header_length + payload_length are
+ * rejected without looking at their contents (the payload may then hold part of the rejected frame).
+ */
+frame_status receive_frame(int sockfd, void *header, size_t header_length, void *payload, size_t payload_length);
+
+const char *frame_status_name(frame_status status);
+
+#endif //V2VERIFIER_DSRCFRAME_H
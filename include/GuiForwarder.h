@@ -0,0 +1,44 @@
+// Copyright (c) 2022. Geoff Twardokus
+// Reuse permitted under the MIT License as specified in the LICENSE file within this project.
+
+#ifndef V2VERIFIER_GUIFORWARDER_H
+#define V2VERIFIER_GUIFORWARDER_H
+
+#include <chrono>
+#include <cstdint>
+#include <netinet/in.h>
+
+#include "gui_protocol.h"
+
+/*
+ * Sends packed_bsm_for_gui records to a GUI over UDP using the format in gui_protocol.h. Records are collected until
+ * records_per_datagram of them are pending and then sent as a single datagram; flush_if_due() sends fewer records
+ * once the oldest has waited max_delay. Every record's forwarded_time is set when its datagram is sent.
+ */
+class GuiForwarder {
+
+private:
+    int sockfd;
+    struct sockaddr_in gui_address;
+    int records_per_datagram;
+    std::chrono::milliseconds max_delay;
+    std::chrono::steady_clock::time_point first_pending;
+
+    struct __attribute__ ((packed)) {
+        gui_datagram_header header;
+        packed_bsm_for_gui records[GUI_MAX_RECORDS_PER_DATAGRAM];
+    } datagram;
+
+public:
+    GuiForwarder(uint16_t port, int records_per_datagram, std::chrono::milliseconds max_delay);
+    ~GuiForwarder();
+
+    GuiForwarder(const GuiForwarder&) = delete;
+    GuiForwarder& operator=(const GuiForwarder&) = delete;
+
+    void forward(const packed_bsm_for_gui &record);
+    void flush();
+    void flush_if_due();
+};
+
+#endif //V2VERIFIER_GUIFORWARDER_H
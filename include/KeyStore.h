@@ -0,0 +1,113 @@
+// Copyright (c) 2022. Geoff Twardokus
+// Reuse permitted under the MIT License as specified in the LICENSE file within this project.
+
+#ifndef V2VERIFIER_KEYSTORE_H
+#define V2VERIFIER_KEYSTORE_H
+
+#include <chrono>
+#include <condition_variable>
+#include <cstdint>
+#include <ctime>
+#include <list>
+#include <memory>
+#include <mutex>
+#include <string>
+#include <unordered_map>
+#include <vector>
+#include <openssl/ec.h>
+
+//
+// Key bundle written by provision_keys.py: a key_bundle_header followed by entry_count key_bundle_entry records,
+// one per vehicle ID (the entry of vehicle i is the i-th), holding the vehicle's public keys as uncompressed points.
+//
+#define KEY_BUNDLE_MAGIC "V2VK"
+#define KEY_BUNDLE_VERSION 1
+
+#define KEY_BUNDLE_HAS_KEY 0x1
+#define KEY_BUNDLE_HAS_CERTIFICATE_KEY 0x2
+
+struct __attribute__ ((packed)) key_bundle_header {
+    char magic[4];
+    uint16_t version;
+    uint16_t entry_size;
+    uint32_t entry_count;
+};
+
+struct __attribute__ ((packed)) key_bundle_entry {
+    uint8_t flags;
+    uint8_t key[65];
+    uint8_t certificate_key[65];
+    uint8_t padding;
+};
+
+/*
+ * Per-vehicle store of the public keys used to verify received SPDUs. Keys are loaded from disk the first time a
+ * vehicle is seen and kept in memory afterwards, holding at most `capacity` keys (least recently used keys are
+ * evicted first). Every `reload_interval` a key's file is checked and the key is reloaded if the file changed.
+ * Vehicles without a key are remembered the same way, so their key is looked for at most once per reload interval.
+ *
+ * Keys are read from <directory>/<id>/p256.pub, falling back to the public half of <directory>/<id>/p256.key.
+ * If a key bundle was loaded, keys are taken from the bundle unless the vehicle's PEM file is newer than the bundle.
+ * The bundle is re-read when it changes, so bundled keys are reloaded like keys read from PEM files.
+ * The store is safe to use from several threads; the returned keys stay valid even if they are evicted meanwhile.
+ * Files are read without holding the store's lock: while a key is first loaded, only callers asking for that key wait,
+ * and while a key is re-checked, other callers keep getting the current key.
+ */
+class KeyStore {
+
+public:
+    using key_pointer = std::shared_ptr<EC_KEY>;
+
+    explicit KeyStore(std::string key_directory = "../keys", std::string cert_key_directory = "../cert_keys",
+                      size_t capacity = 4096,
+                      std::chrono::milliseconds reload_interval = std::chrono::milliseconds(1000));
+
+    key_pointer get(int vehicle_id, bool certificate);
+    bool load_bundle(const std::string &path);
+
+private:
+    struct entry {
+        int vehicle_id;
+        bool certificate;
+        key_pointer key;                // nullptr if the vehicle has no key
+        std::string path;               // where the key came from, empty if it has none
+        struct timespec modified;
+        std::chrono::steady_clock::time_point last_checked;
+        bool loading;                   // a caller is (re)loading the key without holding the lock
+        bool first_load;                // ... for the first time, so there is no key to return meanwhile
+    };
+
+    // a key bundle as read from disk; replaced as a whole when the bundle changes
+    struct key_bundle {
+        std::string path;
+        struct timespec modified;
+        std::vector<key_bundle_entry> entries;
+    };
+    using bundle_pointer = std::shared_ptr<const key_bundle>;
+
+    std::string key_directory;
+    std::string cert_key_directory;
+    size_t capacity;
+    std::chrono::milliseconds reload_interval;
+
+    std::mutex lock;
+    std::condition_variable first_loaded;
+    std::list<entry> entries;   // most recently used first
+    std::unordered_map<long, std::list<entry>::iterator> index;
+    bundle_pointer bundle = std::make_shared<key_bundle>();
+    std::chrono::steady_clock::time_point bundle_checked;
+
+    static long index_key(int vehicle_id, bool certificate) { return ((long) vehicle_id << 1) | certificate; }
+
+    void insert(const entry &loaded);
+    static bundle_pointer read_bundle(const std::string &path);
+    bundle_pointer refresh_bundle(std::chrono::steady_clock::time_point now);
+    static bool is_bundled(const key_bundle &keys, int vehicle_id, bool certificate);
+    bool locate(const key_bundle &keys, int vehicle_id, bool certificate, std::string &path,
+                struct timespec &modified) const;
+    bool load(const key_bundle &keys, int vehicle_id, bool certificate, entry &loaded) const;
+    static bool load_from_bundle(const key_bundle &keys, int vehicle_id, bool certificate, entry &loaded);
+    static key_pointer read_public_key(const std::string &path);
+};
+
+#endif //V2VERIFIER_KEYSTORE_H
@@ -0,0 +1,99 @@
+// Copyright (c) 2022. Geoff Twardokus
+// Reuse permitted under the MIT License as specified in the LICENSE file within this project.
+
+#ifndef V2VERIFIER_RESULTLOGGER_H
+#define V2VERIFIER_RESULTLOGGER_H
+
+#include <atomic>
+#include <condition_variable>
+#include <cstdint>
+#include <cstdio>
+#include <mutex>
+#include <string>
+#include <thread>
+#include <vector>
+
+#include "arguments.h"
+
+#define RESULT_LOG_VERSION 1
+
+// bits of verification_record.outcome
+#define RESULT_VALID 0x1                // all checks passed
+#define RESULT_CERTIFICATE_VALID 0x2
+#define RESULT_SIGNATURE_VALID 0x4
+#define RESULT_RECENT 0x8
+
+/*
+ * Binary result logs are a result_log_header followed by one verification_record per SPDU, all little-endian
+ * (read with python_guis/result_log.py).
+ */
+struct __attribute__ ((packed)) verification_record {
+    uint64_t sequence;          // order of arrival at the receiver
+    int64_t generated_time;     // microseconds since the epoch, as for the GUI records
+    int64_t received_time;
+    int64_t verified_time;
+    int64_t reported_time;
+    uint16_t vehicle_id;
+    uint8_t outcome;            // RESULT_* bits
+    uint8_t reserved = 0;
+};
+
+struct __attribute__ ((packed)) result_log_header {
+    char magic[4] = {'V', '2', 'V', 'R'};
+    uint16_t version = RESULT_LOG_VERSION;
+    uint16_t record_size = sizeof(verification_record);
+};
+
+enum log_level {
+    LOG_ERROR,
+    LOG_WARNING,
+    LOG_INFO,
+    LOG_DEBUG
+};
+
+/*
+ * Keeps console output and per-SPDU result logs off the receive pipeline. Messages at or below the configured level
+ * and verification records are appended to in-memory buffers, and a background thread writes whatever has
+ * accumulated: messages to stdout, records to the results file as binary verification_records or JSON lines. If the
+ * writer falls behind by more than `capacity` entries, new entries are dropped and counted instead of blocking.
+ */
+class ResultLogger {
+
+public:
+    explicit ResultLogger(const receiver_options &options);
+    ~ResultLogger();
+
+    ResultLogger(const ResultLogger&) = delete;
+    ResultLogger& operator=(const ResultLogger&) = delete;
+
+    static log_level parse_level(const std::string &name);
+
+    bool enabled(log_level level) const { return level <= this->level; }
+    void log(log_level level, const std::string &message);
+    void record(const verification_record &result);
+
+    // writes everything still buffered and stops the writer
+    void close();
+
+    unsigned long get_dropped() const { return dropped; }
+
+private:
+    log_level level;
+    FILE *results_file = nullptr;
+    bool json_lines = false;
+    size_t capacity;
+
+    std::mutex lock;
+    std::condition_variable pending;
+    bool closed = false;
+    std::vector<std::string> messages;
+    std::vector<verification_record> records;
+    std::atomic<unsigned long> dropped{0};
+
+    std::thread writer;
+
+    void run();
+    void write_records(const std::vector<verification_record> &batch);
+};
+
+#endif //V2VERIFIER_RESULTLOGGER_H
@@ -0,0 +1,66 @@
+// Copyright (c) 2022. Geoff Twardokus
+// Reuse permitted under the MIT License as specified in the LICENSE file within this project.
+
+#ifndef V2VERIFIER_SIGNINGPOOL_H
+#define V2VERIFIER_SIGNINGPOOL_H
+
+#include <atomic>
+#include <chrono>
+#include <future>
+#include <string>
+#include <thread>
+#include <vector>
+
+#include "BatchSender.h"
+#include "BlockingQueue.h"
+#include "Vehicle.h"
+
+/*
+ * A pool of worker threads that build and sign SPDUs ahead of the time they are sent. prepare() queues the SPDU of
+ * one vehicle and timestep, stamped with the time it is going to be sent, and returns a future for the signed frame,
+ * so a transmit loop can ask for SPDUs several steps ahead and only has to send them when they are due.
+ *
+ * How long jobs waited for a worker and how long signing took are counted for summary().
+ */
+class SigningPool {
+
+public:
+    using timestamp = std::chrono::time_point<std::chrono::system_clock, std::chrono::microseconds>;
+
+    SigningPool(int workers, int queue_capacity);
+    ~SigningPool();
+
+    SigningPool(const SigningPool&) = delete;
+    SigningPool& operator=(const SigningPool&) = delete;
+
+    std::future<BatchSender::frame> prepare(Vehicle &vehicle, int timestep, timestamp generated_time);
+
+    // signs everything still queued and stops the workers
+    void close();
+
+    size_t worker_count() const { return workers.size(); }
+    std::string summary() const;
+
+private:
+    using clock = std::chrono::steady_clock;
+
+    struct job {
+        Vehicle *vehicle;
+        int timestep;
+        timestamp generated_time;
+        clock::time_point queued;
+        std::promise<BatchSender::frame> result;
+    };
+
+    BlockingQueue<job> jobs;
+    std::vector<std::thread> workers;
+
+    std::atomic<unsigned long> signed_count{0};
+    std::atomic<long> total_wait_us{0};
+    std::atomic<long> total_sign_us{0};
+    std::atomic<long> max_sign_us{0};
+
+    void run();
+};
+
+#endif //V2VERIFIER_SIGNINGPOOL_H
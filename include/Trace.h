@@ -0,0 +1,80 @@
+// Copyright (c) 2022. Geoff Twardokus
+// Reuse permitted under the MIT License as specified in the LICENSE file within this project.
+
+#ifndef V2VERIFIER_TRACE_H
+#define V2VERIFIER_TRACE_H
+
+#include <cstddef>
+#include <cstdint>
+#include <memory>
+#include <string>
+#include <vector>
+
+//
+// Binary trace format written by trace_tool.py: a trace_file_header followed by column_count columns of row_count
+// little-endian float32 values each (column-major). Columns 0-2 are x, y and elevation; any further columns are
+// copied from the CSV unchanged, except in compiled traces (TRACE_FLAG_MOTION_COLUMNS), whose columns 3 and 4 hold
+// each row's speed and heading as calculate_speed_kph and calculate_heading would compute them.
+//
+#define TRACE_FILE_MAGIC "V2VT"
+#define TRACE_FILE_VERSION 1
+
+#define TRACE_FLAG_MOTION_COLUMNS 0x1
+#define TRACE_FLAG_SMOOTHED 0x2
+
+#define TRACE_X_COLUMN 0
+#define TRACE_Y_COLUMN 1
+#define TRACE_ELEVATION_COLUMN 2
+#define TRACE_SPEED_COLUMN 3
+#define TRACE_HEADING_COLUMN 4
+
+struct __attribute__ ((packed)) trace_file_header {
+    char magic[4];
+    uint16_t version;
+    uint16_t flags;
+    uint32_t vehicle_id;
+    uint32_t row_count;
+    uint32_t column_count;
+    uint32_t data_offset;   // offset of the first column from the start of the file, a multiple of 4
+};
+
+/*
+ * A vehicle's trace held in one flat, column-major float array. Traces are loaded from trace_files/<id>.bin by
+ * mapping the file into memory, so loading takes no parsing and no per-row allocations; if there is no usable binary
+ * trace, trace_files/<id>.csv is parsed instead. Traces are immutable and shared between copies of a Vehicle.
+ */
+class Trace {
+
+public:
+    static std::shared_ptr<Trace> load(int vehicle_id, const std::string &directory = "../trace_files");
+
+    ~Trace();
+
+    Trace(const Trace &) = delete;
+    Trace &operator=(const Trace &) = delete;
+
+    size_t rows() const { return row_count; }
+    size_t columns() const { return column_count; }
+    uint16_t get_flags() const { return flags; }
+    bool has_motion_columns() const { return (flags & TRACE_FLAG_MOTION_COLUMNS) && column_count > TRACE_HEADING_COLUMN; }
+
+    float at(size_t row, size_t column) const { return data[column * row_count + row]; }
+    const float *column(size_t column) const { return data + column * row_count; }
+
+private:
+    Trace() = default;
+
+    bool map_binary(const std::string &path, int vehicle_id);
+    bool parse_csv(const std::string &path);
+
+    const float *data = nullptr;
+    size_t row_count = 0;
+    size_t column_count = 0;
+    uint16_t flags = 0;
+
+    void *mapping = nullptr;
+    size_t mapping_length = 0;
+    std::vector<float> parsed;  // column-major values when loaded from CSV
+};
+
+#endif //V2VERIFIER_TRACE_H
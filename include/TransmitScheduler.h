@@ -0,0 +1,84 @@
+// Copyright (c) 2022. Geoff Twardokus
+// Reuse permitted under the MIT License as specified in the LICENSE file within this project.
+
+#ifndef V2VERIFIER_TRANSMITSCHEDULER_H
+#define V2VERIFIER_TRANSMITSCHEDULER_H
+
+#include <atomic>
+#include <deque>
+#include <future>
+#include <chrono>
+#include <memory>
+#include <vector>
+
+#include "SigningPool.h"
+#include "Vehicle.h"
+#include "arguments.h"
+
+/*
+ * Drives the transmissions of many vehicles from a few event loops instead of one thread per vehicle. Every loop owns
+ * a share of the vehicles (round robin), one socket, and a min-heap of the vehicles' next deadlines. Deadlines are
+ * absolute: the k-th message of a vehicle is due at its start time plus k intervals (plus an optional random jitter
+ * that does not accumulate), so the time spent signing never makes the schedule drift. Vehicles start at random
+ * offsets within their first interval to spread the load. If a BatchSender is given, the loops only sign and queue
+ * SPDUs and leave sending to it.
+ *
+ * With a SigningPool, the loops do not sign at all: the pool prepares the SPDUs of every vehicle's next
+ * sign_ahead_steps deadlines, each stamped with its deadline, and a loop only hands the signed SPDU to the socket
+ * when it is due, so signing time neither delays nor jitters transmissions as long as the pool keeps up.
+ *
+ * While running, the achieved message rate, the target rate (the messages due so far by the schedule over the same
+ * time) and how late messages were sent are printed to stderr every stats interval, and once more at the end.
+ */
+class TransmitScheduler {
+
+public:
+    TransmitScheduler(std::vector<Vehicle> &vehicles, int num_msgs, bool test, const transmitter_options &options,
+                      BatchSender *sender = nullptr, SigningPool *signer = nullptr);
+
+    void run();
+
+private:
+    using clock = std::chrono::steady_clock;
+
+    struct deadline {
+        clock::time_point due;
+        size_t vehicle;     // index into vehicles
+        bool operator>(const deadline &other) const { return due > other.due; }
+    };
+
+    // an SPDU being signed ahead of its deadline by the signing pool
+    struct pending_spdu {
+        clock::time_point due;
+        std::future<BatchSender::frame> spdu;
+    };
+
+    // counters of one event loop, written by the loop and read by the reporter
+    struct loop_statistics {
+        std::atomic<unsigned long> sent{0};
+        std::atomic<long> total_lateness_us{0};
+        std::atomic<long> max_lateness_us{0};
+        std::atomic<unsigned long> stalls{0};   // SPDUs from the signing pool that were not ready when due
+    };
+
+    std::vector<Vehicle> &vehicles;
+    int num_msgs;
+    bool test;
+    transmitter_options options;
+    BatchSender *sender;    // sends for the event loops if not null
+    SigningPool *signer;    // signs SPDUs ahead of their deadlines if not null
+
+    clock::time_point start;
+    SigningPool::timestamp system_start;    // the wall-clock time at start
+
+    std::vector<std::unique_ptr<loop_statistics>> statistics;
+    std::vector<clock::time_point> first_due;     // when the first message of every vehicle is due
+
+    std::chrono::microseconds interval_of(const Vehicle &vehicle) const;
+    unsigned long scheduled_by(clock::time_point time) const;
+    SigningPool::timestamp system_time(clock::time_point due) const;
+    void run_loop(size_t loop, size_t loop_count);
+    void report(bool final);
+};
+
+#endif //V2VERIFIER_TRANSMITSCHEDULER_H
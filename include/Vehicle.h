@@ -8,6 +8,8 @@
 #ifndef CPP_VEHICLE_H
 #define CPP_VEHICLE_H
 
+#include <memory>
+#include <ostream>
 #include <string>
 #include <vector>
 #include <openssl/sha.h>
@@ -17,24 +19,39 @@
 #include "ieee16092.h"
 #include "bsm.h"
 #include "v2vcrypto.h"
+#include "KeyStore.h"
+#include "CertificateCache.h"
+#include "BlockingQueue.h"
+#include "BatchVerifier.h"
+#include "Trace.h"
+#include "BatchSender.h"
+#include "ResultLogger.h"
+#include "arguments.h"
 
 
 class Vehicle {
 
 private:
     std::string hostname;
-    uint8_t number;
+    int number;
     EC_KEY *private_ec_key = nullptr, *cert_private_ec_key = nullptr;
-    ecdsa_explicit_certificate vehicle_certificate_ecdsa;
 
+    // this vehicle's certificate (as sent in every SPDU) and its signature, created once by sign_certificate()
+    alignas(ecdsa_explicit_certificate) unsigned char signed_certificate[sizeof(ecdsa_explicit_certificate)];
     unsigned char certificate_signature[72];
     unsigned int certificate_buffer_length;
 
-    std::vector<std::vector<float>> timestep;
-    std::vector<float> timestep_data;
+    // public keys and already verified certificates of other vehicles (shared so that copies of a Vehicle share them)
+    std::shared_ptr<KeyStore> verification_keys = std::make_shared<KeyStore>();
+    std::shared_ptr<CertificateCache> verified_certificates = std::make_shared<CertificateCache>();
+
+    // this vehicle's trace (shared so that copies of a Vehicle share it)
+    std::shared_ptr<Trace> trace;
+    // time between two transmitted rows of the trace, used to compute speeds from positions
+    int interval_ms = 100;
 
     struct ecdsa_spdu {
-        uint8_t vehicle_id;
+        uint16_t vehicle_id;    // fits in the padding before llc_dsap_ssap, so the layout is the same as with uint8_t
         uint32_t llc_dsap_ssap = 43690;
         uint8_t  llc_control = 3;
         uint32_t llc_type = 35036;
@@ -48,18 +65,50 @@ private:
         unsigned char signature[72]; // 72 bytes is the size of the DER-encoded ECDSA signature
     };
 
+    using timestamp = std::chrono::time_point<std::chrono::system_clock, std::chrono::microseconds>;
+
+    // work items passed between the stages of the receive pipeline, numbered in order of arrival
+    struct received_spdu {
+        unsigned long sequence;
+        timestamp received_time;
+        ecdsa_spdu spdu;
+    };
+
+    struct verified_spdu {
+        unsigned long sequence;
+        uint8_t outcome;    // RESULT_* bits
+        timestamp received_time;
+        timestamp verified_time;
+        ecdsa_spdu spdu;
+    };
+
     void generate_ecdsa_spdu(Vehicle::ecdsa_spdu &spdu, int timestep);
+    void generate_ecdsa_spdu(Vehicle::ecdsa_spdu &spdu, int timestep, timestamp generated_time);
 
     bsm generate_bsm(int timestep);
-    static void print_bsm(Vehicle::ecdsa_spdu &spdu);
-    static void print_spdu(Vehicle::ecdsa_spdu &spdu, bool valid);
+    static void print_bsm(Vehicle::ecdsa_spdu &spdu, std::ostream &out);
+    static void print_spdu(Vehicle::ecdsa_spdu &spdu, bool valid, std::ostream &out);
 
     static void load_key(int number, bool certificate, EC_KEY *&key_to_store);
     void load_trace(int number);
 
+    void sign_certificate();
     void sign_message_ecdsa(Vehicle::ecdsa_spdu &spdu);
-    bool verify_message_ecdsa(Vehicle::ecdsa_spdu &spdu, std::chrono::time_point<std::chrono::system_clock,
-                              std::chrono::microseconds> received_time, int vehicle_id);
+    bool verify_certificate_ecdsa(Vehicle::ecdsa_spdu &spdu, EC_KEY *certificate_verification_key);
+    static void hash_certificate(Vehicle::ecdsa_spdu &spdu, EC_KEY *certificate_verification_key,
+                                 unsigned char *certificate_hash, CertificateCache::digest &certificate_digest);
+    static bool signature_lengths_valid(Vehicle::ecdsa_spdu &spdu);
+    static bool is_recent(Vehicle::ecdsa_spdu &spdu, timestamp received_time);
+    static uint8_t outcome_of(bool certificate_valid, bool signature_valid, bool recent);
+    static timestamp now();
+    uint8_t verify_message_ecdsa(Vehicle::ecdsa_spdu &spdu, std::chrono::time_point<std::chrono::system_clock,
+                                 std::chrono::microseconds> received_time, int vehicle_id);
+
+    void verify_received_spdus(BlockingQueue<received_spdu> &received, BlockingQueue<verified_spdu> &verified);
+    void verify_received_batches(BlockingQueue<received_spdu> &received, BlockingQueue<verified_spdu> &verified,
+                                 const receiver_options &options);
+    void report_verified_spdus(BlockingQueue<received_spdu> &received, BlockingQueue<verified_spdu> &verified,
+                               bool tkgui, const receiver_options &options, ResultLogger &logger);
 
 public:
     Vehicle(int number) {
@@ -67,16 +116,24 @@ public:
         this->number = number;
         Vehicle::load_key(number, false, private_ec_key);
         Vehicle::load_key(number, true, cert_private_ec_key);
+        Vehicle::sign_certificate();
         Vehicle::load_trace(number);
     };
 
     std::string get_hostname();
-    void transmit(int num_msgs, bool test);
-    static void transmit_static(void* arg, int num_msgs, bool test) {
+    int get_number() const { return number; }
+    void set_interval_ms(int interval_ms) { this->interval_ms = interval_ms; }
+    static struct sockaddr_in transmit_address(bool test);
+    void send_spdu(int sockfd, const struct sockaddr_in &address, int timestep);
+    void send_spdu(BatchSender &sender, int timestep);
+    BatchSender::frame prepare_spdu(int timestep, std::chrono::time_point<std::chrono::system_clock,
+                                    std::chrono::microseconds> generated_time);
+    void transmit(int num_msgs, bool test, int interval_ms = 100, BatchSender *sender = nullptr);
+    static void transmit_static(void* arg, int num_msgs, bool test, int interval_ms, BatchSender *sender) {
         auto* v = (Vehicle*) arg;
-        v->transmit(num_msgs, test);
+        v->transmit(num_msgs, test, interval_ms, sender);
     };
-    void receive(int num_msgs, bool test, bool tkgui);
+    void receive(int num_msgs, bool test, bool tkgui, const receiver_options &options = receiver_options());
 };
 
 
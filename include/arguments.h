@@ -8,6 +8,9 @@
 #ifndef V2VERIFIER_ARGUMENTS_H
 #define V2VERIFIER_ARGUMENTS_H
 
+#include <map>
+#include <string>
+
 enum mode {
     TRANSMITTER,
     RECEIVER
@@ -25,4 +28,38 @@ struct program_arguments {
     bool gui = false;
 };
 
+// receiver settings from the "gui", "receiver" and "logging" blocks of config.json
+struct receiver_options {
+    int gui_records_per_datagram = 1;
+    int gui_max_datagram_delay_ms = 50;     // longest a record waits for its datagram to fill up
+    int verification_workers = 1;
+    bool ordered_results = true;
+    int queue_capacity = 1024;
+    int stats_interval_seconds = 5;
+    bool batch_verification = false;
+    int batch_size = 64;
+    int batch_window_ms = 5;
+    std::string key_bundle = "../keys/keystore.bin";
+    std::string log_level = "info";         // "debug" prints every received SPDU and BSM
+    std::string results_log;                // per-SPDU verification results file, empty for none
+    std::string results_format = "binary";  // or "jsonl"
+    int log_capacity = 65536;               // entries buffered for the log writer before dropping
+};
+
+// transmitter settings from the "scenario" and "transmitter" blocks of config.json
+struct transmitter_options {
+    int interval_ms = 100;
+    bool scheduler = false;                 // event loops (TransmitScheduler) instead of one thread per vehicle
+    int event_loops = 1;                    // 0 means one per core
+    int jitter_ms = 0;
+    std::map<int, int> vehicle_interval_ms; // per-vehicle overrides of interval_ms
+    int stats_interval_seconds = 5;
+    bool batched_egress = false;            // send through a BatchSender instead of one sendto per SPDU
+    int senders = 0;                        // BatchSender threads, 0 means one per core
+    int send_batch_size = 64;
+    int send_queue_capacity = 4096;
+    int signer_workers = 0;                 // SigningPool threads signing ahead of time, 0 means sign when sending
+    int sign_ahead_steps = 4;               // deadlines per vehicle signed ahead with signer_workers
+};
+
 #endif //V2VERIFIER_ARGUMENTS_H
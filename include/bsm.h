@@ -9,6 +9,7 @@
 #define CPP_BSM_H
 
 #include <cmath>
+#include <cstdint>
 
 struct bsm {
     float latitude;
@@ -26,8 +27,13 @@ struct __attribute__ ((packed)) packed_bsm_for_gui{
     float heading;
     bool authenticated;
     bool on_time;
-    float elapsed_time;
+    float elapsed_time;     // milliseconds from generation to reception
     float vehicle_id;
+    // when the SPDU passed each stage on its way to the GUI, in microseconds since the epoch (system clock)
+    int64_t generated_time;
+    int64_t received_time;
+    int64_t verified_time;
+    int64_t forwarded_time;
 };
 
 // Assume all positions are in meters and time is in milliseconds
@@ -10,7 +10,7 @@
 struct common_cert_fields {
     uint8_t version = 3;
     uint8_t issuer = 128;
-    std::string hostname = "hostname";
+    char hostname[32] = "hostname";   // fixed-size so the certificate bytes do not depend on where it is stored
     uint32_t craca_id = 0;
     uint16_t crlseries = 0;
     std::chrono::time_point<std::chrono::system_clock, std::chrono::seconds> validity_period_start;
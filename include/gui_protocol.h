@@ -0,0 +1,30 @@
+// Copyright (c) 2022. Geoff Twardokus
+// Reuse permitted under the MIT License as specified in the LICENSE file within this project.
+
+//
+// Wire format of the datagrams the receiver forwards to the GUIs. Each datagram starts with a gui_datagram_header
+// followed by record_count records of record_length bytes each. All fields are little-endian. The Python side of
+// this format lives in python_guis/gui_schema.py; bump GUI_PROTOCOL_VERSION in both places when the record changes.
+//
+
+#ifndef V2VERIFIER_GUI_PROTOCOL_H
+#define V2VERIFIER_GUI_PROTOCOL_H
+
+#include <cstdint>
+
+#include "bsm.h"
+
+#define GUI_PROTOCOL_MAGIC 0x56     // 'V'
+#define GUI_PROTOCOL_VERSION 2
+
+struct __attribute__ ((packed)) gui_datagram_header {
+    uint8_t magic = GUI_PROTOCOL_MAGIC;
+    uint8_t version = GUI_PROTOCOL_VERSION;
+    uint16_t record_count = 0;
+    uint16_t record_length = sizeof(packed_bsm_for_gui);
+};
+
+// largest number of records sent in one datagram; keeps datagrams well below the loopback MTU
+#define GUI_MAX_RECORDS_PER_DATAGRAM 256
+
+#endif //V2VERIFIER_GUI_PROTOCOL_H
@@ -0,0 +1,219 @@
+#  Copyright (c) 2022. Geoff Twardokus
+#  Reuse permitted under the MIT License as specified in the LICENSE file within this project.
+
+"""Key and certificate key provisioning for any number of vehicles
+
+Creates the P-256 keypairs every vehicle needs, its message signing key in keys/<id>/ and its certificate key in
+cert_keys/<id>/, as p256.key (private) and p256.pub (public) PEM files. Existing keys are kept, so re-running only
+fills in missing vehicles or files. Vehicles are provisioned in parallel across a process pool.
+
+Afterwards the public keys of all vehicles are written to one key bundle (keys/keystore.bin by default) that the
+receiver loads with a single read instead of opening two PEM files per vehicle. The bundle is a 12-byte header
+(magic "V2VK", version, entry size, entry count) followed by one fixed-size entry per vehicle ID, so the entry of
+vehicle i starts at 12 + i * entry size: a flags byte (bit 0: message key present, bit 1: certificate key present),
+the message and certificate public keys as 65-byte uncompressed points, and a padding byte.
+
+    python3 provision_keys.py --vehicles 2000
+"""
+
+import argparse
+import concurrent.futures
+import os
+import struct
+
+from fastecdsa import curve, keys
+
+try:
+    from fastecdsa.keys import export_key, import_key
+    PEM_ENCODER = None
+except ImportError:
+    # fastecdsa 3 split export_key and import_key into private and public key variants with explicit encoders
+    from fastecdsa.encoding.pem import PEMEncoder
+    PEM_ENCODER = PEMEncoder()
+
+
+MAGIC = b"V2VK"
+VERSION = 1
+
+# magic, version, entry size, entry count (KEY_BUNDLE_* in include/KeyStore.h)
+HEADER = struct.Struct("<4sHHI")
+ENTRY = struct.Struct("<B65s65sx")
+
+FLAG_KEY = 0x1
+FLAG_CERTIFICATE_KEY = 0x2
+
+
+def encode_point(point) -> bytes:
+    """Encode a P-256 public key as an uncompressed point (0x04, x, y)
+
+    :param point: the public key
+    :type point: fastecdsa.point.Point
+    :return: the 65-byte encoding
+    :rtype: bytes
+    """
+    return b"\x04" + point.x.to_bytes(32, "big") + point.y.to_bytes(32, "big")
+
+
+def write_private_key(private_key: int, path: str) -> None:
+    """Write a P-256 private key as PEM with whichever fastecdsa API is installed
+
+    :param private_key: the private key
+    :type private_key: int
+    :param path: the file to write
+    :type path: str
+    """
+    if PEM_ENCODER is None:
+        export_key(private_key, curve=curve.P256, filepath=path)
+    else:
+        keys.export_private_key(private_key, curve.P256, PEM_ENCODER, filepath=path)
+
+
+def write_public_key(public_key, path: str) -> None:
+    """Write a P-256 public key as PEM with whichever fastecdsa API is installed
+
+    :param public_key: the public key
+    :type public_key: fastecdsa.point.Point
+    :param path: the file to write
+    :type path: str
+    """
+    if PEM_ENCODER is None:
+        export_key(public_key, curve=curve.P256, filepath=path)
+    else:
+        keys.export_public_key(public_key, PEM_ENCODER, filepath=path)
+
+
+def read_public_key(private_path: str):
+    """Read a PEM private key and return its public key
+
+    :param private_path: the private key file
+    :type private_path: str
+    :return: the public key
+    :rtype: fastecdsa.point.Point
+    """
+    if PEM_ENCODER is None:
+        return import_key(private_path, curve=curve.P256)[1]
+    return keys.get_public_key(keys.import_private_key(private_path, PEM_ENCODER), curve.P256)
+
+
+def provision_key(directory: str, vehicle_id: int) -> tuple:
+    """Make sure a vehicle has a keypair in a key directory, creating whatever is missing
+
+    :param directory: the key directory (keys or cert_keys)
+    :type directory: str
+    :param vehicle_id: the vehicle's ID number
+    :type vehicle_id: int
+    :return: the encoded public key and the number of files written
+    :rtype: tuple
+    """
+    vehicle_directory = os.path.join(directory, str(vehicle_id))
+    private_path = os.path.join(vehicle_directory, "p256.key")
+    public_path = os.path.join(vehicle_directory, "p256.pub")
+    written = 0
+
+    if os.path.exists(private_path):
+        public_key = read_public_key(private_path)
+    else:
+        os.makedirs(vehicle_directory, exist_ok=True)
+        private_key, public_key = keys.gen_keypair(curve.P256)
+        write_private_key(private_key, private_path)
+        written += 1
+
+    if written or not os.path.exists(public_path):
+        write_public_key(public_key, public_path)
+        written += 1
+
+    return encode_point(public_key), written
+
+
+def provision_vehicles(key_directory: str, cert_key_directory: str, vehicle_ids: list) -> list:
+    """Provision both keypairs of several vehicles (run in a worker process)
+
+    :param key_directory: the message key directory
+    :type key_directory: str
+    :param cert_key_directory: the certificate key directory
+    :type cert_key_directory: str
+    :param vehicle_ids: the vehicles' ID numbers
+    :type vehicle_ids: list
+    :return: (vehicle ID, message public key, certificate public key, files written) for every vehicle
+    :rtype: list
+    """
+    results = []
+    for vehicle_id in vehicle_ids:
+        key, key_written = provision_key(key_directory, vehicle_id)
+        cert_key, cert_key_written = provision_key(cert_key_directory, vehicle_id)
+        results.append((vehicle_id, key, cert_key, key_written + cert_key_written))
+    return results
+
+
+def write_bundle(path: str, public_keys: dict) -> None:
+    """Write the key bundle, replacing any previous bundle at once
+
+    :param path: path to the bundle
+    :type path: str
+    :param public_keys: maps every vehicle ID to its (message, certificate) public keys
+    :type public_keys: dict
+    """
+    count = max(public_keys) + 1 if public_keys else 0
+    entries = bytearray(ENTRY.size * count)
+    for vehicle_id, (key, cert_key) in public_keys.items():
+        ENTRY.pack_into(entries, vehicle_id * ENTRY.size, FLAG_KEY | FLAG_CERTIFICATE_KEY, key, cert_key)
+
+    with open(path + ".tmp", "wb") as bundle_file:
+        bundle_file.write(HEADER.pack(MAGIC, VERSION, ENTRY.size, count))
+        bundle_file.write(entries)
+    os.replace(path + ".tmp", path)
+
+
+def read_bundle(path: str) -> dict:
+    """Read a key bundle
+
+    :param path: path to the bundle
+    :type path: str
+    :raises ValueError: if the file is not a compatible bundle
+    :return: maps every vehicle ID with keys to its (message, certificate) public keys (None where missing)
+    :rtype: dict
+    """
+    with open(path, "rb") as bundle_file:
+        data = bundle_file.read()
+
+    if len(data) < HEADER.size:
+        raise ValueError(f"{path} is too short to be a key bundle")
+    magic, version, entry_size, count = HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION or entry_size != ENTRY.size:
+        raise ValueError(f"{path} is not a version {VERSION} key bundle")
+    if len(data) < HEADER.size + count * ENTRY.size:
+        raise ValueError(f"{path} is truncated")
+
+    public_keys = {}
+    for vehicle_id in range(count):
+        flags, key, cert_key = ENTRY.unpack_from(data, HEADER.size + vehicle_id * ENTRY.size)
+        if flags:
+            public_keys[vehicle_id] = (key if flags & FLAG_KEY else None,
+                                       cert_key if flags & FLAG_CERTIFICATE_KEY else None)
+    return public_keys
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Create missing vehicle keys and write the receiver's key bundle")
+    parser.add_argument("--vehicles", type=int, default=10, help="provision vehicles 0 to VEHICLES - 1")
+    parser.add_argument("--keys", default="keys", help="message key directory")
+    parser.add_argument("--cert-keys", default="cert_keys", help="certificate key directory")
+    parser.add_argument("--bundle", default=os.path.join("keys", "keystore.bin"), help="key bundle to write")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="number of worker processes")
+    parser.add_argument("--chunk-size", type=int, default=64, help="vehicles provisioned per task")
+    args = parser.parse_args()
+
+    vehicle_ids = list(range(args.vehicles))
+    chunks = [vehicle_ids[first:first + args.chunk_size] for first in range(0, len(vehicle_ids), args.chunk_size)]
+
+    public_keys = {}
+    written = 0
+    with concurrent.futures.ProcessPoolExecutor(max_workers=args.workers) as pool:
+        tasks = [pool.submit(provision_vehicles, args.keys, args.cert_keys, chunk) for chunk in chunks]
+        for task in concurrent.futures.as_completed(tasks):
+            for vehicle_id, key, cert_key, files in task.result():
+                public_keys[vehicle_id] = (key, cert_key)
+                written += files
+
+    write_bundle(args.bundle, public_keys)
+    print(f"provisioned {len(public_keys)} vehicles ({written} key files written), bundle: {args.bundle}")
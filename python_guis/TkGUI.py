@@ -1,7 +1,7 @@
 #  Copyright (c) 2022. Geoff Twardokus
 #  Reuse permitted under the MIT License as specified in the LICENSE file within this project.
 
-import struct
+import asyncio
 from tkinter.ttk import *
 import tkinter as tk
 from PIL import Image
@@ -10,7 +10,15 @@ import time
 import threading
 from threading import Thread
 import json
-import socket
+
+from python_guis import bsm_decoder
+from python_guis.counters import PacketCounters
+from python_guis.ingest import GuiIngestServer
+from python_guis.latency import LatencyTracker
+from python_guis.message_log import MessageLog
+from python_guis.vehicle_table import VehicleTable, VehicleTableView
+from python_guis.render_queue import RenderQueue
+from python_guis import sprites
 
 
 def heading_to_direction(heading):
@@ -61,20 +69,29 @@ def numerical_heading_to_direction(heading):
 
 class TkGUI:
 
-    def __init__(self, root):
+    def __init__(self, root, render_policy=RenderQueue.LATEST_PER_VEHICLE, render_queue_size=256,
+                 frame_interval_ms=50, max_packets_per_frame=64, listen_ports=(9999,), max_log_lines=2000,
+                 log_spill_path=None):
 
         self.root = root
+        self.listenPorts = listen_ports
+
+        # packets are decoded on the receiver thread and rendered in batches on the Tk thread
+        self.render_queue = RenderQueue(max_size=render_queue_size, policy=render_policy)
+        self.frame_interval_ms = frame_interval_ms
+        self.max_packets_per_frame = max_packets_per_frame
 
-        self.threadlock = threading.Lock()
+        # vehicle icons are decoded once up front; each vehicle keeps a single canvas item that is moved around
+        self.sprites = sprites.SpriteCache()
+        self.vehicleItems = {}
 
         self.numVehicles = 1
         self.totalPackets = 100
 
-        self.receivedPacketCount = 0
-        self.processedPacketCount = 0
-        self.authenticatedPacketCount = 0
-        self.intactPacketCount = 0
-        self.onTimePacketCount = 0
+        # counters are written by the receiver and pushed to the labels by the Tk thread only when they change
+        self.packetCounters = PacketCounters()
+        self.displayedCountersGeneration = 0
+        self.statisticsRefreshMs = 100
 
         self.receivedPacketCountText = tk.StringVar()
         self.processedPacketCountText = tk.StringVar()
@@ -91,39 +108,13 @@ class TkGUI:
         self.authenticatedPacketCountPercentageText = tk.StringVar()
         self.intactPacketCountPercentageText = tk.StringVar()
         self.onTimePacketCountPercentageText = tk.StringVar()
-        self.vehicleZeroLocationText = tk.StringVar()
-        self.vehicleOneLocationText = tk.StringVar()
-        self.vehicleTwoLocationText = tk.StringVar()
-        self.vehicleThreeLocationText = tk.StringVar()
-        self.vehicleFourLocationText = tk.StringVar()
-        self.vehicleFiveLocationText = tk.StringVar()
-        self.vehicleSixLocationText = tk.StringVar()
-        self.vehicleSevenLocationText = tk.StringVar()
-        self.vehicleEightLocationText = tk.StringVar()
-        self.vehicleNineLocationText = tk.StringVar()
-        self.vehicleZeroSpeedText = tk.StringVar()
-        self.vehicleOneSpeedText = tk.StringVar()
-        self.vehicleTwoSpeedText = tk.StringVar()
-        self.vehicleThreeSpeedText = tk.StringVar()
-        self.vehicleFourSpeedText = tk.StringVar()
-        self.vehicleFiveSpeedText = tk.StringVar()
-        self.vehicleSixSpeedText = tk.StringVar()
-        self.vehicleSevenSpeedText = tk.StringVar()
-        self.vehicleEightSpeedText = tk.StringVar()
-        self.vehicleNineSpeedText = tk.StringVar()
-        self.receiverLocationText = tk.StringVar()
-        self.receiverSpeedText = tk.StringVar()
-        self.vehicleZeroRepText = tk.StringVar()
-        self.vehicleOneRepText = tk.StringVar()
-        self.vehicleTwoRepText = tk.StringVar()
-        self.vehicleThreeRepText = tk.StringVar()
-        self.vehicleFourRepText = tk.StringVar()
-        self.vehicleFiveRepText = tk.StringVar()
-        self.vehicleSixRepText = tk.StringVar()
-        self.vehicleSevenRepText = tk.StringVar()
-        self.vehicleEightRepText = tk.StringVar()
-        self.vehicleNineRepText = tk.StringVar()
-        self.receiverRepText = tk.StringVar()
+
+        # latest state of every vehicle, shown by the report frame
+        self.vehicleTable = VehicleTable()
+
+        # per-stage latency percentiles, shown by the latency frame
+        self.latencyTracker = LatencyTracker()
+        self.latencyRefreshMs = 500
 
         self.root.title("V2X Communications - Security Testbed")
 
@@ -162,10 +153,20 @@ class TkGUI:
         self.report = LabelFrame(self.topRight, text="Vehicle Information")
         self.build_report_frame()
 
+        # build the latency frame
+        self.latency = LabelFrame(self.topRight, text="Latency (ms)")
+        self.build_latency_frame()
+
         self.attackLog = tk.Text(self.root, font=20, bg="white", borderwidth=2)
         self.attackLog.tag_configure("attack", foreground="red")
         self.attackLog.tag_configure("information", foreground="orange")
 
+        # log entries are formatted by the receiver and inserted by the Tk thread once per frame
+        self.messageLog = MessageLog(self.textWidget, max_lines=max_log_lines, trim_lines=max(max_log_lines // 4, 1),
+                                     spill_path=log_spill_path)
+        self.attackMessageLog = MessageLog(self.attackLog, max_lines=max_log_lines,
+                                           trim_lines=max(max_log_lines // 4, 1))
+
         # Place core elements on canvas
         self.textWidget.grid(row=1, column=0, sticky="w")
         self.canvas.grid(row=0, column=0, sticky="nw")
@@ -178,6 +179,7 @@ class TkGUI:
         self.counters.grid(row=0, column=0, sticky="new")
         self.legend.grid(row=1, column=0, sticky="ew")
         self.report.grid(row=2, column=0, sticky="ew")
+        self.latency.grid(row=3, column=0, sticky="ew")
 
         print("GUI loaded...")
 
@@ -188,147 +190,161 @@ class TkGUI:
         self.root.mainloop()
 
     def run_gui_receiver(self):
-        # Start the GUI service on port 6666
-        s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-        s.bind(('127.0.0.1', 9999))
+        # Start the GUI service on the listening ports (9999 by default) in its own event loop
+        self.receiver = Thread(target=asyncio.run, args=(self.receive(),))
+        self.receiver.start()
 
-        labelThread = Thread(target=self.update_statistics_labels)
-        labelThread.start()
+        self.root.after(self.frame_interval_ms, self.render_pending_packets)
+        self.root.after(self.statisticsRefreshMs, self.update_statistics_labels)
+        self.root.after(self.latencyRefreshMs, self.update_latency_labels)
 
-        self.receiver = Thread(target=self.receive, args=(s,))
-        self.receiver.start()
+    async def receive(self):
 
-    def receive(self, s):
+        async with GuiIngestServer(ports=self.listenPorts, decoder=bsm_decoder.decode_datagrams) as server:
+            async for records in server.batches():
+                self.process_records(records)
 
-        # s.listen()
-        # c = s.accept()[0]
-        # print("Connection!")
+    def process_records(self, records):
+        # counters and headings are computed for the whole batch at once
+        self.packetCounters.add(**bsm_decoder.packet_counts(records))
+        self.latencyTracker.record(records)
+        headings = bsm_decoder.heading_buckets(records["heading"]).tolist()
 
-        while True:
+        messages = []
+        attacks = []
+        for data, heading in zip(records.tolist(), headings):
             # try:
-            msg = s.recvfrom(1024)[0]
-            print("Received", msg)
-
-            data = struct.unpack("<5f??ff", msg)
+            isReceiver = True if data[8] == bsm_decoder.RECEIVER_ID else False
+            self.render_queue.put((data[8], data[0], data[1], heading, data[5], data[6], isReceiver, data[7], data[3],
+                                   data[9], data[12]))
 
-            if not data[8] == 99:
-                self.receivedPacketCount += 1
-                self.intactPacketCount += 1
+            if not isReceiver:
+                self.format_log_entries(data[0], data[1], heading, data[5], data[6], data[7], messages, attacks)
+
+            # except Exception as e:
+            #     print("=====================================================================================")
+            #     print("Error processing packet. Exception type:")
+            #     print(type(e))
+            #     print("")
+            #     print("Error message:")
+            #     print(e)
+            #     print("End error message")
+            #     print("=====================================================================================")
+
+        self.messageLog.write(messages)
+        if attacks:
+            self.attackMessageLog.write(attacks)
+
+    def format_log_entries(self, x, y, heading, isValid, isRecent, elapsedTime, messages, attacks):
+        # appends the (text, tag) log entries for one packet from another vehicle
+        check = u'\u2713'
+        rejected = u'\u2716'
+
+        messages.append(("==========================================\n", "black"))
+        if isValid:
+            messages.append((check + "Message successfully authenticated\n", "valid"))
+        else:
+            messages.append((rejected + "Invalid signature!\n", "attack"))
 
-                if data[5]:
-                    self.authenticatedPacketCount += 1
-                if data[7]:
-                    self.onTimePacketCount += 1
+        if isRecent:
+            if elapsedTime > 0:
+                messages.append((check + "Message is recent: " + str(
+                    round(elapsedTime, 2)) + " milliseconds elapsed since transmission\n", "valid"))
+            else:
+                messages.append((check + "Message is recent: 0 milliseconds elapsed since transmission\n", "valid"))
+        else:
+            messages.append((rejected + "Message out-of-date: " + str(
+                round(elapsedTime, 2)) + " milliseconds elapsed since transmission\n", "information"))
+
+        if not isValid and not isRecent:
+            messages.append((rejected + "!!!--- Invalid signature AND message expired: "
+                                        "replay attack likely! ---!!!\n", "attack"))
+            attacks.append(("Expired packet received: possible replay attack\n", "information"))
+
+        messages.append(("Vehicle reports location at (" + str(float(x)) + "," + str(
+            float(y)) + "), traveling " + heading_to_direction(heading) + "\n", "black"))
+
+        messages.append(("==========================================\n", "black"))
+
+    def render_pending_packets(self):
+        # runs on the Tk thread; applies at most one batch of packets per frame and reschedules itself
+        generatedTimes = []
+        forwardedTimes = []
+        for carid, x, y, heading, isValid, isRecent, isReceiver, elapsedTime, speed, generatedTime, forwardedTime in \
+                self.render_queue.drain(self.max_packets_per_frame):
+            self.update_vehicle_info_labels(carid, "(" + str(x) + "," + str(y) + ")", str(speed), "0")
+            self.new_packet(carid, x, y, heading, isValid, isRecent, isReceiver, elapsedTime)
+            if not isReceiver:
+                generatedTimes.append(generatedTime)
+                forwardedTimes.append(forwardedTime)
 
-            self.update_vehicle_info_labels(data[8], "(" + str(data[0]) + "," + str(data[1]) + ")",
-                                            str(data[3]), "0")
+        self.refresh_vehicle_info()
+        self.messageLog.flush()
+        self.attackMessageLog.flush()
 
-            update = Thread(target=self.new_packet, args=(
-                self.threadlock, data[8], data[0], data[1], numerical_heading_to_direction(data[4]), data[5],
-                data[6], True if data[8] == 99 else False, data[7])
-                            )
-            update.start()
+        # only the packets drawn by this frame are rendered; the rest are still queued, dropped or replaced
+        self.latencyTracker.rendered(generatedTimes, forwardedTimes)
 
-        # except Exception as e:
-        #     print("=====================================================================================")
-        #     print("Error processing packet. Exception type:")
-        #     print(type(e))
-        #     print("")
-        #     print("Error message:")
-        #     print(e)
-        #     print("End error message")
-        #     print("=====================================================================================")
+        self.root.after(self.frame_interval_ms, self.render_pending_packets)
 
-    def new_packet(self, lock, carid, x, y, heading, isValid, isRecent, isReceiver, elapsedTime):
+    def new_packet(self, carid, x, y, heading, isValid, isRecent, isReceiver, elapsedTime):
 
         # cast coordinates to integers
         x = float(x)
         y = float(y)
 
-        # load the appropriate image, depending on signature validation and whether the packet is local
-        i = None
+        # pick the appropriate image, depending on signature validation and whether the packet is local
         if isReceiver:
-            i = ImageTk.PhotoImage(Image.open("python_guis/pictures/receiver/" + heading + ".png"))
+            i = self.sprites.get(sprites.RECEIVER, heading)
+        elif isValid:
+            i = self.sprites.get(sprites.REGULAR, heading)
         else:
-            if isValid:
-                i = ImageTk.PhotoImage(Image.open("python_guis/pictures/" + heading + ".png"))
-            else:
-                i = ImageTk.PhotoImage(Image.open("python_guis/pictures/phantom/" + heading + ".png"))
+            i = self.sprites.get(sprites.PHANTOM, heading)
 
-        self.canvas.create_image(x, y, image=i, anchor=tk.CENTER, tags="car" + str(threading.currentThread().ident))
+        item = self.vehicleItems.get(carid)
+        if item is None:
+            self.vehicleItems[carid] = self.canvas.create_image(x, y, image=i, anchor=tk.CENTER,
+                                                                tags="car" + str(int(carid)))
+        else:
+            self.canvas.coords(item, x, y)
+            self.canvas.itemconfig(item, image=i)
 
-        with lock:
-            # print results
-            if not isReceiver:
-                check = u'\u2713'
-                rejected = u'\u2716'
-
-                self.textWidget.insert(tk.END, "==========================================\n", "black")
-                if isValid:
-
-                    self.textWidget.insert(tk.END, check + "Message successfully authenticated\n", "valid")
-                else:
-                    self.textWidget.insert(tk.END, rejected + "Invalid signature!\n", "attack")
-
-                if isRecent:
-                    if elapsedTime > 0:
-                        self.textWidget.insert(tk.END, check + "Message is recent: " + str(
-                            round(elapsedTime, 2)) + " milliseconds elapsed since transmission\n", "valid")
-                    else:
-                        self.textWidget.insert(tk.END,
-                                               check + "Message is recent: 0 milliseconds elapsed since transmission\n",
-                                               "valid")
-                else:
-                    self.textWidget.insert(tk.END, rejected + "Message out-of-date: " + str(
-                        round(elapsedTime, 2)) + " milliseconds elapsed since transmission\n", "information")
-
-                if not isValid and not isRecent:
-                    self.textWidget.insert(tk.END,
-                                           rejected + "!!!--- Invalid signature AND message expired: "
-                                                      "replay attack likely! ---!!!\n",
-                                           "attack")
-                    self.attackLog.insert(tk.END, "Expired packet received: possible replay attack\n", "information")
-                    self.attackLog.see(tk.END)
-
-                self.textWidget.insert(tk.END, "Vehicle reports location at (" + str(x) + "," + str(
-                    y) + "), traveling " + heading_to_direction(heading) + "\n", "black")
-
-                self.textWidget.insert(tk.END, "==========================================\n", "black")
-                self.textWidget.see(tk.END)
-        time.sleep(0.1)
-
-        self.canvas.delete("car" + str(threading.currentThread().ident))
         if not isReceiver:
-            self.processedPacketCount += 1
+            self.packetCounters.add(processed=1)
 
     def update_statistics_labels(self):
-        while True:
-            if self.receivedPacketCount == 0:
-                continue
-            self.receivedPacketCountText.set("Received:")
-            self.processedPacketCountText.set("Processed:")
-            self.authenticatedPacketCountText.set("Authentic:")
-            self.intactPacketCountText.set("Intact:")
-            self.onTimePacketCountText.set("On time:")
-
-            self.receivedPacketCountValueText.set(str(self.receivedPacketCount))
-            self.processedPacketCountValueText.set(str(self.processedPacketCount))
-            self.authenticatedPacketCountValueText.set(str(self.authenticatedPacketCount))
-            self.intactPacketCountValueText.set(str(self.intactPacketCount))
-            self.onTimePacketCountValueText.set(str(self.onTimePacketCount))
-
-            self.receivedPacketCountPercentageText.set(
-                str(round((self.receivedPacketCount / self.receivedPacketCount) * 100, 2)) + "%")
-            self.processedPacketCountPercentageText.set(
-                str(round((self.processedPacketCount / self.receivedPacketCount) * 100, 2)) + "%")
-            self.authenticatedPacketCountPercentageText.set(
-                str(round((self.authenticatedPacketCount / self.receivedPacketCount) * 100, 2)) + "%")
-            self.intactPacketCountPercentageText.set(
-                str(round((self.intactPacketCount / self.receivedPacketCount) * 100, 2)) + "%")
-            self.onTimePacketCountPercentageText.set(
-                str(round((self.onTimePacketCount / self.receivedPacketCount) * 100, 2)) + "%")
-
-            time.sleep(0.1)
+        # runs on the Tk thread; only touches the labels when a counter changed since the last refresh
+        if self.packetCounters.is_dirty(self.displayedCountersGeneration):
+            self.displayedCountersGeneration, counts = self.packetCounters.snapshot()
+            if counts["received"] > 0:
+                self.set_statistics_labels(counts)
+
+        self.root.after(self.statisticsRefreshMs, self.update_statistics_labels)
+
+    def set_statistics_labels(self, counts):
+        received = counts["received"]
+
+        self.receivedPacketCountText.set("Received:")
+        self.processedPacketCountText.set("Processed:")
+        self.authenticatedPacketCountText.set("Authentic:")
+        self.intactPacketCountText.set("Intact:")
+        self.onTimePacketCountText.set("On time:")
+
+        self.receivedPacketCountValueText.set(str(counts["received"]))
+        self.processedPacketCountValueText.set(str(counts["processed"]))
+        self.authenticatedPacketCountValueText.set(str(counts["authenticated"]))
+        self.intactPacketCountValueText.set(str(counts["intact"]))
+        self.onTimePacketCountValueText.set(str(counts["on_time"]))
+
+        self.receivedPacketCountPercentageText.set("100.0%")
+        self.processedPacketCountPercentageText.set(
+            str(round((counts["processed"] / received) * 100, 2)) + "%")
+        self.authenticatedPacketCountPercentageText.set(
+            str(round((counts["authenticated"] / received) * 100, 2)) + "%")
+        self.intactPacketCountPercentageText.set(
+            str(round((counts["intact"] / received) * 100, 2)) + "%")
+        self.onTimePacketCountPercentageText.set(
+            str(round((counts["on_time"] / received) * 100, 2)) + "%")
 
     def build_statistics_label_frame(self):
         self.receivedPacketCountLabel = Label(self.counters, textvariable=self.receivedPacketCountText)
@@ -368,21 +384,48 @@ class TkGUI:
         self.intactPacketCountPercentage.grid(row=3, column=2)
         self.ontimePacketCountPercentage.grid(row=4, column=2)
 
+    def build_latency_frame(self):
+        for column, percentile in enumerate(LatencyTracker.PERCENTILES):
+            Label(self.latency, text="p" + str(percentile)).grid(row=0, column=column + 1, padx=(10, 10))
+
+        self.latencyLabels = {}
+        for row, stage in enumerate(LatencyTracker.STAGES):
+            Label(self.latency, text=LatencyTracker.STAGE_LABELS[stage] + ":").grid(row=row + 1, column=0, sticky="w")
+            self.latencyLabels[stage] = []
+            for column in range(len(LatencyTracker.PERCENTILES)):
+                label = Label(self.latency, text="-")
+                label.grid(row=row + 1, column=column + 1, padx=(10, 10))
+                self.latencyLabels[stage].append(label)
+
+        # packets the render queue dropped or replaced with a newer packet of the same vehicle are never rendered
+        row = len(LatencyTracker.STAGES) + 1
+        Label(self.latency, text="Not rendered (packets):").grid(row=row, column=0, sticky="w")
+        self.notRenderedLabel = Label(self.latency, text="0")
+        self.notRenderedLabel.grid(row=row, column=1, padx=(10, 10))
+
+    def update_latency_labels(self):
+        # runs on the Tk thread
+        for stage, values in self.latencyTracker.summary().items():
+            for label, value in zip(self.latencyLabels[stage], values):
+                label.configure(text="-" if value is None else str(round(value, 2)))
+        self.notRenderedLabel.configure(text=str(self.render_queue.dropped + self.render_queue.coalesced))
+
+        self.root.after(self.latencyRefreshMs, self.update_latency_labels)
+
     def print_counters(self):
+        generation = 0
         while True:
-            print(str(self.receivedPacketCount))
-            print(str(self.processedPacketCount))
-            print(str(self.authenticatedPacketCount))
-            print(str(self.intactPacketCount))
-            print(str(self.onTimePacketCount))
+            generation, counts = self.packetCounters.wait_for_change(generation)
+            for field in PacketCounters.FIELDS:
+                print(str(counts[field]))
             time.sleep(2)
 
     def build_legend_frame(self):
         self.receiverRowLabel = Label(self.legend, text="  is the receiving vehicle")
         self.otherRowLabel = Label(self.legend, text="  are vehicles sendings BSMs")
 
-        self.receiverImg = ImageTk.PhotoImage(Image.open("python_guis/pictures/receiver/E.png"))
-        self.otherImg = ImageTk.PhotoImage(Image.open("python_guis/pictures/E.png"))
+        self.receiverImg = self.sprites.get(sprites.RECEIVER, "E")
+        self.otherImg = self.sprites.get(sprites.REGULAR, "E")
 
         self.receiverImage = Label(self.legend, image=self.receiverImg)
         self.otherImage = Label(self.legend, image=self.otherImg)
@@ -394,158 +437,18 @@ class TkGUI:
 
     def build_report_frame(self):
         self.totalVehiclesLabel = Label(self.report, text="Total vehicles: " + str(self.numVehicles))
+        self.totalVehiclesLabel.grid(row=0, column=0)
 
-        self.vehicleZeroID = Label(self.report, text="0")
-        self.vehicleOneID = Label(self.report, text="1")
-        self.vehicleTwoID = Label(self.report, text="2")
-        self.vehicleThreeID = Label(self.report, text="3")
-        self.vehicleFourID = Label(self.report, text="4")
-        self.vehicleFiveID = Label(self.report, text="5")
-        self.vehicleSixID = Label(self.report, text="6")
-        self.vehicleSevenID = Label(self.report, text="7")
-        self.vehicleEightID = Label(self.report, text="8")
-        self.vehicleNineID = Label(self.report, text="9")
-        self.receiverID = Label(self.report, text="Rcvr.")
-
-        self.vehicleZeroLocation = Label(self.report, textvariable=self.vehicleZeroLocationText)
-        self.vehicleOneLocation = Label(self.report, textvariable=self.vehicleOneLocationText)
-        self.vehicleTwoLocation = Label(self.report, textvariable=self.vehicleTwoLocationText)
-        self.vehicleThreeLocation = Label(self.report, textvariable=self.vehicleThreeLocationText)
-        self.vehicleFourLocation = Label(self.report, textvariable=self.vehicleFourLocationText)
-        self.vehicleFiveLocation = Label(self.report, textvariable=self.vehicleFiveLocationText)
-        self.vehicleSixLocation = Label(self.report, textvariable=self.vehicleSixLocationText)
-        self.vehicleSevenLocation = Label(self.report, textvariable=self.vehicleSevenLocationText)
-        self.vehicleEightLocation = Label(self.report, textvariable=self.vehicleEightLocationText)
-        self.vehicleNineLocation = Label(self.report, textvariable=self.vehicleNineLocationText)
-        self.receiverLocation = Label(self.report, textvariable=self.receiverLocationText)
-
-        self.vehicleZeroSpeed = Label(self.report, textvariable=self.vehicleZeroSpeedText)
-        self.vehicleOneSpeed = Label(self.report, textvariable=self.vehicleOneSpeedText)
-        self.vehicleTwoSpeed = Label(self.report, textvariable=self.vehicleTwoSpeedText)
-        self.vehicleThreeSpeed = Label(self.report, textvariable=self.vehicleThreeSpeedText)
-        self.vehicleFourSpeed = Label(self.report, textvariable=self.vehicleFourSpeedText)
-        self.vehicleFiveSpeed = Label(self.report, textvariable=self.vehicleFiveSpeedText)
-        self.vehicleSixSpeed = Label(self.report, textvariable=self.vehicleSixSpeedText)
-        self.vehicleSevenSpeed = Label(self.report, textvariable=self.vehicleSevenSpeedText)
-        self.vehicleEightSpeed = Label(self.report, textvariable=self.vehicleEightSpeedText)
-        self.vehicleNineSpeed = Label(self.report, textvariable=self.vehicleNineSpeedText)
-        self.receiverSpeed = Label(self.report, textvariable=self.receiverSpeedText)
-
-        self.vehicleZeroRep = Label(self.report, textvariable=self.vehicleZeroRepText)
-        self.vehicleOneRep = Label(self.report, textvariable=self.vehicleOneRepText)
-        self.vehicleTwoRep = Label(self.report, textvariable=self.vehicleTwoRepText)
-        self.vehicleThreeRep = Label(self.report, textvariable=self.vehicleThreeRepText)
-        self.vehicleFourRep = Label(self.report, textvariable=self.vehicleFourRepText)
-        self.vehicleFiveRep = Label(self.report, textvariable=self.vehicleFiveRepText)
-        self.vehicleSixRep = Label(self.report, textvariable=self.vehicleSixRepText)
-        self.vehicleSevenRep = Label(self.report, textvariable=self.vehicleSevenRepText)
-        self.vehicleEightRep = Label(self.report, textvariable=self.vehicleEightRepText)
-        self.vehicleNineRep = Label(self.report, textvariable=self.vehicleNineRepText)
-        self.receiverRep = Label(self.report, textvariable=self.receiverRepText)
-
-        self.totalVehiclesLabel.grid(row=0, column=1)
-
-        self.idLabel = Label(self.report, text="Vehicle ID")
-        self.locLabel = Label(self.report, text="Location")
-        self.speedLabel = Label(self.report, text="Speed (km/hr)")
-        self.reputationLabel = Label(self.report, text="Reputation")
-
-        self.idLabel.grid(row=1, column=0)
-        self.locLabel.grid(row=1, column=1, padx=(10, 10))
-        self.speedLabel.grid(row=1, column=2, padx=(10, 10))
-        self.reputationLabel.grid(row=1, column=3)
-
-        self.vehicleZeroID.grid(row=2, column=0)
-        self.vehicleOneID.grid(row=3, column=0)
-        self.vehicleTwoID.grid(row=4, column=0)
-        self.vehicleThreeID.grid(row=5, column=0)
-        self.vehicleFourID.grid(row=6, column=0)
-        self.vehicleFiveID.grid(row=7, column=0)
-        self.vehicleSixID.grid(row=8, column=0)
-        self.vehicleSevenID.grid(row=9, column=0)
-        self.vehicleEightID.grid(row=10, column=0)
-        self.vehicleNineID.grid(row=11, column=0)
-        self.receiverID.grid(row=12, column=0)
-
-        self.vehicleZeroLocation.grid(row=2, column=1, padx=(10, 10))
-        self.vehicleOneLocation.grid(row=3, column=1, padx=(10, 10))
-        self.vehicleTwoLocation.grid(row=4, column=1, padx=(10, 10))
-        self.vehicleThreeLocation.grid(row=5, column=1, padx=(10, 10))
-        self.vehicleFourLocation.grid(row=6, column=1, padx=(10, 10))
-        self.vehicleFiveLocation.grid(row=7, column=1, padx=(10, 10))
-        self.vehicleSixLocation.grid(row=8, column=1, padx=(10, 10))
-        self.vehicleSevenLocation.grid(row=9, column=1, padx=(10, 10))
-        self.vehicleEightLocation.grid(row=10, column=1, padx=(10, 10))
-        self.vehicleNineLocation.grid(row=11, column=1, padx=(10, 10))
-        self.receiverLocation.grid(row=12, column=1, padx=(10, 10))
-
-        self.vehicleZeroSpeed.grid(row=2, column=2)
-        self.vehicleOneSpeed.grid(row=3, column=2)
-        self.vehicleTwoSpeed.grid(row=4, column=2)
-        self.vehicleThreeSpeed.grid(row=5, column=2)
-        self.vehicleFourSpeed.grid(row=6, column=2)
-        self.vehicleFiveSpeed.grid(row=7, column=2)
-        self.vehicleSixSpeed.grid(row=8, column=2)
-        self.vehicleSevenSpeed.grid(row=9, column=2)
-        self.vehicleEightSpeed.grid(row=10, column=2)
-        self.vehicleNineSpeed.grid(row=11, column=2)
-        self.receiverSpeed.grid(row=12, column=2)
-
-        self.vehicleZeroRep.grid(row=2, column=3)
-        self.vehicleOneRep.grid(row=3, column=3)
-        self.vehicleTwoRep.grid(row=4, column=3)
-        self.vehicleThreeRep.grid(row=5, column=3)
-        self.vehicleFourRep.grid(row=6, column=3)
-        self.vehicleFiveRep.grid(row=7, column=3)
-        self.vehicleSixRep.grid(row=8, column=3)
-        self.vehicleSevenRep.grid(row=9, column=3)
-        self.vehicleEightRep.grid(row=10, column=3)
-        self.vehicleNineRep.grid(row=11, column=3)
-        self.receiverRep.grid(row=12, column=3)
+        self.vehicleTableView = VehicleTableView(self.report, self.vehicleTable,
+                                                 names={bsm_decoder.RECEIVER_ID: "Rcvr."})
+        self.vehicleTableView.grid(row=1, column=0, sticky="ew")
 
     def update_vehicle_info_labels(self, vehicle_id, location, speed, reputation):
-        vehicle_id = int(vehicle_id)
-        if vehicle_id == 0:
-            self.vehicleZeroLocationText.set(location)
-            self.vehicleZeroSpeedText.set(str(speed))
-            self.vehicleZeroRepText.set(str(reputation))
-        elif vehicle_id == 1:
-            self.vehicleOneLocationText.set(location)
-            self.vehicleOneSpeedText.set(str(speed))
-            self.vehicleOneRepText.set(str(reputation))
-        elif vehicle_id == 2:
-            self.vehicleTwoLocationText.set(location)
-            self.vehicleTwoSpeedText.set(str(speed))
-            self.vehicleTwoRepText.set(str(reputation))
-        elif vehicle_id == 3:
-            self.vehicleThreeLocationText.set(location)
-            self.vehicleThreeSpeedText.set(str(speed))
-            self.vehicleThreeRepText.set(str(reputation))
-        elif vehicle_id == 4:
-            self.vehicleFourLocationText.set(location)
-            self.vehicleFourSpeedText.set(str(speed))
-            self.vehicleFourRepText.set(str(reputation))
-        elif vehicle_id == 5:
-            self.vehicleFiveLocationText.set(location)
-            self.vehicleFiveSpeedText.set(str(speed))
-            self.vehicleFiveRepText.set(str(reputation))
-        elif vehicle_id == 6:
-            self.vehicleSixLocationText.set(location)
-            self.vehicleSixSpeedText.set(str(speed))
-            self.vehicleSixRepText.set(str(reputation))
-        elif vehicle_id == 7:
-            self.vehicleSevenLocationText.set(location)
-            self.vehicleSevenSpeedText.set(str(speed))
-            self.vehicleSevenRepText.set(str(reputation))
-        elif vehicle_id == 8:
-            self.vehicleEightLocationText.set(location)
-            self.vehicleEightSpeedText.set(str(speed))
-            self.vehicleEightRepText.set(str(reputation))
-        elif vehicle_id == 9:
-            self.vehicleNineLocationText.set(location)
-            self.vehicleNineSpeedText.set(str(speed))
-            self.vehicleNineRepText.set(str(reputation))
-        elif vehicle_id == 99:
-            self.receiverLocationText.set(location)
-            self.receiverSpeedText.set(str(speed))
-            self.receiverRepText.set(str(reputation))
+        self.vehicleTable.update(int(vehicle_id), location, str(speed), str(reputation))
+
+    def refresh_vehicle_info(self):
+        # runs on the Tk thread once per frame; only visible rows that changed are redrawn
+        self.vehicleTableView.refresh()
+        if len(self.vehicleTable) != self.numVehicles:
+            self.numVehicles = len(self.vehicleTable)
+            self.totalVehiclesLabel.configure(text="Total vehicles: " + str(self.numVehicles))
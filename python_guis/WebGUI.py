@@ -1,11 +1,16 @@
 #  Copyright (c) 2022. Geoff Twardokus
 #  Reuse permitted under the MIT License as specified in the LICENSE file within this project.
 
+import asyncio
 import eel
 import threading
-import socket
 import logging
-import struct
+
+from python_guis import bsm_decoder
+from python_guis.counters import PacketCounters
+from python_guis.frame_batch import FrameBatch
+from python_guis.ingest import GuiIngestServer
+from python_guis.latency import LatencyTracker
 
 
 class WebGUI:
@@ -13,9 +18,16 @@ class WebGUI:
 
     :param enable_logging: choice of whether to enable console logging for GUI, defaults to False
     :type enable_logging: bool
+    :param listen_ports: UDP ports on which to receive BSM data from V2Verifier, defaults to (6666,)
+    :type listen_ports: tuple
+    :param frame_interval: seconds between batches of marker and log updates sent to the browser, defaults to 0.05
+    :type frame_interval: float
+    :param max_log_entries: the number of messages the browser keeps in its log, defaults to 500
+    :type max_log_entries: int
     """
 
-    def __init__(self, enable_logging: bool = False):
+    def __init__(self, enable_logging: bool = False, listen_ports: tuple = (6666,), frame_interval: float = 0.05,
+                 max_log_entries: int = 500):
         """WebGUI constructor
         """
 
@@ -28,7 +40,7 @@ class WebGUI:
             ch.setLevel(logging.INFO)
             self.logger.addHandler(ch)
 
-        self.receive_socket = None
+        self.listen_ports = listen_ports
         self.thread_lock = threading.Lock()
 
         #
@@ -40,17 +52,23 @@ class WebGUI:
         #     self.num_vehicles - 1
         # )
 
-        self.received_packets = 0
-        self.processed_packets = 0
-        self.authenticated_packets = 0
-        self.intact_packets = 0
-        self.on_time_packets = 0
+        self.packet_counters = PacketCounters()
+        self.stats_refresh_interval = 0.1
+
+        # marker moves and log messages are sent to the browser once per frame instead of once per packet
+        self.frame_batch = FrameBatch(max_messages=max_log_entries)
+        self.frame_interval = frame_interval
+        self.max_log_entries = max_log_entries
+
+        # per-stage latency percentiles, sent to the browser with every frame
+        self.latency_tracker = LatencyTracker()
 
         if self.logging_enabled:
             self.logger.info("Initialized GUI")
 
-    def update_vehicle(self, vehicle_id: int, latitude: float, longitude: float, icon_path: str) -> None:
-        """Update the GUI marker for a given vehicle
+    def update_vehicle(self, vehicle_id: int, latitude: float, longitude: float, icon_path: str,
+                       generated_time: int = 0, forwarded_time: int = 0) -> None:
+        """Update the GUI marker for a given vehicle in the next frame
 
         :param vehicle_id: the ID number of the vehicle whose marker is being updated
         :type vehicle_id: int
@@ -60,20 +78,23 @@ class WebGUI:
         :type longitude: float
         :param icon_path: the file path to an image to use as the marker on the map
         :type icon_path: str
+        :param generated_time: when the packet was generated, in microseconds since the epoch, defaults to 0 (unknown)
+        :type generated_time: int
+        :param forwarded_time: when the packet was forwarded to the GUI, in microseconds since the epoch, defaults to 0
+        :type forwarded_time: int
         """
         if self.logging_enabled:
             self.logger.info(f"moving vehicle {vehicle_id} to {latitude}, {longitude}")
 
-        # EEL exposes this function in main.html
-        eel.updateMarker(vehicle_id, latitude, longitude, icon_path)
+        self.frame_batch.move_marker(vehicle_id, latitude, longitude, icon_path, generated_time, forwarded_time)
 
     def add_message(self, message: str) -> None:
-        """Wrapper method for eel.addMessage() exposed in main.html
+        """Add a message to the GUI's log in the next frame
 
         :param message: the message that EEL should render on the GUI
         :type message: str
         """
-        eel.addMessage(message)
+        self.frame_batch.add_message(message)
 
     def prep(self):
         """Wrapper method for eel.init() to initialize EEL in this project's web directory
@@ -92,87 +113,115 @@ class WebGUI:
         )
 
     def start_receiver(self) -> None:
-        """Initialize web sockets to receive BSM data from V2Verifier and launch threads to receive/render data
+        """Launch threads to receive BSM data from V2Verifier and to render the packet statistics and each frame
         """
         if self.logging_enabled:
-            self.logger.info("called start_receiver, creating socket")
-
-        self.receive_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-        self.receive_socket.bind(("127.0.0.1", 6666))
+            self.logger.info("called start_receiver, starting ingest server")
 
         label_thread = threading.Thread(target=self.update_stats_labels)
         label_thread.start()
 
-        receiver = threading.Thread(target=self.receive)
+        frame_thread = threading.Thread(target=self.send_frames)
+        frame_thread.start()
+
+        receiver = threading.Thread(target=asyncio.run, args=(self.receive(),))
         receiver.start()
 
     def update_stats_labels(self) -> None:
-        """Continuously update the packet statistics displayed on the GUI
+        """Push the packet statistics to the GUI whenever they change, at most once per stats_refresh_interval
+
+        Blocks while no packets arrive, and coalesces all changes made during one interval into a single
+        eel.updatePacketCounts call.
         """
 
         if self.logging_enabled:
             self.logger.info("starting update_stats_labels")
 
+        generation = 0
         while True:
-
-            if self.received_packets == 0:
-                continue
+            generation, counts = self.packet_counters.wait_for_change(generation)
 
             # exposed by EEL in main.html
             eel.updatePacketCounts(
-                self.received_packets,
-                self.processed_packets,
-                self.authenticated_packets,
-                self.intact_packets,
-                self.on_time_packets,
+                counts["received"],
+                counts["processed"],
+                counts["authenticated"],
+                counts["intact"],
+                counts["on_time"],
             )
 
-            eel.sleep(0.1)
+            eel.sleep(self.stats_refresh_interval)
+
+    def send_frames(self) -> None:
+        """Send the marker moves and log messages collected during each frame interval in one eel.applyBatch call
 
-    def receive(self) -> None:
-        """Listen for BSM data being sent from V2Verifier receiver and spawn thread to update rendered data
-        accordingly
+        Blocks while no packets arrive. Payloads are small and constant-size per frame regardless of the packet rate:
+        one marker per vehicle, at most max_log_entries messages and the latency percentiles of every stage. The
+        packets behind the frame's markers count as rendered once it has been handed to the browser; packets whose
+        marker move was replaced by a newer one are counted as not rendered.
         """
+
         if self.logging_enabled:
-            self.logger.info("starting receive")
+            self.logger.info("starting send_frames")
 
         while True:
-            msg = self.receive_socket.recv(2048)
-            data = struct.unpack("!5f??f", msg)
-
-            if self.logging_enabled:
-                self.logger.info("received data")
-
-            self.received_packets += 1
-
-            if data[5]:
-                self.authenticated_packets += 1
-                self.intact_packets += 1
-
-            if data[6]:
-                self.on_time_packets += 1
-
-            update = threading.Thread(
-                target=self.process_new_packet,
-                args=(
-                    0,  # data["id"],
-                    data[0],  # latitude (formerly data["x"])
-                    data[1],  # longitude (formerly data["y"])
-                    data[2],  # elevation
-                    data[3],  # speed
-                    "N",
-                    # data[4],  # heading (formerly ["heading"])
-                    data[5],  # valid_signature (formerly data["sig"])
-                    data[6],  # unexpired (formerly data["recent"])
-                    False,  # data["receiver"]
-                    data[7],  # elapsed_time (formerly data["elapsed"])
-                ),
+            self.frame_batch.wait()
+            eel.sleep(self.frame_interval)
+
+            batch = self.frame_batch.take()
+            if batch is not None:
+                times = batch.pop("times")
+                batch["logCapacity"] = self.max_log_entries
+                batch["latency"] = self.latency_tracker.summary()
+                batch["notRendered"] = self.frame_batch.coalesced
+                # exposed by EEL in main.html
+                eel.applyBatch(batch)
+                if times:
+                    self.latency_tracker.rendered(*zip(*times))
+
+    async def receive(self) -> None:
+        """Listen for BSM data being sent from V2Verifier receiver on every listening port and spawn thread to
+        update rendered data accordingly
+        """
+        if self.logging_enabled:
+            self.logger.info("starting receive")
+
+        async with GuiIngestServer(ports=self.listen_ports, decoder=bsm_decoder.decode_datagrams) as server:
+            async for records in server.batches():
+                self.process_records(records)
+
+    def process_records(self, records) -> None:
+        """Update the packet statistics for a batch of decoded records and queue each of them for the next frame
+
+        :param records: the decoded records
+        :type records: np.ndarray
+        """
+        if self.logging_enabled:
+            self.logger.info(f"received {len(records)} records")
+
+        self.packet_counters.add(**bsm_decoder.packet_counts(records))
+        self.latency_tracker.record(records)
+        headings = bsm_decoder.heading_buckets(records["heading"]).tolist()
+
+        for data, heading in zip(records.tolist(), headings):
+            self.process_new_packet(
+                int(data[8]),  # vehicle_id
+                data[0],  # latitude
+                data[1],  # longitude
+                data[2],  # elevation
+                data[3],  # speed
+                heading,
+                data[5],  # valid_signature
+                data[6],  # unexpired
+                data[8] == bsm_decoder.RECEIVER_ID,
+                data[7],  # elapsed_time
+                data[9],  # generated_time
+                data[12],  # forwarded_time
             )
-            update.start()
 
     def process_new_packet(self, vehicle_id: int, latitude: float, longitude: float, elevation: float,
                            speed: float, heading: float, is_valid: bool, is_recent: bool, is_receiver: bool,
-                           elapsed_time: float) -> None:
+                           elapsed_time: float, generated_time: int = 0, forwarded_time: int = 0) -> None:
         """Method to render data from a BSM on the GUI
 
         :param vehicle_id: the ID number of the vehicle which sent the message
@@ -195,6 +244,10 @@ class WebGUI:
         :type is_receiver: bool
         :param elapsed_time: the time elapsed between the BSM's generation time and the time this method is called
         :type elapsed_time: float
+        :param generated_time: when the BSM was generated, in microseconds since the epoch, defaults to 0 (unknown)
+        :type generated_time: int
+        :param forwarded_time: when the receiver forwarded the BSM, in microseconds since the epoch, defaults to 0
+        :type forwarded_time: int
         """
 
         if self.logging_enabled:
@@ -208,7 +261,10 @@ class WebGUI:
         else:
             icon = f"/images/phantom/{heading}.png"
 
-        self.update_vehicle(vehicle_id, latitude, longitude, icon)
+        # the receiver's own position has no stage latencies
+        if is_receiver:
+            generated_time = forwarded_time = 0
+        self.update_vehicle(vehicle_id, latitude, longitude, icon, generated_time, forwarded_time)
 
         # print messages to gui
 
@@ -230,7 +286,7 @@ class WebGUI:
 
             else:
                 rounded_time = str(round(elapsed_time, 2))
-                message += '<p class="tab">❌ Message is out-of-date: {rounded_time} ms since transmission<p>'
+                message += f'<p class="tab">❌ Message is out-of-date: {rounded_time} ms since transmission<p>'
 
             if not is_valid and not is_recent:
                 message += '<p class="tab">❌❌❌ Invalid signature and message expired, replay attack likely ❌❌❌</p>'
@@ -238,4 +294,4 @@ class WebGUI:
             message += f'<p class="tab">Vehicle reports location at {latitude}, {longitude} traveling {heading}<p>'
             self.add_message(message)
 
-            self.processed_packets += 1
+            self.packet_counters.add(processed=1)
@@ -0,0 +1,154 @@
+#  Copyright (c) 2022. Geoff Twardokus
+#  Reuse permitted under the MIT License as specified in the LICENSE file within this project.
+
+import logging
+
+import numpy as np
+
+from python_guis import gui_schema
+
+
+logger = logging.getLogger(__name__)
+
+# Mirrors gui_schema.RECORD_V1, the version 1 packed_bsm_for_gui struct (little-endian, no padding)
+GUI_RECORD_V1_DTYPE = np.dtype([
+    ("latitude", "<f4"),
+    ("longitude", "<f4"),
+    ("elevation", "<f4"),
+    ("speed", "<f4"),
+    ("heading", "<f4"),
+    ("authenticated", "?"),
+    ("on_time", "?"),
+    ("elapsed_time", "<f4"),
+    ("vehicle_id", "<f4"),
+])
+
+# Mirrors gui_schema.RECORD, i.e., the packed_bsm_for_gui struct in include/bsm.h: version 1 plus the time (in
+# microseconds since the epoch) at which the SPDU was generated, received, verified and forwarded to the GUI
+GUI_RECORD_DTYPE = np.dtype(GUI_RECORD_V1_DTYPE.descr + [
+    ("generated_time", "<i8"),
+    ("received_time", "<i8"),
+    ("verified_time", "<i8"),
+    ("forwarded_time", "<i8"),
+])
+
+# record layouts by GUI record version
+GUI_RECORD_DTYPES = {
+    1: GUI_RECORD_V1_DTYPE,
+    2: GUI_RECORD_DTYPE,
+}
+
+# the vehicle ID the receiver uses when it reports its own position
+RECEIVER_ID = 99
+
+# Compass buckets used by numerical_heading_to_direction in TkGUI: a heading falls into the bucket whose upper edge
+# is the first edge greater than or equal to it, with both ends of the circle mapping to north
+HEADING_BUCKET_EDGES = np.array([22.5, 67.5, 112.5, 157.5, 202.5, 247.5, 292.5, 337.5], dtype=np.float32)
+HEADING_BUCKET_NAMES = np.array(["N", "NE", "E", "SE", "S", "SW", "W", "NW", "N"])
+
+
+def decode_batch(buffer) -> np.ndarray:
+    """Decode a buffer of back-to-back packed_bsm_for_gui records without copying it
+
+    :param buffer: any object supporting the buffer protocol whose length is a multiple of the record size
+    :type buffer: bytes
+    :return: a read-only structured array (GUI_RECORD_DTYPE) viewing the buffer
+    :rtype: np.ndarray
+    """
+    return np.frombuffer(buffer, dtype=GUI_RECORD_DTYPE)
+
+
+def upgrade_records(records: np.ndarray, version: int) -> np.ndarray:
+    """Convert records of an older GUI record version to GUI_RECORD_DTYPE, leaving fields it lacks zero
+
+    :param records: a structured array of GUI_RECORD_DTYPES[version]
+    :type records: np.ndarray
+    :param version: the records' GUI record version
+    :type version: int
+    :return: a structured array (GUI_RECORD_DTYPE)
+    :rtype: np.ndarray
+    """
+    if version == gui_schema.VERSION:
+        return records
+
+    upgraded = np.zeros(len(records), dtype=GUI_RECORD_DTYPE)
+    for field in GUI_RECORD_DTYPES[version].names:
+        upgraded[field] = records[field]
+    return upgraded
+
+
+def decode_datagrams(datagrams: list) -> np.ndarray:
+    """Decode a batch of GUI datagrams (see gui_schema) that each carry one or more records
+
+    Datagrams that do not follow the wire format are logged and skipped. Records of older versions are upgraded to
+    the current one.
+
+    :param datagrams: the raw datagrams
+    :type datagrams: list
+    :return: a structured array (GUI_RECORD_DTYPE) with every record in arrival order
+    :rtype: np.ndarray
+    """
+    payloads = []
+    current = True
+    for datagram in datagrams:
+        try:
+            version, payload = gui_schema.record_payload(datagram)
+            payloads.append((version, payload))
+            current = current and version == gui_schema.VERSION
+        except gui_schema.SchemaError as e:
+            logger.warning(f"dropping malformed GUI datagram: {e}")
+
+    if current:
+        if len(payloads) == 1:
+            return decode_batch(payloads[0][1])
+        return decode_batch(b"".join(payload for version, payload in payloads))
+
+    return np.concatenate([upgrade_records(np.frombuffer(payload, dtype=GUI_RECORD_DTYPES[version]), version)
+                           for version, payload in payloads])
+
+
+def load_records(path: str, version: int = gui_schema.VERSION) -> np.ndarray:
+    """Memory-map a file of back-to-back packed_bsm_for_gui records for offline analysis
+
+    :param path: path to the file
+    :type path: str
+    :param version: the GUI record version the file was written with, defaults to gui_schema.VERSION
+    :type version: int
+    :raises gui_schema.SchemaError: if the version is unknown
+    :return: a structured array (GUI_RECORD_DTYPE); read-only and backed by the file for current versions, a copy
+        for older versions
+    :rtype: np.ndarray
+    """
+    if version not in GUI_RECORD_DTYPES:
+        raise gui_schema.SchemaError(f"unsupported GUI record version {version}")
+    return upgrade_records(np.memmap(path, dtype=GUI_RECORD_DTYPES[version], mode="r"), version)
+
+
+def heading_buckets(headings: np.ndarray) -> np.ndarray:
+    """Vectorized equivalent of numerical_heading_to_direction
+
+    :param headings: headings in degrees
+    :type headings: np.ndarray
+    :return: the compass direction ("N", "NE", ...) of every heading
+    :rtype: np.ndarray
+    """
+    headings = np.asarray(headings, dtype=np.float32)
+    corrected = np.where(headings < 0, headings + 360, np.where(headings > 359, headings % 360, headings))
+    return HEADING_BUCKET_NAMES[np.searchsorted(HEADING_BUCKET_EDGES, corrected, side="left")]
+
+
+def packet_counts(records: np.ndarray) -> dict:
+    """Count received, authenticated and on-time packets in a batch, ignoring the receiver's own reports
+
+    :param records: a structured array of GUI_RECORD_DTYPE
+    :type records: np.ndarray
+    :return: counter increments suitable for PacketCounters.add()
+    :rtype: dict
+    """
+    remote = records[records["vehicle_id"] != RECEIVER_ID]
+    return {
+        "received": len(remote),
+        "intact": len(remote),
+        "authenticated": int(np.count_nonzero(remote["authenticated"])),
+        "on_time": int(np.count_nonzero(remote["on_time"])),
+    }
@@ -0,0 +1,269 @@
+#  Copyright (c) 2022. Geoff Twardokus
+#  Reuse permitted under the MIT License as specified in the LICENSE file within this project.
+
+"""Recording and replay of the GUI record stream forwarded by the V2Verifier receiver
+
+A capture file is a 24-byte header followed by fixed-size entries, each an 8-byte receive timestamp (nanoseconds
+since the epoch) and one packed_bsm_for_gui record, all little-endian. Because every entry has the same size the file
+is its own index: entry i starts at HEADER.size + i * ENTRY_DTYPE.itemsize, the number of entries follows from the
+file size, and files can be appended to or cut at any entry boundary. Captures of older GUI record versions are
+upgraded to the current version when they are loaded.
+"""
+
+import socket
+import struct
+import time
+
+import numpy as np
+
+from python_guis import bsm_decoder
+from python_guis import gui_schema
+from python_guis.ingest import GuiIngestServer
+
+
+MAGIC = b"V2VGUICP"
+VERSION = 1
+
+# magic, capture format version, GUI record version, entry size, created (ns since the epoch)
+HEADER = struct.Struct("<8sHHHxxq")
+
+ENTRY_DTYPE = np.dtype([
+    ("timestamp_ns", "<i8"),
+    ("record", bsm_decoder.GUI_RECORD_DTYPE),
+])
+
+# entry layouts by GUI record version
+ENTRY_DTYPES = {
+    version: np.dtype([("timestamp_ns", "<i8"), ("record", record_dtype)])
+    for version, record_dtype in bsm_decoder.GUI_RECORD_DTYPES.items()
+}
+
+# stage timestamps of the records (microseconds since the epoch), shifted to the time of replay
+STAGE_TIME_FIELDS = ("generated_time", "received_time", "verified_time", "forwarded_time")
+
+
+class CaptureError(ValueError):
+    """Raised when a file is not a capture this module can read
+    """
+
+
+def read_header(path: str) -> tuple:
+    """Read and validate a capture file's header
+
+    :param path: path to the capture file
+    :type path: str
+    :raises CaptureError: if the file is not a compatible capture
+    :return: the GUI record version and creation time (ns since the epoch)
+    :rtype: tuple
+    """
+    with open(path, "rb") as capture_file:
+        header = capture_file.read(HEADER.size)
+
+    if len(header) < HEADER.size:
+        raise CaptureError(f"{path} is too short to be a capture")
+
+    magic, version, record_version, entry_size, created = HEADER.unpack(header)
+    if magic != MAGIC:
+        raise CaptureError(f"{path} is not a GUI capture")
+    if version != VERSION:
+        raise CaptureError(f"unsupported capture version {version}")
+    if record_version not in ENTRY_DTYPES:
+        raise CaptureError(f"unsupported GUI record version {record_version}")
+    if entry_size != ENTRY_DTYPES[record_version].itemsize:
+        raise CaptureError(f"capture entries are {entry_size} bytes, expected {ENTRY_DTYPES[record_version].itemsize}")
+
+    return record_version, created
+
+
+def load(path: str) -> np.ndarray:
+    """Memory-map every complete entry of a capture file
+
+    :param path: path to the capture file
+    :type path: str
+    :raises CaptureError: if the file is not a compatible capture
+    :return: a read-only structured array (ENTRY_DTYPE) backed by the file, or an upgraded copy for captures of
+        older GUI record versions
+    :rtype: np.ndarray
+    """
+    record_version, _ = read_header(path)
+    entry_dtype = ENTRY_DTYPES[record_version]
+
+    with open(path, "rb") as capture_file:
+        capture_file.seek(0, 2)
+        count = (capture_file.tell() - HEADER.size) // entry_dtype.itemsize
+
+    if count == 0:
+        return np.zeros(0, dtype=ENTRY_DTYPE)
+    entries = np.memmap(path, dtype=entry_dtype, mode="r", offset=HEADER.size, shape=(count,))
+    if record_version == gui_schema.VERSION:
+        return entries
+
+    upgraded = np.empty(count, dtype=ENTRY_DTYPE)
+    upgraded["timestamp_ns"] = entries["timestamp_ns"]
+    upgraded["record"] = bsm_decoder.upgrade_records(entries["record"], record_version)
+    return upgraded
+
+
+class CaptureRecorder:
+    """Records every GUI record received on the GUI ports into a capture file
+
+    Records are appended in batches, timestamped when their batch was read from the socket. An existing capture is
+    appended to.
+
+    :param path: path to the capture file
+    :type path: str
+    :param ports: UDP ports to listen on, defaults to (9999,)
+    :type ports: tuple
+    :param host: address to bind, defaults to "127.0.0.1"
+    :type host: str
+    """
+
+    def __init__(self, path: str, ports: tuple = (9999,), host: str = "127.0.0.1"):
+        """CaptureRecorder constructor
+        """
+        self.path = path
+        self.ports = tuple(ports)
+        self.host = host
+        self.recorded = 0
+
+    async def run(self, duration: float = None) -> None:
+        """Record until duration seconds have passed (or forever)
+
+        :param duration: how long to record in seconds, defaults to None (until cancelled)
+        :type duration: float
+        """
+        with open(self.path, "ab") as capture_file:
+            if capture_file.tell() == 0:
+                capture_file.write(HEADER.pack(MAGIC, VERSION, gui_schema.VERSION, ENTRY_DTYPE.itemsize,
+                                               time.time_ns()))
+            elif read_header(self.path)[0] != gui_schema.VERSION:
+                raise CaptureError(f"cannot append GUI record version {gui_schema.VERSION} records to {self.path}")
+
+            async with GuiIngestServer(ports=self.ports, host=self.host,
+                                       decoder=bsm_decoder.decode_datagrams) as server:
+                if duration is not None:
+                    server.loop.call_later(duration, server.close)
+
+                async for records in server.batches():
+                    entries = np.empty(len(records), dtype=ENTRY_DTYPE)
+                    entries["timestamp_ns"] = time.time_ns()
+                    entries["record"] = records
+
+                    capture_file.write(entries.tobytes())
+                    capture_file.flush()
+                    self.recorded += len(entries)
+
+
+class CaptureReplayer:
+    """Re-emits a capture file to a GUI port with the original timing, sped up, or as fast as possible
+
+    The capture is memory-mapped and sent in slices of due entries, so memory use stays flat for captures of any
+    size. Entries are paced by their timestamps relative to the first entry: the replayer sleeps until shortly before
+    the next entry is due and spins for the rest, so send times track the schedule to well under a millisecond.
+    The records' stage timestamps are moved forward by the time since they were captured, so the GUIs' latency
+    panels show the original latencies up to forwarding and the replayed ones from there on.
+
+    :param path: path to the capture file
+    :type path: str
+    :param port: UDP port of the GUI, defaults to 9999
+    :type port: int
+    :param host: address of the GUI, defaults to "127.0.0.1"
+    :type host: str
+    :param records_per_datagram: the most records sent in one datagram, defaults to 1
+    :type records_per_datagram: int
+    """
+
+    # sleeping is only accurate to about a millisecond, so the last stretch before a deadline is spun
+    SPIN_SECONDS = 0.001
+
+    def __init__(self, path: str, port: int = 9999, host: str = "127.0.0.1", records_per_datagram: int = 1):
+        """CaptureReplayer constructor
+        """
+        if not 1 <= records_per_datagram <= gui_schema.MAX_RECORDS_PER_DATAGRAM:
+            raise ValueError(f"records_per_datagram must be between 1 and {gui_schema.MAX_RECORDS_PER_DATAGRAM}")
+
+        self.entries = load(path)
+        self.address = (host, port)
+        self.records_per_datagram = records_per_datagram
+
+        self.sent = 0
+        self.max_lag = 0.0
+
+    def replay(self, speed: float = 1.0, start: int = 0, stop: int = None) -> None:
+        """Send the capture's records
+
+        :param speed: playback speed relative to the recording (2.0 is twice as fast), or 0 for as fast as possible,
+            defaults to 1.0
+        :type speed: float
+        :param start: index of the first entry to send, defaults to 0
+        :type start: int
+        :param stop: index after the last entry to send, defaults to the end of the capture
+        :type stop: int
+        """
+        entries = self.entries[start:stop]
+        if len(entries) == 0:
+            return
+
+        timestamps = entries["timestamp_ns"]
+        first_timestamp = int(timestamps[0])
+        started = time.perf_counter()
+
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+            position = 0
+            while position < len(entries):
+                if speed > 0:
+                    due = started + (int(timestamps[position]) - first_timestamp) / 1e9 / speed
+                    self.wait_until(due)
+                    self.max_lag = max(self.max_lag, time.perf_counter() - due)
+
+                    # everything that has fallen due by now goes out together
+                    elapsed_ns = (time.perf_counter() - started) * speed * 1e9
+                    end = int(np.searchsorted(timestamps, first_timestamp + elapsed_ns, side="right"))
+                    end = max(end, position + 1)
+                else:
+                    end = min(position + 64 * self.records_per_datagram, len(entries))
+
+                self.send(sock, retime(entries[position:end]))
+                position = end
+
+    def send(self, sock: socket.socket, records: np.ndarray) -> None:
+        """Send records in datagrams of at most records_per_datagram records
+
+        :param sock: the sending socket
+        :type sock: socket.socket
+        :param records: a structured array of GUI_RECORD_DTYPE
+        :type records: np.ndarray
+        """
+        for first in range(0, len(records), self.records_per_datagram):
+            chunk = records[first:first + self.records_per_datagram]
+            header = gui_schema.HEADER.pack(gui_schema.MAGIC, gui_schema.VERSION, len(chunk), gui_schema.RECORD.size)
+            sock.sendto(header + chunk.tobytes(), self.address)
+            self.sent += len(chunk)
+
+    def wait_until(self, deadline: float) -> None:
+        """Sleep, then spin, until time.perf_counter() reaches a deadline
+
+        :param deadline: the deadline on the time.perf_counter() clock
+        :type deadline: float
+        """
+        remaining = deadline - time.perf_counter()
+        if remaining > self.SPIN_SECONDS:
+            time.sleep(remaining - self.SPIN_SECONDS)
+        while time.perf_counter() < deadline:
+            pass
+
+
+def retime(entries: np.ndarray) -> np.ndarray:
+    """Copy the records of capture entries with their stage timestamps shifted as if they were captured just now
+
+    :param entries: a structured array of ENTRY_DTYPE
+    :type entries: np.ndarray
+    :return: a structured array of GUI_RECORD_DTYPE
+    :rtype: np.ndarray
+    """
+    records = entries["record"].copy()
+    shift = time.time_ns() // 1000 - entries["timestamp_ns"] // 1000
+    for field in STAGE_TIME_FIELDS:
+        timed = records[field] > 0
+        records[field][timed] += shift[timed]
+    return records
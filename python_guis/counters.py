@@ -0,0 +1,67 @@
+#  Copyright (c) 2022. Geoff Twardokus
+#  Reuse permitted under the MIT License as specified in the LICENSE file within this project.
+
+import threading
+
+
+class PacketCounters:
+    """Packet statistics shared between a GUI's receiver thread and whatever displays them
+
+    Every update is applied atomically under one short-lived lock and bumps a generation number. Consumers remember
+    the generation they last displayed, so they can tell whether anything changed (the dirty flag) without comparing
+    values, and can block until it does instead of polling.
+    """
+
+    FIELDS = ("received", "processed", "authenticated", "intact", "on_time")
+
+    def __init__(self):
+        """PacketCounters constructor
+        """
+        self.changed = threading.Condition(threading.Lock())
+        self.values = dict.fromkeys(self.FIELDS, 0)
+        self.generation = 0
+
+    def add(self, **increments: int) -> None:
+        """Atomically add to one or more counters, e.g., add(received=1, authenticated=1)
+
+        :param increments: the amount to add to each named counter
+        :type increments: int
+        """
+        with self.changed:
+            for field, amount in increments.items():
+                self.values[field] += amount
+            self.generation += 1
+            self.changed.notify_all()
+
+    def snapshot(self) -> tuple:
+        """Read all counters consistently
+
+        :return: the current generation and a copy of the counter values
+        :rtype: tuple
+        """
+        with self.changed:
+            return self.generation, dict(self.values)
+
+    def is_dirty(self, generation: int) -> bool:
+        """Check whether the counters changed since a previously read generation
+
+        :param generation: the generation returned by an earlier snapshot
+        :type generation: int
+        :return: True if any counter was updated after that snapshot
+        :rtype: bool
+        """
+        return self.generation != generation
+
+    def wait_for_change(self, generation: int, timeout: float = None) -> tuple:
+        """Block until the counters move past a previously read generation
+
+        :param generation: the generation returned by an earlier snapshot
+        :type generation: int
+        :param timeout: the longest time to wait in seconds, defaults to waiting forever
+        :type timeout: float
+        :return: the current generation and a copy of the counter values (unchanged if the wait timed out)
+        :rtype: tuple
+        """
+        with self.changed:
+            self.changed.wait_for(lambda: self.generation != generation, timeout)
+            return self.generation, dict(self.values)
@@ -0,0 +1,108 @@
+#  Copyright (c) 2022. Geoff Twardokus
+#  Reuse permitted under the MIT License as specified in the LICENSE file within this project.
+
+import collections
+import threading
+
+
+class FrameBatch:
+    """Collects the GUI updates produced during one frame so they can be sent to the browser in a single call
+
+    Marker moves are coalesced to the latest one per vehicle, and log messages are kept in arrival order up to
+    max_messages (older messages would be scrolled out of the browser's log anyway, so they are discarded here).
+    Each marker move keeps the generated and forwarded times of its packet, so the packets a frame actually shows can
+    be told apart from those replaced by a newer move.
+    A consumer thread calls wait() to block until there is something to send and take() to collect the frame.
+
+    :param max_messages: the most log messages kept per frame, defaults to 500
+    :type max_messages: int
+    """
+
+    def __init__(self, max_messages: int = 500):
+        """FrameBatch constructor
+        """
+        if max_messages < 1:
+            raise ValueError("max_messages must be at least 1")
+
+        self.max_messages = max_messages
+
+        self.changed = threading.Condition(threading.Lock())
+        self.markers = collections.OrderedDict()
+        self.marker_times = {}
+        self.messages = collections.deque(maxlen=max_messages)
+
+        self.coalesced = 0
+        self.dropped = 0
+
+    def __len__(self) -> int:
+        with self.changed:
+            return len(self.markers) + len(self.messages)
+
+    def move_marker(self, vehicle_id: int, latitude: float, longitude: float, icon_path: str,
+                    generated_time: int = 0, forwarded_time: int = 0) -> None:
+        """Record a marker move, replacing any earlier move of the same vehicle in this frame
+
+        :param vehicle_id: the ID number of the vehicle whose marker is being updated
+        :type vehicle_id: int
+        :param latitude: the new latitude where the marker should be placed
+        :type latitude: float
+        :param longitude: the new longitude where the marker should be placed
+        :type longitude: float
+        :param icon_path: the file path to an image to use as the marker on the map
+        :type icon_path: str
+        :param generated_time: when the packet was generated, in microseconds since the epoch, defaults to 0 (unknown)
+        :type generated_time: int
+        :param forwarded_time: when the packet was forwarded to the GUI, in microseconds since the epoch, defaults to 0
+        :type forwarded_time: int
+        """
+        with self.changed:
+            if vehicle_id in self.markers:
+                self.coalesced += 1
+            self.markers[vehicle_id] = (vehicle_id, latitude, longitude, icon_path)
+            self.marker_times[vehicle_id] = (generated_time, forwarded_time)
+            self.changed.notify()
+
+    def add_message(self, message: str) -> None:
+        """Append a log message to this frame, discarding the oldest one if the frame is full
+
+        :param message: the HTML message to show in the log
+        :type message: str
+        """
+        with self.changed:
+            if len(self.messages) == self.max_messages:
+                self.dropped += 1
+            self.messages.append(message)
+            self.changed.notify()
+
+    def wait(self, timeout: float = None) -> bool:
+        """Block until the frame holds at least one update
+
+        :param timeout: the longest time to wait in seconds, defaults to waiting forever
+        :type timeout: float
+        :return: True if there is something to take
+        :rtype: bool
+        """
+        with self.changed:
+            return bool(self.changed.wait_for(lambda: self.markers or self.messages, timeout))
+
+    def take(self) -> dict:
+        """Collect every update of the current frame and start a new one
+
+        :return: the payload for applyBatch() in main.html, with "markers" as [vehicle_id, latitude, longitude,
+            icon_path] lists and "messages" as a list of HTML strings, and the (generated, forwarded) times of the
+            packets behind the markers as "times", or None if the frame is empty
+        :rtype: dict
+        """
+        with self.changed:
+            if not self.markers and not self.messages:
+                return None
+
+            batch = {
+                "markers": [list(marker) for marker in self.markers.values()],
+                "messages": list(self.messages),
+                "times": list(self.marker_times.values()),
+            }
+            self.markers.clear()
+            self.marker_times.clear()
+            self.messages.clear()
+            return batch
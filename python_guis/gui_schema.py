@@ -0,0 +1,91 @@
+#  Copyright (c) 2022. Geoff Twardokus
+#  Reuse permitted under the MIT License as specified in the LICENSE file within this project.
+
+"""Wire format of the datagrams the V2Verifier receiver forwards to the GUIs
+
+Every datagram starts with a 6-byte header (magic byte, version, record count, record length) followed by
+record_count fixed-size records. All fields are little-endian. The C++ side of this format lives in
+include/gui_protocol.h; bump VERSION in both places when the record changes.
+"""
+
+import struct
+
+
+MAGIC = 0x56  # 'V'
+VERSION = 2
+
+HEADER = struct.Struct("<BBHH")
+
+# one packed_bsm_for_gui struct from include/bsm.h: latitude, longitude, elevation, speed, heading, authenticated,
+# on_time, elapsed_time, vehicle_id, then the generated, received, verified and forwarded times (microseconds since
+# the epoch)
+RECORD = struct.Struct("<5f??ffqqqq")
+
+# version 1 records had no stage timestamps
+RECORD_V1 = struct.Struct("<5f??ff")
+
+# record layouts this module can decode, by version
+RECORDS = {
+    1: RECORD_V1,
+    2: RECORD,
+}
+
+# largest number of records in one datagram (GUI_MAX_RECORDS_PER_DATAGRAM in include/gui_protocol.h)
+MAX_RECORDS_PER_DATAGRAM = 256
+
+
+class SchemaError(ValueError):
+    """Raised when a datagram does not follow the GUI wire format
+    """
+
+
+def pack(records: list) -> bytes:
+    """Encode records into a single datagram
+
+    :param records: tuples with the fields of RECORD
+    :type records: list
+    :return: the datagram
+    :rtype: bytes
+    """
+    if len(records) > MAX_RECORDS_PER_DATAGRAM:
+        raise SchemaError(f"at most {MAX_RECORDS_PER_DATAGRAM} records fit in one datagram, got {len(records)}")
+
+    return HEADER.pack(MAGIC, VERSION, len(records), RECORD.size) + b"".join(RECORD.pack(*r) for r in records)
+
+
+def record_payload(datagram) -> tuple:
+    """Validate a datagram's header and return the bytes holding its records
+
+    :param datagram: the raw datagram
+    :type datagram: bytes
+    :raises SchemaError: if the datagram is too short or the magic byte, version or lengths are wrong
+    :return: the records' version and a view of the datagram without its header
+    :rtype: tuple
+    """
+    if len(datagram) < HEADER.size:
+        raise SchemaError(f"datagram of {len(datagram)} bytes is shorter than the header")
+
+    magic, version, record_count, record_length = HEADER.unpack_from(datagram)
+    if magic != MAGIC:
+        raise SchemaError(f"bad magic byte {magic:#04x}")
+    if version not in RECORDS:
+        raise SchemaError(f"unsupported GUI record version {version}")
+    if record_length != RECORDS[version].size:
+        raise SchemaError(f"version {version} records are {RECORDS[version].size} bytes, header says {record_length}")
+    if len(datagram) != HEADER.size + record_count * record_length:
+        raise SchemaError(f"datagram of {len(datagram)} bytes does not hold {record_count} records")
+
+    return version, memoryview(datagram)[HEADER.size:]
+
+
+def unpack(datagram) -> list:
+    """Decode every record in a datagram
+
+    :param datagram: the raw datagram
+    :type datagram: bytes
+    :raises SchemaError: if the datagram does not follow the wire format
+    :return: one tuple of fields per record
+    :rtype: list
+    """
+    version, payload = record_payload(datagram)
+    return list(RECORDS[version].iter_unpack(payload))
@@ -0,0 +1,157 @@
+#  Copyright (c) 2022. Geoff Twardokus
+#  Reuse permitted under the MIT License as specified in the LICENSE file within this project.
+
+import numpy as np
+
+
+class LogLinearHistogram:
+    """HDR-style histogram with bounded relative error, recorded in bulk with NumPy
+
+    Values are counted in integer multiples of resolution. Values below 2**sub_bucket_bits units get one bucket
+    each; above that, every power of two is split into 2**(sub_bucket_bits - 1) equal buckets, so a reported value is
+    never off by more than 2**(1 - sub_bucket_bits) of itself (under 1.6% with the default 7 bits). Memory use and
+    percentile queries only depend on the range, not on the number of recorded values. Values above highest are
+    counted in the last bucket.
+
+    :param highest: the largest value tracked precisely, in the same unit as the recorded values, defaults to
+        3600000 (one hour in milliseconds)
+    :type highest: float
+    :param resolution: the smallest distinguishable value, defaults to 0.001 (one microsecond in milliseconds)
+    :type resolution: float
+    :param sub_bucket_bits: precision of the buckets, defaults to 7
+    :type sub_bucket_bits: int
+    """
+
+    def __init__(self, highest: float = 3600000, resolution: float = 0.001, sub_bucket_bits: int = 7):
+        """LogLinearHistogram constructor
+        """
+        if sub_bucket_bits < 2:
+            raise ValueError("sub_bucket_bits must be at least 2")
+
+        self.resolution = resolution
+        self.sub_bucket_bits = sub_bucket_bits
+        self.sub_bucket_count = 1 << sub_bucket_bits
+        self.highest_unit = int(np.ceil(highest / resolution))
+
+        self.bucket_count = int(self.bucket_index(np.array([self.highest_unit]))[0]) + 1
+        self.counts = np.zeros(self.bucket_count, dtype=np.int64)
+        self.total = 0
+        self.sum = 0.0
+        self.min = np.inf
+        self.max = -np.inf
+
+    def bucket_index(self, units: np.ndarray) -> np.ndarray:
+        """Map non-negative integer values (in units of resolution) to bucket indices
+
+        :param units: the values divided by resolution
+        :type units: np.ndarray
+        :return: the bucket index of every value
+        :rtype: np.ndarray
+        """
+        units = np.asarray(units, dtype=np.int64)
+        half = self.sub_bucket_count >> 1
+
+        # frexp gives the bit length of each value as its exponent (exact below 2**53)
+        bit_length = np.frexp(units.astype(np.float64))[1].astype(np.int64)
+        shift = np.maximum(bit_length - self.sub_bucket_bits, 0)
+        mantissa = units >> shift
+
+        return np.where(shift == 0, units, self.sub_bucket_count + (shift - 1) * half + (mantissa - half))
+
+    def bucket_upper_bounds(self, indices: np.ndarray) -> np.ndarray:
+        """Map bucket indices back to the largest value each bucket holds
+
+        :param indices: bucket indices
+        :type indices: np.ndarray
+        :return: the upper bound of each bucket, in the unit of the recorded values
+        :rtype: np.ndarray
+        """
+        indices = np.asarray(indices, dtype=np.int64)
+        half = self.sub_bucket_count >> 1
+
+        offset = np.maximum(indices - self.sub_bucket_count, 0)
+        shift = offset // half + 1
+        mantissa = offset % half + half
+        upper = np.where(indices < self.sub_bucket_count, indices, ((mantissa + 1) << shift) - 1)
+
+        return upper * self.resolution
+
+    def value_indices(self, values: np.ndarray) -> np.ndarray:
+        """Map values to bucket indices, clamping negative values to 0 and large values to the last bucket
+
+        :param values: values in the unit of the histogram
+        :type values: np.ndarray
+        :return: the bucket index of every value
+        :rtype: np.ndarray
+        """
+        units = np.clip(np.rint(np.asarray(values, dtype=np.float64) / self.resolution), 0, self.highest_unit)
+        return self.bucket_index(units.astype(np.int64))
+
+    def record(self, values: np.ndarray, indices: np.ndarray = None) -> None:
+        """Add every value of an array to the histogram
+
+        :param values: non-negative values (negative values are counted as 0)
+        :type values: np.ndarray
+        :param indices: the values' bucket indices if already computed with value_indices(), defaults to None
+        :type indices: np.ndarray
+        """
+        values = np.asarray(values, dtype=np.float64)
+        if values.size == 0:
+            return
+
+        if indices is None:
+            indices = self.value_indices(values)
+        self.counts += np.bincount(indices, minlength=self.bucket_count)
+
+        self.total += values.size
+        self.sum += float(values.sum())
+        self.min = min(self.min, float(values.min()))
+        self.max = max(self.max, float(values.max()))
+
+    def merge(self, other: "LogLinearHistogram") -> None:
+        """Add the counts of a histogram with the same configuration
+
+        :param other: the histogram to add
+        :type other: LogLinearHistogram
+        """
+        if other.bucket_count != self.bucket_count or other.resolution != self.resolution:
+            raise ValueError("cannot merge histograms with different configurations")
+
+        self.counts += other.counts
+        self.total += other.total
+        self.sum += other.sum
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    def reset(self) -> None:
+        """Remove all recorded values
+        """
+        self.counts[:] = 0
+        self.total = 0
+        self.sum = 0.0
+        self.min = np.inf
+        self.max = -np.inf
+
+    def percentiles(self, percentiles) -> list:
+        """Look up several percentiles at once
+
+        :param percentiles: percentiles between 0 and 100
+        :type percentiles: list
+        :return: the value at each percentile (the upper bound of its bucket, capped at the largest recorded value),
+            or None for each if the histogram is empty
+        :rtype: list
+        """
+        if self.total == 0:
+            return [None] * len(percentiles)
+
+        ranks = np.ceil(np.asarray(percentiles, dtype=np.float64) / 100 * self.total).clip(1, self.total)
+        indices = np.searchsorted(np.cumsum(self.counts), ranks, side="left")
+        return np.minimum(self.bucket_upper_bounds(indices), self.max).tolist()
+
+    def mean(self) -> float:
+        """Mean of the recorded values
+
+        :return: the mean, or None if the histogram is empty
+        :rtype: float
+        """
+        return self.sum / self.total if self.total else None
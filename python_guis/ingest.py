@@ -0,0 +1,165 @@
+#  Copyright (c) 2022. Geoff Twardokus
+#  Reuse permitted under the MIT License as specified in the LICENSE file within this project.
+
+import asyncio
+import collections
+import logging
+import socket
+
+
+logger = logging.getLogger(__name__)
+
+
+class _IngestProtocol(asyncio.DatagramProtocol):
+    """Datagram protocol for one listening port that hands every datagram to the owning GuiIngestServer
+    """
+
+    def __init__(self, server: "GuiIngestServer", port: int):
+        self.server = server
+        self.port = port
+
+    def datagram_received(self, data: bytes, addr: tuple) -> None:
+        self.server.datagram_received(self.port, data)
+
+    def error_received(self, exc: Exception) -> None:
+        logger.warning(f"error on GUI ingest port {self.port}: {exc}")
+
+
+class GuiIngestServer:
+    """asyncio-based receiver for the BSM data V2Verifier forwards to its GUIs
+
+    The server listens on any number of UDP ports from a single event loop. Unlike the stock asyncio datagram
+    transport, which reads a single datagram each time a socket becomes readable, every wakeup drains the socket
+    until it would block (the closest Python gets to recvmmsg). Datagrams are buffered and each wakeup of a consumer
+    takes everything buffered so far, so the decoder runs once per batch rather than once per datagram. Use it as an
+    async context manager and iterate over batches() or over the server itself:
+
+        async with GuiIngestServer(ports=(9999,), decoder=decode) as server:
+            async for record in server:
+                ...
+
+    :param ports: UDP ports to listen on, defaults to (9999,)
+    :type ports: tuple
+    :param host: address to bind, defaults to "127.0.0.1"
+    :type host: str
+    :param decoder: function turning a list of raw datagrams into a sized iterable of decoded records (e.g., a list
+        or a NumPy array), defaults to returning the datagrams unchanged
+    :type decoder: callable
+    :param max_pending: the most datagrams buffered for a slow consumer before the oldest are dropped,
+        defaults to 65536
+    :type max_pending: int
+    :param receive_buffer_size: requested kernel receive buffer (SO_RCVBUF) per socket in bytes, defaults to 4 MiB
+    :type receive_buffer_size: int
+    """
+
+    # upper bound on datagrams read per wakeup so one busy port cannot starve the others
+    MAX_READS_PER_WAKEUP = 4096
+
+    def __init__(self, ports: tuple = (9999,), host: str = "127.0.0.1", decoder=None, max_pending: int = 65536,
+                 receive_buffer_size: int = 4 * 1024 * 1024):
+        """GuiIngestServer constructor
+        """
+        self.ports = tuple(ports)
+        self.host = host
+        self.decoder = decoder if decoder is not None else (lambda datagrams: datagrams)
+
+        self.receive_buffer_size = receive_buffer_size
+
+        self.pending = collections.deque(maxlen=max_pending)
+        self.sockets = []
+        self.loop = None
+        self.ready = None
+
+        self.received = collections.Counter()
+        self.dropped = 0
+
+    async def start(self) -> None:
+        """Bind every configured port and register it with the running event loop
+        """
+        self.loop = asyncio.get_running_loop()
+        self.ready = asyncio.Event()
+
+        for port in self.ports:
+            sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, self.receive_buffer_size)
+            sock.setblocking(False)
+            sock.bind((self.host, port))
+
+            protocol = _IngestProtocol(self, port)
+            self.loop.add_reader(sock.fileno(), self.read_ready, sock, protocol)
+            self.sockets.append(sock)
+
+    def read_ready(self, sock: socket.socket, protocol: asyncio.DatagramProtocol) -> None:
+        """Drain a readable socket, passing each datagram to its protocol
+
+        :param sock: the readable socket
+        :type sock: socket.socket
+        :param protocol: the protocol for the socket's port
+        :type protocol: asyncio.DatagramProtocol
+        """
+        for _ in range(self.MAX_READS_PER_WAKEUP):
+            try:
+                data, addr = sock.recvfrom(65535)
+            except (BlockingIOError, InterruptedError):
+                return
+            except OSError as exc:
+                protocol.error_received(exc)
+                return
+            protocol.datagram_received(data, addr)
+
+    def close(self) -> None:
+        """Close all listening sockets
+        """
+        for sock in self.sockets:
+            self.loop.remove_reader(sock.fileno())
+            sock.close()
+        self.sockets = []
+
+        # wake up a consumer waiting in batches() so it can finish
+        if self.ready is not None:
+            self.ready.set()
+
+    async def __aenter__(self) -> "GuiIngestServer":
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        self.close()
+
+    def datagram_received(self, port: int, data: bytes) -> None:
+        """Buffer a datagram received on one of the listening ports (called by the protocol)
+
+        :param port: the port the datagram arrived on
+        :type port: int
+        :param data: the datagram payload
+        :type data: bytes
+        """
+        if len(self.pending) == self.pending.maxlen:
+            self.dropped += 1
+        self.pending.append(data)
+        self.received[port] += 1
+        self.ready.set()
+
+    async def batches(self):
+        """Asynchronously iterate over lists of decoded records, one list per wakeup
+
+        :return: an async iterator yielding every record decoded from the datagrams buffered since the last batch
+        :rtype: AsyncIterator
+        """
+        while self.sockets:
+            await self.ready.wait()
+            self.ready.clear()
+            if not self.sockets:
+                break
+
+            datagrams = list(self.pending)
+            self.pending.clear()
+
+            records = self.decoder(datagrams)
+            if len(records):
+                yield records
+
+    async def __aiter__(self):
+        async for batch in self.batches():
+            for record in batch:
+                yield record
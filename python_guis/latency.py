@@ -0,0 +1,130 @@
+#  Copyright (c) 2022. Geoff Twardokus
+#  Reuse permitted under the MIT License as specified in the LICENSE file within this project.
+
+import threading
+import time
+
+import numpy as np
+
+from python_guis import bsm_decoder
+from python_guis.histogram import LogLinearHistogram
+
+
+class LatencyTracker:
+    """Per-stage latency percentiles of the SPDUs shown by a GUI, from the stage timestamps in the GUI records
+
+    Every record carries the time its SPDU was generated by the transmitter and received, verified and forwarded by
+    the receiver. record() turns a batch of records into the first three stage latencies at once; the time from
+    forwarding to rendering (and so the total) is added by rendered() for the packets a frame actually drew, so
+    packets still waiting in a render queue, or dropped or replaced by a newer packet before they were drawn, never
+    count as rendered. Latencies go into LogLinearHistograms that cover the last window to two windows seconds, so the
+    reported percentiles follow the current load. Records without timestamps (GUI record version 1) and the receiver's
+    own reports are ignored. All methods may be called from any thread.
+
+    :param window: seconds after which the older half of the recorded latencies is discarded, defaults to 10.0
+    :type window: float
+    """
+
+    # stage name: (start timestamp, end timestamp), where "rendered" is the time passed to rendered()
+    STAGES = {
+        "network": ("generated_time", "received_time"),
+        "verification": ("received_time", "verified_time"),
+        "forwarding": ("verified_time", "forwarded_time"),
+        "rendering": ("forwarded_time", "rendered"),
+        "total": ("generated_time", "rendered"),
+    }
+
+    STAGE_LABELS = {
+        "network": "Transmit to receive",
+        "verification": "Receive to verified",
+        "forwarding": "Verified to forwarded",
+        "rendering": "Forwarded to rendered",
+        "total": "Transmit to rendered",
+    }
+
+    PERCENTILES = (50, 95, 99)
+
+    def __init__(self, window: float = 10.0):
+        """LatencyTracker constructor
+        """
+        self.window = window
+
+        self.lock = threading.Lock()
+        self.current = {stage: LogLinearHistogram() for stage in self.STAGES}
+        self.previous = {stage: LogLinearHistogram() for stage in self.STAGES}
+        self.rotated = time.monotonic()
+
+    def record(self, records: np.ndarray, rendered: bool = False) -> None:
+        """Add the network, verification and forwarding latencies of a batch of decoded records
+
+        :param records: a structured array of GUI_RECORD_DTYPE
+        :type records: np.ndarray
+        :param rendered: whether the records count as rendered now (for consumers that draw nothing), which also adds
+            their rendering and total latencies, defaults to False
+        :type rendered: bool
+        """
+        mask = (records["generated_time"] > 0) & (records["vehicle_id"] != bsm_decoder.RECEIVER_ID)
+        timed = records if mask.all() else records[mask]
+        if len(timed) == 0:
+            return
+
+        with self.lock:
+            self.rotate()
+            for stage, (start, end) in self.STAGES.items():
+                if end != "rendered":
+                    self.current[stage].record((timed[end] - timed[start]) / 1000)
+
+        if rendered:
+            self.rendered(timed["generated_time"], timed["forwarded_time"])
+
+    def rendered(self, generated_times, forwarded_times, rendered_time: int = None) -> None:
+        """Add the rendering and total latencies of the packets drawn by a frame
+
+        :param generated_times: the generated_time of every drawn packet; packets without one (0) are ignored
+        :type generated_times: np.ndarray
+        :param forwarded_times: the forwarded_time of every drawn packet
+        :type forwarded_times: np.ndarray
+        :param rendered_time: when the packets were rendered, in microseconds since the epoch, defaults to now
+        :type rendered_time: int
+        """
+        if rendered_time is None:
+            rendered_time = time.time_ns() // 1000
+
+        generated = np.asarray(generated_times, dtype=np.int64)
+        forwarded = np.asarray(forwarded_times, dtype=np.int64)
+        timed = generated > 0
+        if not timed.all():
+            generated, forwarded = generated[timed], forwarded[timed]
+        if len(generated) == 0:
+            return
+
+        with self.lock:
+            self.rotate()
+            self.current["rendering"].record((rendered_time - forwarded) / 1000)
+            self.current["total"].record((rendered_time - generated) / 1000)
+
+    def rotate(self) -> None:
+        """Start a new window once the current one is older than window seconds (lock held)
+        """
+        now = time.monotonic()
+        if now - self.rotated >= self.window:
+            self.previous, self.current = self.current, self.previous
+            for histogram in self.current.values():
+                histogram.reset()
+            self.rotated = now
+
+    def summary(self) -> dict:
+        """Look up the PERCENTILES of every stage over the last one to two windows
+
+        :return: maps every stage to its percentiles in milliseconds (None while no packets were seen)
+        :rtype: dict
+        """
+        with self.lock:
+            self.rotate()
+            summary = {}
+            for stage in self.STAGES:
+                combined = LogLinearHistogram()
+                combined.merge(self.previous[stage])
+                combined.merge(self.current[stage])
+                summary[stage] = combined.percentiles(self.PERCENTILES)
+            return summary
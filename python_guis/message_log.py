@@ -0,0 +1,95 @@
+#  Copyright (c) 2022. Geoff Twardokus
+#  Reuse permitted under the MIT License as specified in the LICENSE file within this project.
+
+import collections
+import threading
+import tkinter as tk
+
+
+class MessageLog:
+    """A bounded log shown in a Tk text widget, fed from any thread and rendered by the Tk thread
+
+    Producers call write() with already formatted (text, tag) entries; nothing touches the widget until the Tk thread
+    calls flush(), which inserts everything queued since the last flush with a single insert call and scrolls once.
+    The widget never holds more than max_lines lines: once it does, the oldest lines are deleted in one chunk so that
+    max_lines - trim_lines remain, which keeps deletions rare. Entries queued faster than they are flushed are
+    bounded the same way.
+
+    Optionally every entry is also appended to a spill file, so the full history survives trimming.
+
+    :param widget: the text widget to render into
+    :type widget: tk.Text
+    :param max_lines: the most lines kept in the widget, defaults to 2000
+    :type max_lines: int
+    :param trim_lines: the number of lines removed at once when the widget is full, defaults to 500
+    :type trim_lines: int
+    :param spill_path: file to append the full log to, defaults to None (no spill file)
+    :type spill_path: str
+    """
+
+    def __init__(self, widget: tk.Text, max_lines: int = 2000, trim_lines: int = 500, spill_path: str = None):
+        """MessageLog constructor
+        """
+        if max_lines < 1:
+            raise ValueError("max_lines must be at least 1")
+        if not 0 < trim_lines <= max_lines:
+            raise ValueError("trim_lines must be between 1 and max_lines")
+
+        self.widget = widget
+        self.max_lines = max_lines
+        self.trim_lines = trim_lines
+
+        self.lock = threading.Lock()
+        self.pending = collections.deque(maxlen=max_lines)
+        self.dropped = 0
+
+        self.spill_file = open(spill_path, "a", encoding="utf-8") if spill_path is not None else None
+
+    def write(self, entries: list) -> None:
+        """Queue entries for the next flush (safe to call from any thread)
+
+        :param entries: (text, tag) pairs; text should end with a newline
+        :type entries: list
+        """
+        with self.lock:
+            for entry in entries:
+                if len(self.pending) == self.pending.maxlen:
+                    self.dropped += 1
+                self.pending.append(entry)
+
+            if self.spill_file is not None:
+                self.spill_file.writelines(text for text, tag in entries)
+
+    def flush(self) -> None:
+        """Insert all queued entries into the widget and trim it (Tk thread only)
+        """
+        with self.lock:
+            if self.spill_file is not None:
+                self.spill_file.flush()
+
+            if not self.pending:
+                return
+            entries = list(self.pending)
+            self.pending.clear()
+
+        # Text.insert accepts any number of text/tag pairs after the index
+        arguments = []
+        for text, tag in entries:
+            arguments.append(text)
+            arguments.append(tag)
+        self.widget.insert(tk.END, *arguments)
+
+        # the widget always ends with an empty line after the last newline
+        lines = int(self.widget.index("end-1c").split(".")[0]) - 1
+        if lines > self.max_lines:
+            self.widget.delete("1.0", f"{lines - self.max_lines + self.trim_lines + 1}.0")
+
+        self.widget.see(tk.END)
+
+    def close(self) -> None:
+        """Close the spill file, if any
+        """
+        with self.lock:
+            if self.spill_file is not None:
+                self.spill_file.close()
+                self.spill_file = None
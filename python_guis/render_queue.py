@@ -0,0 +1,99 @@
+#  Copyright (c) 2022. Geoff Twardokus
+#  Reuse permitted under the MIT License as specified in the LICENSE file within this project.
+
+import collections
+import threading
+
+
+class RenderQueue:
+    """A bounded, thread-safe queue that hands decoded packets from a receiver thread to a single GUI consumer
+
+    The receiver calls put() for every packet and the GUI thread periodically calls drain() to apply a batch of
+    packets per frame. When the queue is full, the configured policy decides what is discarded so that the delay
+    between receiving a packet and displaying it stays bounded regardless of the packet rate.
+
+    :param max_size: the maximum number of packets held by the queue, defaults to 256
+    :type max_size: int
+    :param policy: one of DROP_OLDEST, DROP_NEWEST or LATEST_PER_VEHICLE, defaults to DROP_OLDEST
+    :type policy: str
+    :param key: function returning the vehicle a packet belongs to (used by LATEST_PER_VEHICLE), defaults to the
+        first element of the packet
+    :type key: callable
+    """
+
+    DROP_OLDEST = "drop_oldest"
+    DROP_NEWEST = "drop_newest"
+    LATEST_PER_VEHICLE = "latest_per_vehicle"
+
+    POLICIES = (DROP_OLDEST, DROP_NEWEST, LATEST_PER_VEHICLE)
+
+    def __init__(self, max_size: int = 256, policy: str = DROP_OLDEST, key=None):
+        """RenderQueue constructor
+        """
+        if max_size < 1:
+            raise ValueError("max_size must be at least 1")
+        if policy not in self.POLICIES:
+            raise ValueError(f"unknown render queue policy {policy!r}, expected one of {self.POLICIES}")
+
+        self.max_size = max_size
+        self.policy = policy
+        self.key = key if key is not None else (lambda packet: packet[0])
+
+        self.lock = threading.Lock()
+
+        # LATEST_PER_VEHICLE keeps one slot per vehicle; a newer packet replaces the older one in place so that a
+        # chatty vehicle cannot starve the others
+        if self.policy == self.LATEST_PER_VEHICLE:
+            self.pending = collections.OrderedDict()
+        else:
+            self.pending = collections.deque()
+
+        self.dropped = 0
+        self.coalesced = 0
+
+    def __len__(self) -> int:
+        with self.lock:
+            return len(self.pending)
+
+    def put(self, packet) -> None:
+        """Add a packet to the queue, applying the drop/coalesce policy if the queue is full
+
+        :param packet: the decoded packet to render
+        :type packet: tuple
+        """
+        with self.lock:
+            if self.policy == self.LATEST_PER_VEHICLE:
+                vehicle = self.key(packet)
+                if vehicle in self.pending:
+                    self.pending[vehicle] = packet
+                    self.coalesced += 1
+                    return
+                if len(self.pending) >= self.max_size:
+                    self.pending.popitem(last=False)
+                    self.dropped += 1
+                self.pending[vehicle] = packet
+
+            elif len(self.pending) >= self.max_size:
+                self.dropped += 1
+                if self.policy == self.DROP_OLDEST:
+                    self.pending.popleft()
+                    self.pending.append(packet)
+
+            else:
+                self.pending.append(packet)
+
+    def drain(self, max_items: int = None) -> list:
+        """Remove and return up to max_items packets in arrival order
+
+        :param max_items: the largest batch to return, defaults to everything in the queue
+        :type max_items: int
+        :return: the packets to render
+        :rtype: list
+        """
+        with self.lock:
+            count = len(self.pending) if max_items is None else min(max_items, len(self.pending))
+
+            if self.policy == self.LATEST_PER_VEHICLE:
+                return [self.pending.popitem(last=False)[1] for _ in range(count)]
+
+            return [self.pending.popleft() for _ in range(count)]
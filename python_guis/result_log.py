@@ -0,0 +1,137 @@
+#  Copyright (c) 2022. Geoff Twardokus
+#  Reuse permitted under the MIT License as specified in the LICENSE file within this project.
+
+"""Reader for the receiver's per-SPDU verification result logs (logging.resultsLog in config.json)
+
+Binary logs are an 8-byte header (magic "V2VR", version, record size) followed by one 44-byte record per SPDU, all
+little-endian, mirroring verification_record in include/ResultLogger.h. JSON-lines logs have one object per SPDU
+with the same fields and the outcome bits spelled out. Both load into the same NumPy structured array:
+
+    >>> results = result_log.load("results.bin")
+    >>> np.percentile((results["verified_time"] - results["received_time"]) / 1000, 99)
+"""
+
+import json
+import struct
+
+import numpy as np
+
+
+MAGIC = b"V2VR"
+VERSION = 1
+
+# magic, version, record size
+HEADER = struct.Struct("<4sHH")
+
+# bits of the outcome field (RESULT_* in include/ResultLogger.h)
+VALID = 0x1
+CERTIFICATE_VALID = 0x2
+SIGNATURE_VALID = 0x4
+RECENT = 0x8
+
+OUTCOME_FIELDS = {
+    "valid": VALID,
+    "certificate_valid": CERTIFICATE_VALID,
+    "signature_valid": SIGNATURE_VALID,
+    "recent": RECENT,
+}
+
+# Mirrors verification_record; times are microseconds since the epoch
+RESULT_DTYPE = np.dtype([
+    ("sequence", "<u8"),
+    ("generated_time", "<i8"),
+    ("received_time", "<i8"),
+    ("verified_time", "<i8"),
+    ("reported_time", "<i8"),
+    ("vehicle_id", "<u2"),
+    ("outcome", "u1"),
+    ("reserved", "u1"),
+])
+
+
+class ResultLogError(ValueError):
+    """Raised when a file is not a result log this module can read
+    """
+
+
+def load_binary(path: str) -> np.ndarray:
+    """Memory-map every complete record of a binary result log
+
+    :param path: path to the log
+    :type path: str
+    :raises ResultLogError: if the file is not a compatible binary result log
+    :return: a read-only structured array (RESULT_DTYPE) backed by the file
+    :rtype: np.ndarray
+    """
+    with open(path, "rb") as log_file:
+        header = log_file.read(HEADER.size)
+        log_file.seek(0, 2)
+        size = log_file.tell()
+
+    if len(header) < HEADER.size:
+        raise ResultLogError(f"{path} is too short to be a result log")
+    magic, version, record_size = HEADER.unpack(header)
+    if magic != MAGIC:
+        raise ResultLogError(f"{path} is not a binary result log")
+    if version != VERSION or record_size != RESULT_DTYPE.itemsize:
+        raise ResultLogError(f"unsupported result log version {version} with {record_size}-byte records")
+
+    # a log that is still being written may end in a partial record
+    count = (size - HEADER.size) // RESULT_DTYPE.itemsize
+    if count == 0:
+        return np.zeros(0, dtype=RESULT_DTYPE)
+    return np.memmap(path, dtype=RESULT_DTYPE, mode="r", offset=HEADER.size, shape=(count,))
+
+
+def load_jsonl(path: str) -> np.ndarray:
+    """Read a JSON-lines result log
+
+    :param path: path to the log
+    :type path: str
+    :raises ResultLogError: if a line is not a result record
+    :return: a structured array (RESULT_DTYPE)
+    :rtype: np.ndarray
+    """
+    rows = []
+    with open(path) as log_file:
+        for number, line in enumerate(log_file, 1):
+            if not line.strip():
+                continue
+            try:
+                result = json.loads(line)
+                outcome = sum(bit for field, bit in OUTCOME_FIELDS.items() if result[field])
+                rows.append((result["sequence"], result["generated_time"], result["received_time"],
+                             result["verified_time"], result["reported_time"], result["vehicle_id"], outcome, 0))
+            except (ValueError, KeyError) as e:
+                # the last line of a log that is still being written may be incomplete
+                if line.endswith("\n"):
+                    raise ResultLogError(f"{path}:{number} is not a result record: {e}") from e
+
+    return np.array(rows, dtype=RESULT_DTYPE)
+
+
+def load(path: str) -> np.ndarray:
+    """Load a binary or JSON-lines result log, told apart by the binary log's magic
+
+    :param path: path to the log
+    :type path: str
+    :raises ResultLogError: if the file is not a compatible result log
+    :return: a structured array (RESULT_DTYPE)
+    :rtype: np.ndarray
+    """
+    with open(path, "rb") as log_file:
+        magic = log_file.read(len(MAGIC))
+    return load_binary(path) if magic == MAGIC else load_jsonl(path)
+
+
+def outcome(results: np.ndarray, field: str) -> np.ndarray:
+    """Extract one outcome bit of every record
+
+    :param results: a structured array of RESULT_DTYPE
+    :type results: np.ndarray
+    :param field: "valid", "certificate_valid", "signature_valid" or "recent"
+    :type field: str
+    :return: a boolean array
+    :rtype: np.ndarray
+    """
+    return (results["outcome"] & OUTCOME_FIELDS[field]) != 0
@@ -0,0 +1,292 @@
+#  Copyright (c) 2022. Geoff Twardokus
+#  Reuse permitted under the MIT License as specified in the LICENSE file within this project.
+
+import asyncio
+import json
+import time
+
+import numpy as np
+
+from python_guis import bsm_decoder
+from python_guis.histogram import LogLinearHistogram
+from python_guis.ingest import GuiIngestServer
+from python_guis.latency import LatencyTracker
+
+
+class HeadlessSink:
+    """Display-free consumer of the GUI datagrams forwarded by the V2Verifier receiver, for load testing
+
+    Every batch of records is folded into global and per-vehicle counters (received, authenticated, on time) and
+    elapsed-time histograms with a handful of vectorized NumPy operations, so the cost per record is a few
+    nanoseconds and the sink keeps up with far more than 100k records/s. Every interval seconds a snapshot of the
+    rolling (since the previous snapshot) and cumulative statistics is printed and optionally appended to a
+    JSON-lines file. Snapshots also hold per-stage latency percentiles (LatencyTracker), with records counting as
+    rendered when the sink has processed them. Records the receiver sends about itself (vehicle ID RECEIVER_ID) are
+    ignored.
+
+    :param ports: UDP ports to listen on, defaults to (9999,)
+    :type ports: tuple
+    :param host: address to bind, defaults to "127.0.0.1"
+    :type host: str
+    :param interval: seconds between snapshots, defaults to 1.0
+    :type interval: float
+    :param export_path: JSON-lines file to append every snapshot to, defaults to None (print only)
+    :type export_path: str
+    :param per_vehicle: whether to print a line per vehicle with every snapshot, defaults to False
+    :type per_vehicle: bool
+    """
+
+    PERCENTILES = (50, 90, 99, 99.9)
+
+    # per-vehicle histograms trade precision for memory: up to 60 s at 10 us resolution within 6.25%, 311 buckets of
+    # 4 bytes per vehicle instead of 1708 of 8 bytes, as the sink may see tens of thousands of vehicle IDs
+    VEHICLE_HISTOGRAM = {"highest": 60000, "resolution": 0.01, "sub_bucket_bits": 5}
+
+    def __init__(self, ports: tuple = (9999,), host: str = "127.0.0.1", interval: float = 1.0,
+                 export_path: str = None, per_vehicle: bool = False):
+        """HeadlessSink constructor
+        """
+        self.ports = tuple(ports)
+        self.host = host
+        self.interval = interval
+        self.export_path = export_path
+        self.per_vehicle = per_vehicle
+
+        self.server = None
+        self.started = None
+        self.last_snapshot = None
+
+        # global statistics: cumulative counters and histogram, plus the same since the last snapshot
+        self.totals = dict.fromkeys(("received", "authenticated", "on_time"), 0)
+        self.window = dict(self.totals)
+        self.elapsed = LogLinearHistogram()
+        self.window_elapsed = LogLinearHistogram()
+        self.stages = LatencyTracker()
+
+        # per-vehicle statistics, one row per vehicle in order of first appearance; the histogram only maps values to
+        # buckets, the counts live in vehicle_elapsed
+        self.vehicle_slots = {}
+        self.vehicle_ids = []
+        self.vehicle_counts = np.zeros((0, 4), dtype=np.int64)  # received, authenticated, on_time, window received
+        self.vehicle_histogram = LogLinearHistogram(**self.VEHICLE_HISTOGRAM)
+        self.vehicle_elapsed = np.zeros((0, self.vehicle_histogram.bucket_count), dtype=np.int32)
+        self.vehicle_max = np.zeros(0, dtype=np.float64)
+
+    async def run(self, duration: float = None) -> None:
+        """Receive and summarize records until duration seconds have passed (or forever)
+
+        :param duration: how long to run in seconds, defaults to None (until cancelled)
+        :type duration: float
+        """
+        self.started = self.last_snapshot = time.monotonic()
+
+        async with GuiIngestServer(ports=self.ports, host=self.host, decoder=bsm_decoder.decode_datagrams) as server:
+            self.server = server
+            reporter = asyncio.create_task(self.report_periodically())
+            if duration is not None:
+                asyncio.get_running_loop().call_later(duration, server.close)
+
+            try:
+                async for records in server.batches():
+                    self.process_records(records)
+
+                    # under sustained load the consumer rarely yields to the reporter task, so report from here
+                    if time.monotonic() - self.last_snapshot >= self.interval:
+                        self.report()
+            finally:
+                reporter.cancel()
+                self.report()
+
+    async def report_periodically(self) -> None:
+        """Print (and export) a snapshot every interval seconds while no records arrive
+        """
+        while True:
+            await asyncio.sleep(max(self.last_snapshot + self.interval - time.monotonic(), 0))
+            if time.monotonic() - self.last_snapshot >= self.interval:
+                self.report()
+
+    def process_records(self, records: np.ndarray) -> None:
+        """Fold a batch of decoded records into the statistics
+
+        :param records: a structured array of GUI_RECORD_DTYPE
+        :type records: np.ndarray
+        """
+        remote = records[records["vehicle_id"] != bsm_decoder.RECEIVER_ID]
+        if len(remote) == 0:
+            return
+
+        self.stages.record(remote, rendered=True)
+
+        authenticated = remote["authenticated"]
+        on_time = remote["on_time"]
+        elapsed_time = remote["elapsed_time"]
+
+        counts = {
+            "received": len(remote),
+            "authenticated": int(np.count_nonzero(authenticated)),
+            "on_time": int(np.count_nonzero(on_time)),
+        }
+        for field, amount in counts.items():
+            self.totals[field] += amount
+            self.window[field] += amount
+
+        buckets = self.elapsed.value_indices(elapsed_time)
+        self.elapsed.record(elapsed_time, buckets)
+        self.window_elapsed.record(elapsed_time, buckets)
+
+        # map the batch's vehicle IDs to rows once per distinct vehicle, then scatter-add per record
+        ids, inverse = np.unique(remote["vehicle_id"].astype(np.int64), return_inverse=True)
+        slots = np.fromiter((self.vehicle_slot(int(vehicle_id)) for vehicle_id in ids), dtype=np.int64,
+                            count=len(ids))[inverse]
+
+        np.add.at(self.vehicle_counts[:, 0], slots, 1)
+        np.add.at(self.vehicle_counts[:, 1], slots, authenticated)
+        np.add.at(self.vehicle_counts[:, 2], slots, on_time)
+        np.add.at(self.vehicle_counts[:, 3], slots, 1)
+        np.add.at(self.vehicle_elapsed, (slots, self.vehicle_histogram.value_indices(elapsed_time)), 1)
+        np.maximum.at(self.vehicle_max, slots, elapsed_time)
+
+    def vehicle_slot(self, vehicle_id: int) -> int:
+        """Find a vehicle's row in the per-vehicle arrays, adding one (and growing the arrays) for a new vehicle
+
+        :param vehicle_id: the vehicle's ID number
+        :type vehicle_id: int
+        :return: the row index
+        :rtype: int
+        """
+        slot = self.vehicle_slots.get(vehicle_id)
+        if slot is None:
+            slot = self.vehicle_slots[vehicle_id] = len(self.vehicle_ids)
+            self.vehicle_ids.append(vehicle_id)
+
+            if slot == len(self.vehicle_counts):
+                grow = max(len(self.vehicle_counts), 16)
+                self.vehicle_counts = np.vstack((self.vehicle_counts, np.zeros((grow, 4), dtype=np.int64)))
+                self.vehicle_elapsed = np.vstack((self.vehicle_elapsed,
+                                                  np.zeros((grow, self.vehicle_histogram.bucket_count),
+                                                           dtype=np.int32)))
+                self.vehicle_max = np.concatenate((self.vehicle_max, np.zeros(grow)))
+        return slot
+
+    def vehicle_percentiles(self) -> np.ndarray:
+        """Elapsed-time percentiles (PERCENTILES) of every vehicle
+
+        :return: an array with one row per vehicle and one column per percentile, in milliseconds
+        :rtype: np.ndarray
+        """
+        count = len(self.vehicle_ids)
+        buckets = self.vehicle_histogram.bucket_count
+        cumulative = np.cumsum(self.vehicle_elapsed[:count], axis=1, dtype=np.int64)
+        totals = cumulative[:, -1:]
+        ranks = np.ceil(np.array(self.PERCENTILES) / 100 * totals).clip(1, None).astype(np.int64)
+
+        # one searchsorted over all rows: offsetting every row by more than any total keeps the flattened cumulative
+        # counts sorted, and finds the first bucket of each row whose cumulative count reaches each of its ranks
+        offsets = np.arange(count, dtype=np.int64)[:, None] * (int(totals.max()) + 1)
+        positions = np.searchsorted((cumulative + offsets).ravel(), (ranks + offsets).ravel(), side="left")
+        indices = positions.reshape(count, -1) - np.arange(count)[:, None] * buckets
+
+        upper = self.vehicle_histogram.bucket_upper_bounds(np.minimum(indices, buckets - 1))
+        return np.minimum(upper, self.vehicle_max[:count, None])
+
+    def snapshot(self) -> dict:
+        """Collect the current statistics and start a new rolling window
+
+        :return: rolling and cumulative statistics, globally and per vehicle
+        :rtype: dict
+        """
+        now = time.monotonic()
+        window_seconds = max(now - self.last_snapshot, 1e-9)
+
+        snapshot = {
+            "time": time.time(),
+            "uptime": now - self.started,
+            "window": dict(self.window, rate=self.window["received"] / window_seconds,
+                           elapsed_ms=self.latency_summary(self.window_elapsed)),
+            "total": dict(self.totals, elapsed_ms=self.latency_summary(self.elapsed)),
+            "dropped": self.server.dropped if self.server is not None else 0,
+            "stages_ms": {stage: dict(zip((f"p{p}" for p in LatencyTracker.PERCENTILES), values))
+                          for stage, values in self.stages.summary().items()},
+            "vehicles": {},
+        }
+
+        count = len(self.vehicle_ids)
+        if count:
+            percentiles = self.vehicle_percentiles().tolist()
+            for slot, vehicle_id in enumerate(self.vehicle_ids):
+                received, authenticated, on_time, window_received = self.vehicle_counts[slot].tolist()
+                snapshot["vehicles"][vehicle_id] = {
+                    "received": received,
+                    "authenticated": authenticated,
+                    "on_time": on_time,
+                    "rate": window_received / window_seconds,
+                    "elapsed_ms": dict(zip((f"p{p}" for p in self.PERCENTILES), percentiles[slot])),
+                }
+
+        self.last_snapshot = now
+        self.window = dict.fromkeys(self.window, 0)
+        self.window_elapsed.reset()
+        self.vehicle_counts[:, 3] = 0
+        return snapshot
+
+    def latency_summary(self, histogram: LogLinearHistogram) -> dict:
+        """Summarize an elapsed-time histogram
+
+        :param histogram: the histogram
+        :type histogram: LogLinearHistogram
+        :return: PERCENTILES, mean and max in milliseconds (None when empty)
+        :rtype: dict
+        """
+        summary = dict(zip((f"p{p}" for p in self.PERCENTILES), histogram.percentiles(self.PERCENTILES)))
+        summary["mean"] = histogram.mean()
+        summary["max"] = histogram.max if histogram.total else None
+        return summary
+
+    def report(self) -> dict:
+        """Take a snapshot, print it and append it to the export file
+
+        :return: the snapshot
+        :rtype: dict
+        """
+        snapshot = self.snapshot()
+        print(format_snapshot(snapshot, self.per_vehicle), flush=True)
+
+        if self.export_path is not None:
+            with open(self.export_path, "a") as export_file:
+                export_file.write(json.dumps(snapshot) + "\n")
+        return snapshot
+
+
+def format_snapshot(snapshot: dict, per_vehicle: bool = False) -> str:
+    """Render a snapshot as a one-line summary, optionally followed by a line per vehicle
+
+    :param snapshot: a snapshot from HeadlessSink.snapshot()
+    :type snapshot: dict
+    :param per_vehicle: whether to add a line per vehicle, defaults to False
+    :type per_vehicle: bool
+    :return: the text to print
+    :rtype: str
+    """
+    def percent(part, whole):
+        return f"{part / whole * 100:.2f}%" if whole else "-"
+
+    def milliseconds(value):
+        return f"{value:.3f}" if value is not None else "-"
+
+    window = snapshot["window"]
+    total = snapshot["total"]
+    latency = " ".join(f"{name} {milliseconds(value)}" for name, value in window["elapsed_ms"].items())
+
+    lines = [f"[sink] {snapshot['uptime']:8.1f}s  {window['rate']:10.0f} records/s  total {total['received']}  "
+             f"authentic {percent(total['authenticated'], total['received'])}  "
+             f"on time {percent(total['on_time'], total['received'])}  elapsed ms: {latency}  "
+             f"vehicles {len(snapshot['vehicles'])}  dropped {snapshot['dropped']}"]
+
+    if per_vehicle:
+        for vehicle_id, stats in sorted(snapshot["vehicles"].items()):
+            latency = " ".join(f"{name} {milliseconds(value)}" for name, value in stats["elapsed_ms"].items())
+            lines.append(f"    vehicle {vehicle_id:5d}  {stats['rate']:10.0f} records/s  total {stats['received']}  "
+                         f"authentic {percent(stats['authenticated'], stats['received'])}  "
+                         f"on time {percent(stats['on_time'], stats['received'])}  elapsed ms: {latency}")
+
+    return "\n".join(lines)
@@ -0,0 +1,51 @@
+#  Copyright (c) 2022. Geoff Twardokus
+#  Reuse permitted under the MIT License as specified in the LICENSE file within this project.
+
+from PIL import Image
+from PIL import ImageTk
+
+
+HEADINGS = ("N", "NE", "E", "SE", "S", "SW", "W", "NW")
+
+REGULAR = "regular"
+PHANTOM = "phantom"
+RECEIVER = "receiver"
+
+
+class SpriteCache:
+    """In-memory atlas of the vehicle icons used by TkGUI
+
+    Every icon is opened and decoded once when the cache is built, so rendering a packet only needs a dictionary
+    lookup. A Tk root window must exist before the cache is created.
+
+    :param picture_directory: directory holding the regular icons and the phantom/ and receiver/ subdirectories,
+        defaults to "python_guis/pictures"
+    :type picture_directory: str
+    """
+
+    def __init__(self, picture_directory: str = "python_guis/pictures"):
+        """SpriteCache constructor
+        """
+        directories = {
+            REGULAR: picture_directory + "/",
+            PHANTOM: picture_directory + "/phantom/",
+            RECEIVER: picture_directory + "/receiver/",
+        }
+
+        self.sprites = {}
+        for kind, directory in directories.items():
+            for heading in HEADINGS:
+                with Image.open(directory + heading + ".png") as image:
+                    self.sprites[(kind, heading)] = ImageTk.PhotoImage(image)
+
+    def get(self, kind: str, heading: str) -> ImageTk.PhotoImage:
+        """Look up the icon for a vehicle kind and heading
+
+        :param kind: one of REGULAR, PHANTOM or RECEIVER
+        :type kind: str
+        :param heading: a compass heading from HEADINGS, e.g., "NE"
+        :type heading: str
+        :return: the decoded icon
+        :rtype: ImageTk.PhotoImage
+        """
+        return self.sprites[(kind, heading)]
@@ -0,0 +1,188 @@
+#  Copyright (c) 2022. Geoff Twardokus
+#  Reuse permitted under the MIT License as specified in the LICENSE file within this project.
+
+import bisect
+from tkinter import ttk
+
+
+class VehicleRecord:
+    """The latest reported state of one vehicle
+
+    :param vehicle_id: the vehicle's ID number
+    :type vehicle_id: int
+    """
+
+    __slots__ = ("vehicle_id", "location", "speed", "reputation", "dirty")
+
+    def __init__(self, vehicle_id: int):
+        """VehicleRecord constructor
+        """
+        self.vehicle_id = vehicle_id
+        self.location = ""
+        self.speed = ""
+        self.reputation = ""
+        self.dirty = True
+
+
+class VehicleTable:
+    """Per-vehicle state store indexed directly by vehicle ID
+
+    Records live in a list whose index is the vehicle ID, so an update is a list lookup and a few attribute writes
+    no matter how many vehicles there are. The list grows (doubling) when a larger ID shows up. Updated records are
+    flagged dirty until a view renders them.
+
+    :param capacity: the number of vehicle IDs to allocate up front, defaults to 128
+    :type capacity: int
+    """
+
+    def __init__(self, capacity: int = 128):
+        """VehicleTable constructor
+        """
+        self.records = [None] * max(capacity, 1)
+        self.vehicle_ids = []
+
+    def __len__(self) -> int:
+        return len(self.vehicle_ids)
+
+    def update(self, vehicle_id: int, location: str, speed: str, reputation: str) -> None:
+        """Store the latest state of a vehicle and mark it dirty
+
+        :param vehicle_id: the vehicle's ID number (any non-negative integer)
+        :type vehicle_id: int
+        :param location: the reported location
+        :type location: str
+        :param speed: the reported speed
+        :type speed: str
+        :param reputation: the vehicle's reputation
+        :type reputation: str
+        """
+        if vehicle_id >= len(self.records):
+            self.records.extend([None] * max(vehicle_id + 1 - len(self.records), len(self.records)))
+
+        record = self.records[vehicle_id]
+        if record is None:
+            record = self.records[vehicle_id] = VehicleRecord(vehicle_id)
+            bisect.insort(self.vehicle_ids, vehicle_id)
+
+        record.location = location
+        record.speed = speed
+        record.reputation = reputation
+        record.dirty = True
+
+    def get(self, vehicle_id: int) -> VehicleRecord:
+        """Look up a vehicle's record
+
+        :param vehicle_id: the vehicle's ID number
+        :type vehicle_id: int
+        :return: the record, or None if the vehicle has not been seen
+        :rtype: VehicleRecord
+        """
+        if 0 <= vehicle_id < len(self.records):
+            return self.records[vehicle_id]
+        return None
+
+    def at(self, position: int) -> VehicleRecord:
+        """Look up the record at a position in ascending vehicle ID order
+
+        :param position: index into the known vehicles, sorted by ID
+        :type position: int
+        :return: the record
+        :rtype: VehicleRecord
+        """
+        return self.records[self.vehicle_ids[position]]
+
+
+class VehicleTableView:
+    """A virtualized ttk.Treeview showing a VehicleTable
+
+    The tree holds a fixed number of rows (its height) that act as a window onto the table, moved with the scrollbar
+    or the mouse wheel. refresh() only writes rows whose vehicle changed since it was last shown or that now show a
+    different vehicle, so the cost per refresh does not depend on the number of vehicles.
+
+    :param parent: the widget to place the view in
+    :type parent: tkinter.Widget
+    :param table: the table to show
+    :type table: VehicleTable
+    :param height: the number of visible rows, defaults to 11
+    :type height: int
+    :param names: display names for special vehicle IDs (e.g., the receiver), defaults to none
+    :type names: dict
+    """
+
+    COLUMNS = (("id", "Vehicle ID", 80), ("location", "Location", 220), ("speed", "Speed (km/hr)", 100),
+               ("reputation", "Reputation", 80))
+
+    def __init__(self, parent, table: VehicleTable, height: int = 11, names: dict = None):
+        """VehicleTableView constructor
+        """
+        self.table = table
+        self.height = height
+        self.names = names if names is not None else {}
+
+        self.frame = ttk.Frame(parent)
+        self.tree = ttk.Treeview(self.frame, columns=[c[0] for c in self.COLUMNS], show="headings", height=height,
+                                 selectmode="none")
+        for column, heading, width in self.COLUMNS:
+            self.tree.heading(column, text=heading)
+            self.tree.column(column, width=width, anchor="center")
+
+        self.scrollbar = ttk.Scrollbar(self.frame, orient="vertical", command=self.scroll)
+        self.tree.bind("<MouseWheel>", self.wheel)
+        self.tree.bind("<Button-4>", lambda event: self.scroll("scroll", -1, "units"))
+        self.tree.bind("<Button-5>", lambda event: self.scroll("scroll", 1, "units"))
+
+        self.tree.grid(row=0, column=0, sticky="nsew")
+        self.scrollbar.grid(row=0, column=1, sticky="ns")
+
+        # the rows are created lazily as vehicles appear and then reused; shown[i] is the record row i displays
+        self.rows = []
+        self.shown = []
+        self.first = 0
+
+    def grid(self, **kwargs) -> None:
+        """Place the view with the grid geometry manager
+        """
+        self.frame.grid(**kwargs)
+
+    def scroll(self, *args) -> None:
+        """Scrollbar command: handles ("moveto", fraction) and ("scroll", amount, "units" | "pages")
+        """
+        if args[0] == "moveto":
+            first = int(float(args[1]) * len(self.table))
+        elif args[0] == "scroll":
+            step = self.height if args[2] == "pages" else 1
+            first = self.first + int(args[1]) * step
+        else:
+            return
+
+        self.first = max(0, min(first, len(self.table) - self.height))
+        self.refresh()
+
+    def wheel(self, event) -> None:
+        """Scroll by one row per notch of the mouse wheel
+        """
+        self.scroll("scroll", -1 if event.delta > 0 else 1, "units")
+
+    def refresh(self) -> None:
+        """Write the visible rows whose vehicle is dirty or changed (Tk thread only)
+        """
+        total = len(self.table)
+        self.first = max(0, min(self.first, total - self.height))
+        visible = min(self.height, total)
+
+        while len(self.rows) < visible:
+            self.rows.append(self.tree.insert("", "end", values=("", "", "", "")))
+            self.shown.append(None)
+
+        for i in range(visible):
+            record = self.table.at(self.first + i)
+            if record is self.shown[i] and not record.dirty:
+                continue
+
+            name = self.names.get(record.vehicle_id, str(record.vehicle_id))
+            self.tree.item(self.rows[i], values=(name, record.location, record.speed, record.reputation))
+            self.shown[i] = record
+            record.dirty = False
+
+        if total > 0:
+            self.scrollbar.set(self.first / total, (self.first + visible) / total)
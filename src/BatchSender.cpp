@@ -0,0 +1,134 @@
+// Copyright (c) 2022. Geoff Twardokus
+// Reuse permitted under the MIT License as specified in the LICENSE file within this project.
+
+#include <sys/socket.h>
+#include <algorithm>
+#include <cerrno>
+#include <cstdio>
+#include <cstdlib>
+#include <map>
+#include <mutex>
+#include <sstream>
+
+#include "BatchSender.h"
+
+
+BatchSender::BatchSender(const struct sockaddr_in &destination, int senders, int batch_size, int queue_capacity) {
+    this->destination = destination;
+    this->batch_size = batch_size > 0 ? batch_size : 1;
+    sockfd = shared_socket(ntohs(destination.sin_port));
+
+    size_t sender_count = senders > 0 ? senders : std::max(std::thread::hardware_concurrency(), 1u);
+    for(size_t i = 0; i < sender_count; i++)
+        this->senders.emplace_back(new sender(queue_capacity));
+    for(auto &queue_owner : this->senders)
+        queue_owner->thread = std::thread(&BatchSender::run, this, std::ref(*queue_owner));
+}
+
+BatchSender::~BatchSender() {
+    close();
+}
+
+bool BatchSender::send(int vehicle, frame data) {
+    return senders[vehicle % senders.size()]->queue.push(std::move(data));
+}
+
+void BatchSender::close() {
+    for(auto &queue_owner : senders)
+        queue_owner->queue.close();
+    for(auto &queue_owner : senders) {
+        if(queue_owner->thread.joinable())
+            queue_owner->thread.join();
+    }
+}
+
+// one socket per destination port, opened on first use and shared by every sender for the rest of the run
+int BatchSender::shared_socket(uint16_t port) {
+    static std::mutex lock;
+    static std::map<uint16_t, int> sockets;
+
+    std::lock_guard<std::mutex> guard(lock);
+    auto found = sockets.find(port);
+    if(found != sockets.end())
+        return found->second;
+
+    int sockfd;
+    if((sockfd = socket(AF_INET, SOCK_DGRAM, 0)) < 0) {
+        perror("socket creation failed");
+        exit(EXIT_FAILURE);
+    }
+    sockets[port] = sockfd;
+    return sockfd;
+}
+
+void BatchSender::run(sender &queue_owner) {
+    std::vector<frame> batch;
+    batch.reserve(batch_size);
+
+    // pop_many() waits for the first frame and then takes whatever else is already queued
+    while(queue_owner.queue.pop_many(batch, batch_size) > 0) {
+        send_batch(batch);
+        batch.clear();
+    }
+}
+
+void BatchSender::send_batch(std::vector<frame> &batch) {
+    std::vector<struct mmsghdr> messages(batch.size());
+    std::vector<struct iovec> buffers(batch.size());
+
+    for(size_t i = 0; i < batch.size(); i++) {
+        buffers[i].iov_base = batch[i].data();
+        buffers[i].iov_len = batch[i].size();
+        messages[i] = mmsghdr();
+        messages[i].msg_hdr.msg_name = &destination;
+        messages[i].msg_hdr.msg_namelen = sizeof(destination);
+        messages[i].msg_hdr.msg_iov = &buffers[i];
+        messages[i].msg_hdr.msg_iovlen = 1;
+    }
+
+    size_t done = 0;
+    while(done < batch.size()) {
+        int sent = sendmmsg(sockfd, &messages[done], batch.size() - done, MSG_CONFIRM);
+        send_calls++;
+        if(sent < 0) {
+            if(errno == EINTR)
+                continue;
+            // sendmmsg fails on the first frame it cannot send; drop that frame and go on with the rest
+            send_errors++;
+            done++;
+        }
+        else {
+            frames_sent += sent;
+            done += sent;
+        }
+    }
+
+    size_t bucket = 0;
+    for(size_t size = batch.size(); size > 1 && bucket < BATCH_SENDER_SIZE_BUCKETS - 1; size >>= 1)
+        bucket++;
+    batch_sizes[bucket]++;
+}
+
+std::string BatchSender::summary() const {
+    std::ostringstream out;
+    unsigned long batches = 0;
+    for(auto &count : batch_sizes)
+        batches += count;
+
+    out << frames_sent << " frames in " << send_calls << " sendmmsg calls on " << senders.size() << " sender threads, "
+        << send_errors << " send errors, batch sizes:";
+    for(size_t bucket = 0; bucket < BATCH_SENDER_SIZE_BUCKETS; bucket++) {
+        if(batch_sizes[bucket] == 0)
+            continue;
+        unsigned long low = 1ul << bucket;
+        out << " " << low;
+        if(bucket == BATCH_SENDER_SIZE_BUCKETS - 1)
+            out << "+";
+        else if(low > 1)
+            out << "-" << (low << 1) - 1;
+        out << ": " << batch_sizes[bucket];
+    }
+    if(batches == 0)
+        out << " none";
+    return out.str();
+}
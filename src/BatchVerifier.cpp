@@ -0,0 +1,221 @@
+// Copyright (c) 2022. Geoff Twardokus
+// Reuse permitted under the MIT License as specified in the LICENSE file within this project.
+
+#include <algorithm>
+#include <cstring>
+#include <cstdio>
+#include <cstdlib>
+#include <openssl/ecdsa.h>
+#include "BatchVerifier.h"
+#include "v2vcrypto.h"
+
+
+BatchVerifier::BatchVerifier() {
+    context = BN_CTX_new();
+    if(context == nullptr) {
+        perror("Error allocating BN_CTX");
+        exit(EXIT_FAILURE);
+    }
+}
+
+BatchVerifier::~BatchVerifier() {
+    BN_CTX_free(context);
+}
+
+size_t BatchVerifier::add(const unsigned char *hash, const unsigned char *signature, unsigned int signature_length,
+                          EC_KEY *verification_key) {
+
+    entry e;
+    memcpy(e.hash, hash, SHA256_DIGEST_LENGTH);
+    // an oversized signature is kept truncated and fails verification
+    size_t copied = std::min<size_t>(signature_length, sizeof(e.signature));
+    memcpy(e.signature, signature, copied);
+    e.signature_length = signature_length;
+    e.verification_key = verification_key;
+
+    // replayed SPDUs carry the exact same hash and signature, which only need to be verified once
+    std::string identity((const char *) &verification_key, sizeof(verification_key));
+    identity.append((const char *) e.hash, SHA256_DIGEST_LENGTH);
+    identity.append((const char *) e.signature, copied);
+
+    size_t index = entries.size();
+    auto found = first_seen.emplace(identity, index);
+    e.duplicate_of = found.first->second;
+    if(!found.second)
+        duplicates++;
+
+    entries.push_back(e);
+    return index;
+}
+
+std::vector<bool> BatchVerifier::verify() {
+
+    std::vector<bool> results(entries.size(), false);
+
+    // group the distinct signatures by signer, keeping the order in which signers first appear
+    std::vector<std::vector<size_t>> groups;
+    std::unordered_map<EC_KEY *, size_t> group_of_key;
+    for(size_t i = 0; i < entries.size(); i++) {
+        if(entries[i].duplicate_of != i)
+            continue;
+        auto found = group_of_key.emplace(entries[i].verification_key, groups.size());
+        if(found.second)
+            groups.emplace_back();
+        groups[found.first->second].push_back(i);
+    }
+
+    for(auto &group : groups) {
+        verify_signer(group, results);
+    }
+
+    for(size_t i = 0; i < entries.size(); i++) {
+        results[i] = results[entries[i].duplicate_of];
+    }
+
+    clear();
+    return results;
+}
+
+void BatchVerifier::clear() {
+    entries.clear();
+    first_seen.clear();
+}
+
+void BatchVerifier::verify_signer(const std::vector<size_t> &group, std::vector<bool> &results) {
+
+    EC_KEY *key = entries[group.front()].verification_key;
+    const EC_GROUP *curve = key != nullptr ? EC_KEY_get0_group(key) : nullptr;
+    const EC_POINT *public_key = key != nullptr ? EC_KEY_get0_public_key(key) : nullptr;
+    if(curve == nullptr || public_key == nullptr) {
+        for(size_t i : group) results[i] = verify_individually(entries[i]);
+        return;
+    }
+
+    const BIGNUM *order = EC_GROUP_get0_order(curve);
+    int order_bits = BN_num_bits(order);
+
+    // parse the DER signatures; anything ECDSA_verify would reject (non-canonical encoding, r or s out of range) is
+    // left to the individual verification to report
+    std::vector<ECDSA_SIG *> signatures(group.size(), nullptr);
+    std::vector<size_t> batch;
+    for(size_t g = 0; g < group.size(); g++) {
+        entry &e = entries[group[g]];
+        if(e.signature_length > sizeof(e.signature))
+            continue;
+
+        const unsigned char *p = e.signature;
+        ECDSA_SIG *signature = d2i_ECDSA_SIG(nullptr, &p, e.signature_length);
+        if(signature == nullptr)
+            continue;
+        signatures[g] = signature;
+
+        unsigned char *der = nullptr;
+        int der_length = i2d_ECDSA_SIG(signature, &der);
+        bool canonical = der_length == (int) e.signature_length && memcmp(der, e.signature, der_length) == 0;
+        OPENSSL_free(der);
+
+        const BIGNUM *r, *s;
+        ECDSA_SIG_get0(signature, &r, &s);
+        bool in_range = !BN_is_zero(r) && !BN_is_negative(r) && BN_ucmp(r, order) < 0 &&
+                        !BN_is_zero(s) && !BN_is_negative(s) && BN_ucmp(s, order) < 0;
+
+        if(canonical && in_range)
+            batch.push_back(g);
+    }
+
+    std::vector<bool> passed(group.size(), false);
+
+    if(!batch.empty()) {
+        BN_CTX_start(context);
+        BIGNUM *inverse = BN_CTX_get(context);
+        BIGNUM *e = BN_CTX_get(context);
+        BIGNUM *u1 = BN_CTX_get(context);
+        BIGNUM *u2 = BN_CTX_get(context);
+        BIGNUM *x = BN_CTX_get(context);
+        if(x == nullptr) {
+            perror("Error allocating BIGNUM");
+            exit(EXIT_FAILURE);
+        }
+
+        // Montgomery's trick: prefix[i] = s_0 * ... * s_i, so one inversion of the full product yields every s_i^-1
+        std::vector<BIGNUM *> prefix(batch.size(), nullptr);
+        for(size_t b = 0; b < batch.size(); b++) {
+            const BIGNUM *s;
+            ECDSA_SIG_get0(signatures[batch[b]], nullptr, &s);
+            prefix[b] = BN_new();
+            if(b == 0)
+                BN_copy(prefix[b], s);
+            else
+                BN_mod_mul(prefix[b], prefix[b - 1], s, order, context);
+        }
+        if(BN_mod_inverse(inverse, prefix.back(), order, context) == nullptr) {
+            perror("Error inverting signature batch");
+            exit(EXIT_FAILURE);
+        }
+
+        // R = u1*G + u2*Q with u1 = e * s^-1 and u2 = r * s^-1
+        std::vector<EC_POINT *> points(batch.size(), nullptr);
+        for(size_t b = batch.size(); b-- > 0;) {
+            const BIGNUM *r, *s;
+            ECDSA_SIG_get0(signatures[batch[b]], &r, &s);
+
+            BIGNUM *w = prefix[b];
+            if(b == 0)
+                BN_copy(w, inverse);
+            else
+                BN_mod_mul(w, inverse, prefix[b - 1], order, context);
+            BN_mod_mul(inverse, inverse, s, order, context);
+
+            BN_bin2bn(entries[group[batch[b]]].hash, SHA256_DIGEST_LENGTH, e);
+            if(8 * SHA256_DIGEST_LENGTH > order_bits)
+                BN_rshift(e, e, 8 * SHA256_DIGEST_LENGTH - order_bits);
+
+            BN_mod_mul(u1, e, w, order, context);
+            BN_mod_mul(u2, r, w, order, context);
+
+            points[b] = EC_POINT_new(curve);
+            if(points[b] == nullptr || !EC_POINT_mul(curve, points[b], u1, public_key, u2, context)) {
+                perror("Error in batched ECDSA point multiplication");
+                exit(EXIT_FAILURE);
+            }
+        }
+
+        // one field inversion converts every R to affine coordinates
+        std::vector<EC_POINT *> finite;
+        for(EC_POINT *point : points) {
+            if(!EC_POINT_is_at_infinity(curve, point))
+                finite.push_back(point);
+        }
+        if(!finite.empty() && !EC_POINTs_make_affine(curve, finite.size(), finite.data(), context)) {
+            perror("Error converting batched ECDSA points to affine coordinates");
+            exit(EXIT_FAILURE);
+        }
+
+        // the signature is valid if x(R) mod n == r
+        for(size_t b = 0; b < batch.size(); b++) {
+            const BIGNUM *r;
+            ECDSA_SIG_get0(signatures[batch[b]], &r, nullptr);
+            if(!EC_POINT_is_at_infinity(curve, points[b]) &&
+               EC_POINT_get_affine_coordinates(curve, points[b], x, nullptr, context) &&
+               BN_nnmod(x, x, order, context) && BN_cmp(x, r) == 0)
+                passed[batch[b]] = true;
+
+            EC_POINT_free(points[b]);
+            BN_free(prefix[b]);
+        }
+
+        BN_CTX_end(context);
+    }
+
+    for(size_t g = 0; g < group.size(); g++) {
+        ECDSA_SIG_free(signatures[g]);
+        results[group[g]] = passed[g] || verify_individually(entries[group[g]]);
+    }
+}
+
+bool BatchVerifier::verify_individually(entry &e) {
+    fallbacks++;
+    if(e.verification_key == nullptr || e.signature_length > sizeof(e.signature))
+        return false;
+    return ecdsa_verify(e.hash, e.signature, &e.signature_length, e.verification_key) == 1;
+}
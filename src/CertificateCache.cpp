@@ -0,0 +1,51 @@
+// Copyright (c) 2022. Geoff Twardokus
+// Reuse permitted under the MIT License as specified in the LICENSE file within this project.
+
+#include "CertificateCache.h"
+
+
+CertificateCache::CertificateCache(size_t capacity, std::chrono::seconds ttl) {
+    this->capacity = capacity > 0 ? capacity : 1;
+    this->ttl = ttl;
+}
+
+bool CertificateCache::contains(const digest &certificate_digest) {
+    std::lock_guard<std::mutex> guard(lock);
+
+    auto found = index.find(certificate_digest);
+    if(found == index.end()) {
+        misses++;
+        return false;
+    }
+
+    if(std::chrono::steady_clock::now() >= found->second->expires) {
+        entries.erase(found->second);
+        index.erase(found);
+        misses++;
+        return false;
+    }
+
+    entries.splice(entries.begin(), entries, found->second);
+    hits++;
+    return true;
+}
+
+void CertificateCache::insert(const digest &certificate_digest) {
+    std::lock_guard<std::mutex> guard(lock);
+    auto expires = std::chrono::steady_clock::now() + ttl;
+
+    auto found = index.find(certificate_digest);
+    if(found != index.end()) {
+        found->second->expires = expires;
+        entries.splice(entries.begin(), entries, found->second);
+        return;
+    }
+
+    entries.push_front({certificate_digest, expires});
+    index[certificate_digest] = entries.begin();
+
+    if(entries.size() > capacity) {
+        index.erase(entries.back().certificate_digest);
+        entries.pop_back();
+    }
+}
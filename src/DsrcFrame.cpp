@@ -0,0 +1,42 @@
+// Copyright (c) 2022. Geoff Twardokus
+// Reuse permitted under the MIT License as specified in the LICENSE file within this project.
+
+#include <sys/socket.h>
+#include <sys/uio.h>
+
+#include "DsrcFrame.h"
+
+
+frame_status receive_frame(int sockfd, void *header, size_t header_length, void *payload, size_t payload_length) {
+    struct iovec parts[2];
+    parts[0].iov_base = header;
+    parts[0].iov_len = header_length;
+    parts[1].iov_base = payload;
+    parts[1].iov_len = payload_length;
+
+    struct msghdr message = {};
+    message.msg_iov = parts;
+    message.msg_iovlen = 2;
+
+    ssize_t length = recvmsg(sockfd, &message, MSG_TRUNC);
+    if(length < 0)
+        return FRAME_ERROR;
+    if((size_t) length < header_length + payload_length)
+        return FRAME_TRUNCATED;
+    if((size_t) length > header_length + payload_length)
+        return FRAME_OVERSIZED;
+    return FRAME_OK;
+}
+
+const char *frame_status_name(frame_status status) {
+    switch(status) {
+        case FRAME_OK:
+            return "ok";
+        case FRAME_TRUNCATED:
+            return "truncated";
+        case FRAME_OVERSIZED:
+            return "oversized";
+        default:
+            return "error";
+    }
+}
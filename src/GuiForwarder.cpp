@@ -0,0 +1,72 @@
+// Copyright (c) 2022. Geoff Twardokus
+// Reuse permitted under the MIT License as specified in the LICENSE file within this project.
+
+#include <sys/socket.h>
+#include <cstdio>
+#include <cstdlib>
+#include <cstring>
+#include <unistd.h>
+
+#include "GuiForwarder.h"
+
+
+GuiForwarder::GuiForwarder(uint16_t port, int records_per_datagram, std::chrono::milliseconds max_delay) {
+
+    if(records_per_datagram < 1 || records_per_datagram > GUI_MAX_RECORDS_PER_DATAGRAM) {
+        fprintf(stderr, "GUI records per datagram must be between 1 and %d\n", GUI_MAX_RECORDS_PER_DATAGRAM);
+        exit(EXIT_FAILURE);
+    }
+    this->records_per_datagram = records_per_datagram;
+
+    if(max_delay.count() < 1) {
+        fprintf(stderr, "GUI datagram delay must be at least 1 ms\n");
+        exit(EXIT_FAILURE);
+    }
+    this->max_delay = max_delay;
+
+    if ((sockfd = socket(AF_INET, SOCK_DGRAM, 0)) < 0) {
+        perror("socket creation failed");
+        exit(EXIT_FAILURE);
+    }
+
+    memset(&gui_address, 0, sizeof(gui_address));
+
+    gui_address.sin_family = AF_INET;
+    gui_address.sin_port = htons(port);
+    gui_address.sin_addr.s_addr = INADDR_ANY;
+
+    datagram.header = gui_datagram_header();
+}
+
+GuiForwarder::~GuiForwarder() {
+    flush();
+    close(sockfd);
+}
+
+void GuiForwarder::forward(const packed_bsm_for_gui &record) {
+    if(datagram.header.record_count == 0)
+        first_pending = std::chrono::steady_clock::now();
+    datagram.records[datagram.header.record_count++] = record;
+    if(datagram.header.record_count >= records_per_datagram)
+        flush();
+}
+
+void GuiForwarder::flush() {
+    if(datagram.header.record_count == 0)
+        return;
+
+    int64_t forwarded_time = std::chrono::duration_cast<std::chrono::microseconds>(
+            std::chrono::system_clock::now().time_since_epoch()).count();
+    for(int i = 0; i < datagram.header.record_count; i++)
+        datagram.records[i].forwarded_time = forwarded_time;
+
+    size_t length = sizeof(datagram.header) + datagram.header.record_count * sizeof(packed_bsm_for_gui);
+    sendto(sockfd, &datagram, length, MSG_CONFIRM, (const struct sockaddr *) &gui_address, sizeof(gui_address));
+
+    datagram.header.record_count = 0;
+}
+
+void GuiForwarder::flush_if_due() {
+    if(datagram.header.record_count > 0 && std::chrono::steady_clock::now() - first_pending >= max_delay)
+        flush();
+}
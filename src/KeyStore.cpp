@@ -0,0 +1,302 @@
+// Copyright (c) 2022. Geoff Twardokus
+// Reuse permitted under the MIT License as specified in the LICENSE file within this project.
+
+#include <sys/stat.h>
+#include <fcntl.h>
+#include <unistd.h>
+#include <cstdio>
+#include <cstring>
+#include <iostream>
+#include <utility>
+#include <openssl/obj_mac.h>
+#include <openssl/pem.h>
+
+#include "KeyStore.h"
+
+
+static bool same_time(const struct timespec &a, const struct timespec &b) {
+    return a.tv_sec == b.tv_sec && a.tv_nsec == b.tv_nsec;
+}
+
+static bool newer(const struct timespec &a, const struct timespec &b) {
+    return a.tv_sec > b.tv_sec || (a.tv_sec == b.tv_sec && a.tv_nsec > b.tv_nsec);
+}
+
+KeyStore::KeyStore(std::string key_directory, std::string cert_key_directory, size_t capacity,
+                   std::chrono::milliseconds reload_interval) {
+    this->key_directory = std::move(key_directory);
+    this->cert_key_directory = std::move(cert_key_directory);
+    this->capacity = capacity > 0 ? capacity : 1;
+    this->reload_interval = reload_interval;
+}
+
+KeyStore::key_pointer KeyStore::get(int vehicle_id, bool certificate) {
+    std::unique_lock<std::mutex> guard(lock);
+    long key = index_key(vehicle_id, certificate);
+
+    // wait while another caller loads this key for the first time (its entry may be evicted meanwhile)
+    auto found = index.find(key);
+    while(found != index.end() && found->second->first_load) {
+        first_loaded.wait(guard);
+        found = index.find(key);
+    }
+    auto now = std::chrono::steady_clock::now();
+
+    if(found != index.end()) {
+        auto cached = found->second;
+        entries.splice(entries.begin(), entries, cached);
+
+        // missing keys are cached too, so they are only looked for again once the reload interval has passed
+        if(cached->loading || now - cached->last_checked < reload_interval)
+            return cached->key;
+
+        // hot reload: pick up a replaced key file or bundle, a key file that is now newer than the bundle, or a
+        // key that was missing; other callers keep getting the current key meanwhile
+        cached->loading = true;
+        cached->last_checked = now;
+        entry current = *cached;
+        bundle_pointer keys = refresh_bundle(now);
+        guard.unlock();
+
+        entry reloaded{};
+        std::string path;
+        struct timespec modified{};
+        bool changed = false;
+        if(!current.key || (locate(*keys, vehicle_id, certificate, path, modified) &&
+                            (path != current.path || !same_time(modified, current.modified)))) {
+            changed = load(*keys, vehicle_id, certificate, reloaded);
+            if(changed)
+                std::cout << "Reloaded verification key for vehicle " << vehicle_id << " from " << reloaded.path
+                          << std::endl;
+        }
+
+        guard.lock();
+        found = index.find(key);
+        if(found != index.end() && !found->second->first_load) {
+            found->second->loading = false;
+            if(changed) {
+                found->second->key = reloaded.key;
+                found->second->path = reloaded.path;
+                found->second->modified = reloaded.modified;
+            }
+        }
+        return changed ? reloaded.key : current.key;
+    }
+
+    // first load: callers asking for the same key wait for it, all others go ahead
+    insert({vehicle_id, certificate, nullptr, "", {}, now, true, true});
+    bundle_pointer keys = refresh_bundle(now);
+    guard.unlock();
+
+    entry loaded{};
+    load(*keys, vehicle_id, certificate, loaded);
+    loaded.last_checked = now;
+
+    guard.lock();
+    found = index.find(key);
+    if(found == index.end())
+        insert(loaded);
+    else if(found->second->first_load)
+        *found->second = loaded;
+    first_loaded.notify_all();
+    return loaded.key;
+}
+
+// Adds an entry as the most recently used one, evicting the least recently used entry beyond the capacity
+void KeyStore::insert(const entry &loaded) {
+    entries.push_front(loaded);
+    index[index_key(loaded.vehicle_id, loaded.certificate)] = entries.begin();
+
+    if(entries.size() > capacity) {
+        index.erase(index_key(entries.back().vehicle_id, entries.back().certificate));
+        entries.pop_back();
+    }
+}
+
+/*
+ * Reads a key bundle and watches it for changes from then on. Returns false, leaving the store to read PEM files
+ * only until a valid bundle appears at the path, if the bundle does not exist or is invalid.
+ */
+bool KeyStore::load_bundle(const std::string &path) {
+    bundle_pointer keys = read_bundle(path);
+
+    std::lock_guard<std::mutex> guard(lock);
+    bundle = keys;
+    bundle_checked = std::chrono::steady_clock::now();
+    return !keys->entries.empty();
+}
+
+/*
+ * Reads a key bundle with one read call. The bundle holds no keys if the file does not exist or is invalid.
+ */
+KeyStore::bundle_pointer KeyStore::read_bundle(const std::string &path) {
+    auto keys = std::make_shared<key_bundle>();
+    keys->path = path;
+
+    int fd = open(path.c_str(), O_RDONLY);
+    if(fd < 0)
+        return keys;
+
+    struct stat status{};
+    if(fstat(fd, &status) < 0) {
+        close(fd);
+        return keys;
+    }
+    keys->modified = status.st_mtim;
+
+    std::vector<char> contents(status.st_size);
+    ssize_t bytes = read(fd, contents.data(), contents.size());
+    close(fd);
+
+    key_bundle_header header{};
+    if(bytes < (ssize_t) sizeof(header)) {
+        std::cout << "Ignoring key bundle " << path << ": file is too short" << std::endl;
+        return keys;
+    }
+    memcpy(&header, contents.data(), sizeof(header));
+
+    if(memcmp(header.magic, KEY_BUNDLE_MAGIC, sizeof(header.magic)) != 0 ||
+       header.version != KEY_BUNDLE_VERSION ||
+       header.entry_size != sizeof(key_bundle_entry) ||
+       sizeof(header) + (size_t) header.entry_count * sizeof(key_bundle_entry) > (size_t) bytes) {
+        std::cout << "Ignoring key bundle " << path << ": invalid header" << std::endl;
+        return keys;
+    }
+
+    keys->entries.resize(header.entry_count);
+    memcpy(keys->entries.data(), contents.data() + sizeof(header), header.entry_count * sizeof(key_bundle_entry));
+    return keys;
+}
+
+/*
+ * Re-reads the key bundle if it changed, checking at most once per reload interval, and returns the current bundle.
+ * The caller holds the lock.
+ */
+KeyStore::bundle_pointer KeyStore::refresh_bundle(std::chrono::steady_clock::time_point now) {
+    if(bundle->path.empty() || now - bundle_checked < reload_interval)
+        return bundle;
+    bundle_checked = now;
+
+    struct stat status{};
+    if(stat(bundle->path.c_str(), &status) != 0)
+        status.st_mtim = {};
+    if(!same_time(status.st_mtim, bundle->modified)) {
+        bundle = read_bundle(bundle->path);
+        if(!bundle->entries.empty())
+            std::cout << "Reloaded verification keys from " << bundle->path << std::endl;
+    }
+    return bundle;
+}
+
+bool KeyStore::is_bundled(const key_bundle &keys, int vehicle_id, bool certificate) {
+    return vehicle_id >= 0 && (size_t) vehicle_id < keys.entries.size() &&
+           (keys.entries[vehicle_id].flags & (certificate ? KEY_BUNDLE_HAS_CERTIFICATE_KEY : KEY_BUNDLE_HAS_KEY));
+}
+
+/*
+ * Finds where a vehicle's key is read from: the key bundle, unless the vehicle has no bundled key or its PEM file is
+ * newer than the bundle. Sets the path and modification time of that source, or returns false if there is none.
+ */
+bool KeyStore::locate(const key_bundle &keys, int vehicle_id, bool certificate, std::string &path,
+                      struct timespec &modified) const {
+    std::string directory = (certificate ? cert_key_directory : key_directory) + "/" + std::to_string(vehicle_id);
+
+    struct stat status{};
+    path = directory + "/p256.pub";
+    bool has_file = stat(path.c_str(), &status) == 0;
+    if(!has_file) {
+        path = directory + "/p256.key";
+        has_file = stat(path.c_str(), &status) == 0;
+    }
+
+    if(is_bundled(keys, vehicle_id, certificate) && !(has_file && newer(status.st_mtim, keys.modified))) {
+        path = keys.path;
+        modified = keys.modified;
+        return true;
+    }
+    modified = status.st_mtim;
+    return has_file;
+}
+
+bool KeyStore::load_from_bundle(const key_bundle &keys, int vehicle_id, bool certificate, entry &loaded) {
+    const key_bundle_entry &bundled = keys.entries[vehicle_id];
+
+    EC_KEY *key = EC_KEY_new_by_curve_name(NID_X9_62_prime256v1);
+    const uint8_t *point = certificate ? bundled.certificate_key : bundled.key;
+    if(key == nullptr || EC_KEY_oct2key(key, point, sizeof(bundled.key), nullptr) != 1) {
+        EC_KEY_free(key);
+        std::cout << "Invalid bundled key for vehicle " << vehicle_id << std::endl;
+        return false;
+    }
+
+    loaded.key = key_pointer(key, EC_KEY_free);
+    return true;
+}
+
+/*
+ * Loads a vehicle's key from its current source. Without a key (none found or unreadable), `loaded` is left without
+ * one and false is returned. Called without holding the lock.
+ */
+bool KeyStore::load(const key_bundle &keys, int vehicle_id, bool certificate, entry &loaded) const {
+    loaded.vehicle_id = vehicle_id;
+    loaded.certificate = certificate;
+
+    std::string path;
+    struct timespec modified{};
+    if(!locate(keys, vehicle_id, certificate, path, modified)) {
+        std::cout << "No verification key found for vehicle " << vehicle_id << " in "
+                  << (certificate ? cert_key_directory : key_directory) << std::endl;
+        return false;
+    }
+
+    if(path == keys.path) {
+        if(!load_from_bundle(keys, vehicle_id, certificate, loaded))
+            return false;
+    }
+    else {
+        key_pointer key = read_public_key(path);
+        if(!key) {
+            std::cout << "Error while loading the key from " << path << std::endl;
+            return false;
+        }
+        if(is_bundled(keys, vehicle_id, certificate))
+            std::cout << "Using " << path << " for vehicle " << vehicle_id << ", it is newer than the key bundle"
+                      << std::endl;
+        loaded.key = key;
+    }
+
+    loaded.path = path;
+    loaded.modified = modified;
+    return true;
+}
+
+/*
+ * Reads a PEM public key, or a PEM private key from which only the public point is kept, so that private key
+ * material never stays in the receiver's memory.
+ */
+KeyStore::key_pointer KeyStore::read_public_key(const std::string &path) {
+    FILE *fp = fopen(path.c_str(), "r");
+    if(fp == nullptr)
+        return nullptr;
+
+    EC_KEY *key = PEM_read_EC_PUBKEY(fp, nullptr, nullptr, nullptr);
+    if(key == nullptr) {
+        rewind(fp);
+        EC_KEY *private_key = PEM_read_ECPrivateKey(fp, nullptr, nullptr, nullptr);
+        if(private_key != nullptr) {
+            key = EC_KEY_new();
+            if(key == nullptr ||
+               EC_KEY_set_group(key, EC_KEY_get0_group(private_key)) != 1 ||
+               EC_KEY_set_public_key(key, EC_KEY_get0_public_key(private_key)) != 1) {
+                EC_KEY_free(key);
+                key = nullptr;
+            }
+            EC_KEY_free(private_key);
+        }
+    }
+    fclose(fp);
+
+    if(key == nullptr)
+        return nullptr;
+    return key_pointer(key, EC_KEY_free);
+}
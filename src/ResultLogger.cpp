@@ -0,0 +1,153 @@
+// Copyright (c) 2022. Geoff Twardokus
+// Reuse permitted under the MIT License as specified in the LICENSE file within this project.
+
+#include <cinttypes>
+#include <cstdlib>
+
+#include "ResultLogger.h"
+
+
+ResultLogger::ResultLogger(const receiver_options &options) {
+    level = parse_level(options.log_level);
+    capacity = options.log_capacity > 0 ? options.log_capacity : 1;
+
+    if(!options.results_log.empty()) {
+        if(options.results_format == "jsonl")
+            json_lines = true;
+        else if(options.results_format != "binary") {
+            fprintf(stderr, "Results log format must be \"binary\" or \"jsonl\", not \"%s\"\n",
+                    options.results_format.c_str());
+            exit(EXIT_FAILURE);
+        }
+
+        if((results_file = fopen(options.results_log.c_str(), "wb")) == nullptr) {
+            perror("Error opening results log");
+            exit(EXIT_FAILURE);
+        }
+        setvbuf(results_file, nullptr, _IOFBF, 1 << 20);
+
+        if(!json_lines) {
+            result_log_header header;
+            fwrite(&header, sizeof(header), 1, results_file);
+        }
+    }
+
+    writer = std::thread(&ResultLogger::run, this);
+}
+
+ResultLogger::~ResultLogger() {
+    close();
+}
+
+log_level ResultLogger::parse_level(const std::string &name) {
+    if(name == "error")
+        return LOG_ERROR;
+    if(name == "warning")
+        return LOG_WARNING;
+    if(name == "info")
+        return LOG_INFO;
+    if(name == "debug")
+        return LOG_DEBUG;
+    fprintf(stderr, "Log level must be \"error\", \"warning\", \"info\" or \"debug\", not \"%s\"\n", name.c_str());
+    exit(EXIT_FAILURE);
+}
+
+void ResultLogger::log(log_level level, const std::string &message) {
+    if(!enabled(level))
+        return;
+    {
+        std::lock_guard<std::mutex> guard(lock);
+        if(closed)
+            return;
+        if(messages.size() >= capacity) {
+            dropped++;
+            return;
+        }
+        messages.push_back(message);
+    }
+    pending.notify_one();
+}
+
+void ResultLogger::record(const verification_record &result) {
+    if(results_file == nullptr)
+        return;
+    {
+        std::lock_guard<std::mutex> guard(lock);
+        if(closed)
+            return;
+        if(records.size() >= capacity) {
+            dropped++;
+            return;
+        }
+        records.push_back(result);
+    }
+    pending.notify_one();
+}
+
+void ResultLogger::close() {
+    {
+        std::lock_guard<std::mutex> guard(lock);
+        closed = true;
+    }
+    pending.notify_one();
+    if(writer.joinable())
+        writer.join();
+
+    if(results_file != nullptr) {
+        fclose(results_file);
+        results_file = nullptr;
+    }
+}
+
+void ResultLogger::run() {
+    std::vector<std::string> message_batch;
+    std::vector<verification_record> record_batch;
+
+    while(true) {
+        bool done;
+        {
+            // swap out everything buffered so far and write it without holding the lock
+            std::unique_lock<std::mutex> guard(lock);
+            pending.wait(guard, [this] { return closed || !messages.empty() || !records.empty(); });
+            message_batch.swap(messages);
+            record_batch.swap(records);
+            done = closed;
+        }
+
+        for(const std::string &message : message_batch)
+            fwrite(message.data(), 1, message.size(), stdout);
+        if(!message_batch.empty())
+            fflush(stdout);
+        // flushed once per batch, so a receiver that is killed loses at most the records still buffered in memory
+        if(!record_batch.empty()) {
+            write_records(record_batch);
+            fflush(results_file);
+        }
+
+        message_batch.clear();
+        record_batch.clear();
+
+        // closed is only read after taking the last entries, so nothing logged before close() is lost
+        if(done)
+            break;
+    }
+}
+
+void ResultLogger::write_records(const std::vector<verification_record> &batch) {
+    if(!json_lines) {
+        fwrite(batch.data(), sizeof(verification_record), batch.size(), results_file);
+        return;
+    }
+
+    for(const verification_record &result : batch) {
+        fprintf(results_file, "{\"sequence\": %" PRIu64 ", \"vehicle_id\": %u, \"generated_time\": %" PRId64
+                ", \"received_time\": %" PRId64 ", \"verified_time\": %" PRId64 ", \"reported_time\": %" PRId64
+                ", \"valid\": %s, \"certificate_valid\": %s, \"signature_valid\": %s, \"recent\": %s}\n",
+                result.sequence, (unsigned) result.vehicle_id, result.generated_time, result.received_time,
+                result.verified_time, result.reported_time,
+                result.outcome & RESULT_VALID ? "true" : "false",
+                result.outcome & RESULT_CERTIFICATE_VALID ? "true" : "false",
+                result.outcome & RESULT_SIGNATURE_VALID ? "true" : "false",
+                result.outcome & RESULT_RECENT ? "true" : "false");
+    }
+}
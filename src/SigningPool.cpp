@@ -0,0 +1,60 @@
+// Copyright (c) 2022. Geoff Twardokus
+// Reuse permitted under the MIT License as specified in the LICENSE file within this project.
+
+#include <algorithm>
+#include <iomanip>
+#include <sstream>
+
+#include "SigningPool.h"
+
+
+SigningPool::SigningPool(int workers, int queue_capacity) : jobs(queue_capacity) {
+    size_t worker_count = workers > 0 ? workers : std::max(std::thread::hardware_concurrency(), 1u);
+    for(size_t i = 0; i < worker_count; i++)
+        this->workers.emplace_back(&SigningPool::run, this);
+}
+
+SigningPool::~SigningPool() {
+    close();
+}
+
+std::future<BatchSender::frame> SigningPool::prepare(Vehicle &vehicle, int timestep, timestamp generated_time) {
+    job next{&vehicle, timestep, generated_time, clock::now(), std::promise<BatchSender::frame>()};
+    std::future<BatchSender::frame> result = next.result.get_future();
+    jobs.push(std::move(next));
+    return result;
+}
+
+void SigningPool::close() {
+    jobs.close();
+    for(auto &worker : workers) {
+        if(worker.joinable())
+            worker.join();
+    }
+}
+
+void SigningPool::run() {
+    job next;
+    while(jobs.pop(next)) {
+        clock::time_point started = clock::now();
+        BatchSender::frame signed_frame = next.vehicle->prepare_spdu(next.timestep, next.generated_time);
+        clock::time_point finished = clock::now();
+        next.result.set_value(std::move(signed_frame));
+
+        long sign_us = std::chrono::duration_cast<std::chrono::microseconds>(finished - started).count();
+        total_wait_us += std::chrono::duration_cast<std::chrono::microseconds>(started - next.queued).count();
+        total_sign_us += sign_us;
+        if(sign_us > max_sign_us)
+            max_sign_us = sign_us;
+        signed_count++;
+    }
+}
+
+std::string SigningPool::summary() const {
+    unsigned long count = signed_count;
+    std::ostringstream out;
+    out << std::fixed << std::setprecision(3) << count << " SPDUs signed by " << workers.size()
+        << " workers, queued mean " << (count > 0 ? total_wait_us / 1000.0 / count : 0) << " ms, signing mean "
+        << (count > 0 ? total_sign_us / 1000.0 / count : 0) << " ms, max " << max_sign_us / 1000.0 << " ms";
+    return out.str();
+}
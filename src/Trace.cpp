@@ -0,0 +1,136 @@
+// Copyright (c) 2022. Geoff Twardokus
+// Reuse permitted under the MIT License as specified in the LICENSE file within this project.
+
+#include <cerrno>
+#include <cstdio>
+#include <cstdlib>
+#include <cstring>
+#include <fcntl.h>
+#include <iostream>
+#include <sys/mman.h>
+#include <sys/stat.h>
+#include <unistd.h>
+
+#include "Trace.h"
+
+
+std::shared_ptr<Trace> Trace::load(int vehicle_id, const std::string &directory) {
+
+    std::shared_ptr<Trace> trace(new Trace());
+    std::string path = directory + "/" + std::to_string(vehicle_id);
+
+    if(trace->map_binary(path + ".bin", vehicle_id))
+        return trace;
+
+    if(trace->parse_csv(path + ".csv"))
+        return trace;
+
+    perror(("Error opening trace file for vehicle " + std::to_string(vehicle_id)).c_str());
+    exit(EXIT_FAILURE);
+}
+
+Trace::~Trace() {
+    if(mapping != nullptr)
+        munmap(mapping, mapping_length);
+}
+
+bool Trace::map_binary(const std::string &path, int vehicle_id) {
+
+    int fd = open(path.c_str(), O_RDONLY);
+    if(fd < 0)
+        return false;
+
+    struct stat file_status;
+    if(fstat(fd, &file_status) < 0 || (size_t) file_status.st_size < sizeof(trace_file_header)) {
+        close(fd);
+        std::cout << "Ignoring " << path << ": not a trace file" << std::endl;
+        return false;
+    }
+
+    mapping_length = file_status.st_size;
+    mapping = mmap(nullptr, mapping_length, PROT_READ, MAP_PRIVATE, fd, 0);
+    close(fd);
+    if(mapping == MAP_FAILED) {
+        mapping = nullptr;
+        perror(("Error mapping " + path).c_str());
+        return false;
+    }
+
+    trace_file_header header;
+    memcpy(&header, mapping, sizeof(header));
+
+    size_t values = (size_t) header.row_count * header.column_count;
+    bool valid = memcmp(header.magic, TRACE_FILE_MAGIC, sizeof(header.magic)) == 0 &&
+                 header.version == TRACE_FILE_VERSION &&
+                 header.data_offset % sizeof(float) == 0 &&
+                 header.data_offset >= sizeof(trace_file_header) &&
+                 header.column_count >= 3 &&
+                 header.data_offset + values * sizeof(float) <= mapping_length;
+    if(!valid || header.vehicle_id != (uint32_t) vehicle_id) {
+        std::cout << "Ignoring " << path << ": " << (valid ? "trace belongs to another vehicle" : "invalid header")
+                  << std::endl;
+        munmap(mapping, mapping_length);
+        mapping = nullptr;
+        return false;
+    }
+
+    // tell the kernel the whole trace will be read front to back
+    madvise(mapping, mapping_length, MADV_WILLNEED);
+
+    data = (const float *) ((const char *) mapping + header.data_offset);
+    row_count = header.row_count;
+    column_count = header.column_count;
+    flags = header.flags;
+    return true;
+}
+
+bool Trace::parse_csv(const std::string &path) {
+
+    FILE *file = fopen(path.c_str(), "r");
+    if(file == nullptr)
+        return false;
+
+    // values are parsed row by row into one flat buffer, then transposed to the column-major layout
+    std::vector<float> row_major;
+    char *line = nullptr;
+    size_t line_capacity = 0;
+    while(getline(&line, &line_capacity, file) != -1) {
+        size_t columns = 0;
+        char *position = line;
+        char *end;
+        for(float value = strtof(position, &end); end != position; value = strtof(position, &end)) {
+            row_major.push_back(value);
+            columns++;
+            position = end;
+            while(*position == ',' || *position == ' ' || *position == '\t')
+                position++;
+        }
+        if(columns == 0)
+            continue;
+
+        if(column_count == 0)
+            column_count = columns;
+        else if(columns != column_count) {
+            std::cout << path << ": row " << row_count + 1 << " has " << columns << " columns, expected "
+                      << column_count << std::endl;
+            exit(EXIT_FAILURE);
+        }
+        row_count++;
+    }
+    free(line);
+    fclose(file);
+
+    if(column_count < 3) {
+        std::cout << path << ": a trace needs at least x, y and elevation columns" << std::endl;
+        exit(EXIT_FAILURE);
+    }
+
+    parsed.resize(row_major.size());
+    for(size_t row = 0; row < row_count; row++) {
+        for(size_t column = 0; column < column_count; column++) {
+            parsed[column * row_count + row] = row_major[row * column_count + column];
+        }
+    }
+    data = parsed.data();
+    return true;
+}
@@ -0,0 +1,217 @@
+// Copyright (c) 2022. Geoff Twardokus
+// Reuse permitted under the MIT License as specified in the LICENSE file within this project.
+
+#include <netinet/in.h>
+#include <sys/socket.h>
+#include <unistd.h>
+#include <algorithm>
+#include <deque>
+#include <functional>
+#include <iomanip>
+#include <iostream>
+#include <queue>
+#include <random>
+#include <thread>
+
+#include "TransmitScheduler.h"
+
+
+TransmitScheduler::TransmitScheduler(std::vector<Vehicle> &vehicles, int num_msgs, bool test,
+                                     const transmitter_options &options, BatchSender *sender, SigningPool *signer)
+                                     : vehicles(vehicles) {
+    this->num_msgs = num_msgs;
+    this->test = test;
+    this->options = options;
+    this->sender = sender;
+    this->signer = signer;
+}
+
+void TransmitScheduler::run() {
+    size_t loop_count = options.event_loops > 0 ? options.event_loops : std::max(std::thread::hardware_concurrency(), 1u);
+    loop_count = std::max<size_t>(std::min(loop_count, vehicles.size()), 1);
+
+    statistics.clear();
+    for(size_t i = 0; i < loop_count; i++)
+        statistics.emplace_back(new loop_statistics());
+
+    // stagger the vehicles across their first interval
+    start = clock::now();
+    system_start = std::chrono::time_point_cast<std::chrono::microseconds>(std::chrono::system_clock::now());
+    std::mt19937 random(0);
+    first_due.clear();
+    for(Vehicle &vehicle : vehicles) {
+        auto interval = std::chrono::duration_cast<std::chrono::milliseconds>(interval_of(vehicle));
+        vehicle.set_interval_ms((int) interval.count());
+        std::uniform_int_distribution<long> offset(0, interval_of(vehicle).count() - 1);
+        first_due.push_back(start + std::chrono::microseconds(offset(random)));
+    }
+
+    std::vector<std::thread> loops;
+    for(size_t i = 0; i < loop_count; i++)
+        loops.emplace_back(&TransmitScheduler::run_loop, this, i, loop_count);
+
+    // report until every vehicle has sent all of its messages
+    unsigned long expected = (unsigned long) num_msgs * vehicles.size();
+    auto stats_interval = std::chrono::seconds(std::max(options.stats_interval_seconds, 1));
+    auto next_stats = start + stats_interval;
+    while(true) {
+        unsigned long sent = 0;
+        for(auto &loop_stats : statistics)
+            sent += loop_stats->sent;
+        if(sent >= expected)
+            break;
+
+        std::this_thread::sleep_for(std::chrono::milliseconds(50));
+        if(options.stats_interval_seconds > 0 && clock::now() >= next_stats) {
+            report(false);
+            next_stats += stats_interval;
+        }
+    }
+
+    for(auto &loop : loops)
+        loop.join();
+    report(true);
+}
+
+std::chrono::microseconds TransmitScheduler::interval_of(const Vehicle &vehicle) const {
+    auto custom = options.vehicle_interval_ms.find(vehicle.get_number());
+    int interval_ms = custom != options.vehicle_interval_ms.end() ? custom->second : options.interval_ms;
+    return std::chrono::milliseconds(std::max(interval_ms, 1));
+}
+
+unsigned long TransmitScheduler::scheduled_by(clock::time_point time) const {
+    unsigned long scheduled = 0;
+    for(size_t v = 0; v < vehicles.size(); v++) {
+        if(time >= first_due[v])
+            scheduled += std::min<unsigned long>((time - first_due[v]) / interval_of(vehicles[v]) + 1, num_msgs);
+    }
+    return scheduled;
+}
+
+void TransmitScheduler::run_loop(size_t loop, size_t loop_count) {
+    int sockfd = -1;
+    if(sender == nullptr && (sockfd = socket(AF_INET, SOCK_DGRAM, 0)) < 0) {
+        perror("socket creation failed");
+        exit(EXIT_FAILURE);
+    }
+    struct sockaddr_in servaddr = Vehicle::transmit_address(test);
+
+    loop_statistics &loop_stats = *statistics[loop];
+    std::mt19937 random(loop + 1);
+    std::uniform_int_distribution<long> jitter(-options.jitter_ms * 1000L, options.jitter_ms * 1000L);
+
+    // deadlines follow from the start of the schedule, not from when the previous message went out
+    auto due_time = [&](size_t v, int step) {
+        if(step == 0)
+            return first_due[v];
+        return first_due[v] + step * interval_of(vehicles[v]) + std::chrono::microseconds(jitter(random));
+    };
+
+    // the number of messages sent so far by every vehicle this loop drives, and their next deadlines
+    std::vector<int> timestep(vehicles.size(), 0);
+    std::priority_queue<deadline, std::vector<deadline>, std::greater<deadline>> heap;
+
+    // with a signing pool, the SPDUs of the next sign_ahead_steps deadlines of every vehicle are being prepared
+    std::vector<std::deque<pending_spdu>> pending(signer != nullptr ? vehicles.size() : 0);
+    auto prepare = [&](size_t v, int step) {
+        clock::time_point due = due_time(v, step);
+        pending[v].push_back({due, signer->prepare(vehicles[v], step, system_time(due))});
+    };
+
+    for(size_t v = loop; v < vehicles.size(); v += loop_count) {
+        if(num_msgs <= 0)
+            continue;
+        if(signer != nullptr) {
+            for(int step = 0; step < std::min(num_msgs, std::max(options.sign_ahead_steps, 1)); step++)
+                prepare(v, step);
+            heap.push({pending[v].front().due, v});
+        }
+        else
+            heap.push({first_due[v], v});
+    }
+
+    while(!heap.empty()) {
+        deadline next = heap.top();
+        heap.pop();
+
+        std::this_thread::sleep_until(next.due);
+        Vehicle &vehicle = vehicles[next.vehicle];
+        int sent = ++timestep[next.vehicle];
+        long lateness_us;
+
+        if(signer != nullptr) {
+            // the SPDU was signed ahead of time, so only wait for it if the signers have fallen behind
+            std::future<BatchSender::frame> &ready = pending[next.vehicle].front().spdu;
+            if(ready.wait_for(std::chrono::seconds(0)) != std::future_status::ready)
+                loop_stats.stalls++;
+            BatchSender::frame spdu = ready.get();
+            pending[next.vehicle].pop_front();
+
+            lateness_us = std::chrono::duration_cast<std::chrono::microseconds>(clock::now() - next.due).count();
+            if(sender != nullptr)
+                sender->send(vehicle.get_number(), std::move(spdu));
+            else
+                sendto(sockfd, spdu.data(), spdu.size(), MSG_CONFIRM, (const struct sockaddr *) &servaddr,
+                       sizeof(servaddr));
+
+            int step = sent + std::max(options.sign_ahead_steps, 1) - 1;
+            if(step < num_msgs)
+                prepare(next.vehicle, step);
+            if(!pending[next.vehicle].empty())
+                heap.push({pending[next.vehicle].front().due, next.vehicle});
+        }
+        else {
+            lateness_us = std::chrono::duration_cast<std::chrono::microseconds>(clock::now() - next.due).count();
+            if(sender != nullptr)
+                vehicle.send_spdu(*sender, sent - 1);
+            else
+                vehicle.send_spdu(sockfd, servaddr, sent - 1);
+
+            if(sent < num_msgs)
+                heap.push({due_time(next.vehicle, sent), next.vehicle});
+        }
+
+        loop_stats.total_lateness_us += lateness_us;
+        if(lateness_us > loop_stats.max_lateness_us)
+            loop_stats.max_lateness_us = lateness_us;
+        loop_stats.sent++;
+    }
+
+    if(sockfd >= 0)
+        close(sockfd);
+}
+
+// the wall-clock time at which a deadline falls, to stamp SPDUs signed ahead of it
+SigningPool::timestamp TransmitScheduler::system_time(clock::time_point due) const {
+    return system_start + std::chrono::duration_cast<std::chrono::microseconds>(due - start);
+}
+
+void TransmitScheduler::report(bool final) {
+    unsigned long sent = 0;
+    long total_lateness_us = 0, max_lateness_us = 0;
+    unsigned long stalls = 0;
+    for(auto &loop_stats : statistics) {
+        sent += loop_stats->sent;
+        stalls += loop_stats->stalls;
+        total_lateness_us += loop_stats->total_lateness_us;
+        max_lateness_us = std::max(max_lateness_us, (long) loop_stats->max_lateness_us);
+    }
+
+    clock::time_point now = clock::now();
+    double seconds = std::chrono::duration<double>(now - start).count();
+    unsigned long scheduled = final ? (unsigned long) num_msgs * vehicles.size() : scheduled_by(now);
+    double achieved = seconds > 0 ? sent / seconds : 0;
+    double target = seconds > 0 ? scheduled / seconds : 0;
+
+    std::cerr << std::fixed << std::setprecision(1) << "[transmitter] " << (final ? "done: " : "") << sent
+              << " messages from " << vehicles.size() << " vehicles on " << statistics.size() << " event loops in "
+              << seconds << " s: " << achieved << " msg/s of " << target << " msg/s target ("
+              << (target > 0 ? achieved / target * 100 : 0) << "%), lateness mean "
+              << (sent > 0 ? total_lateness_us / 1000.0 / sent : 0) << " ms, max " << max_lateness_us / 1000.0
+              << " ms" << std::endl;
+
+    // per-stage times of the pipelined mode: waiting for and signing in the pool, then the send stage
+    if(signer != nullptr)
+        std::cerr << "[transmitter] signing: " << signer->summary() << "; " << stalls
+                  << " SPDUs were not signed by their deadline" << std::endl;
+}
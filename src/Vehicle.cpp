@@ -9,27 +9,53 @@
 #include <chrono>
 #include <openssl/err.h>
 #include "Vehicle.h"
+#include "GuiForwarder.h"
+#include "DsrcFrame.h"
 #include <openssl/pem.h>
 #include <thread>
+#include <new>
+#include <map>
+#include <algorithm>
 #include <sstream>
-#include <fstream>
 
 
 std::string Vehicle::get_hostname() {
    return hostname;
 }
 
-void Vehicle::transmit(int num_msgs, bool test) {
+void Vehicle::transmit(int num_msgs, bool test, int interval_ms, BatchSender *sender) {
 
-    // create socket and send data
-    int sockfd;
-    struct sockaddr_in servaddr;
+    set_interval_ms(interval_ms);
 
-    if ((sockfd = socket(AF_INET, SOCK_DGRAM, 0)) < 0) {
+    // create socket and send data, unless a batched sender sends for us
+    int sockfd = -1;
+
+    if (sender == nullptr && (sockfd = socket(AF_INET, SOCK_DGRAM, 0)) < 0) {
         perror("socket creation failed");
         exit(EXIT_FAILURE);
     }
 
+    struct sockaddr_in servaddr = transmit_address(test);
+
+    for(int i =0; i < num_msgs; i++) {
+
+        if(sender != nullptr)
+            send_spdu(*sender, i);
+        else
+            send_spdu(sockfd, servaddr, i);
+
+        std::this_thread::sleep_for(std::chrono::milliseconds(interval_ms));
+
+    }
+
+    if(sockfd >= 0)
+        close(sockfd);
+
+}
+
+// where transmitted SPDUs go: the test receiver (6666) or the GNU Radio flowgraph (52001)
+struct sockaddr_in Vehicle::transmit_address(bool test) {
+    struct sockaddr_in servaddr;
     memset(&servaddr, 0, sizeof(servaddr));
 
     servaddr.sin_family = AF_INET;
@@ -38,28 +64,37 @@ void Vehicle::transmit(int num_msgs, bool test) {
     else
         servaddr.sin_port = htons(52001);
     servaddr.sin_addr.s_addr = INADDR_ANY;
+    return servaddr;
+}
 
-    int n, len;
-
-    for(int i =0; i < num_msgs; i++) {
-
-        ecdsa_spdu next_spdu;
-        generate_ecdsa_spdu(next_spdu, i);
-        sendto(sockfd, (struct ecdsa_spdu *) &next_spdu, sizeof(next_spdu), MSG_CONFIRM,
-               (const struct sockaddr *) &servaddr, sizeof(servaddr));
-
-        std::this_thread::sleep_for(std::chrono::milliseconds(100));
-
-    }
+// generates, signs and sends the SPDU for one timestep of this vehicle's trace
+void Vehicle::send_spdu(int sockfd, const struct sockaddr_in &address, int timestep) {
+    ecdsa_spdu next_spdu;
+    generate_ecdsa_spdu(next_spdu, timestep);
+    sendto(sockfd, (struct ecdsa_spdu *) &next_spdu, sizeof(next_spdu), MSG_CONFIRM,
+           (const struct sockaddr *) &address, sizeof(address));
+}
 
-    close(sockfd);
+// like send_spdu() above, but leaves sending to a BatchSender
+void Vehicle::send_spdu(BatchSender &sender, int timestep) {
+    sender.send(number, prepare_spdu(timestep, now()));
+}
 
+// generates and signs the SPDU for one timestep ahead of sending it, stamped with the time it is going to be sent
+BatchSender::frame Vehicle::prepare_spdu(int timestep, timestamp generated_time) {
+    ecdsa_spdu next_spdu;
+    generate_ecdsa_spdu(next_spdu, timestep, generated_time);
+    auto bytes = (const unsigned char *) &next_spdu;
+    return BatchSender::frame(bytes, bytes + sizeof(next_spdu));
 }
 
-void Vehicle::receive(int num_msgs, bool test, bool tkgui) {
+void Vehicle::receive(int num_msgs, bool test, bool tkgui, const receiver_options &options) {
+
+    if(!options.key_bundle.empty() && verification_keys->load_bundle(options.key_bundle))
+        std::cout << "Loaded verification keys from " << options.key_bundle << std::endl;
 
     int sockfd;
-    struct sockaddr_in servaddr, cliaddr;
+    struct sockaddr_in servaddr;
 
     if ((sockfd = socket(AF_INET, SOCK_DGRAM, 0)) < 0) {
         perror("socket creation failed");
@@ -67,7 +102,6 @@ void Vehicle::receive(int num_msgs, bool test, bool tkgui) {
     }
 
     memset(&servaddr, 0, sizeof(servaddr));
-    memset(&cliaddr, 0, sizeof(cliaddr));
 
     servaddr.sin_family = AF_INET;
     servaddr.sin_addr.s_addr = INADDR_ANY;
@@ -80,107 +114,285 @@ void Vehicle::receive(int num_msgs, bool test, bool tkgui) {
         exit(EXIT_FAILURE);
     }
 
-    /***********************************/
-    // tkgui socket
-    int sockfd2;
-    struct sockaddr_in servaddr2;
+    // The receive pipeline has three stages connected by bounded queues: this thread reads SPDUs from the socket,
+    // a pool of workers verifies them in parallel, and a single reporting thread forwards the results to the GUI and
+    // prints them (optionally restoring the order in which they were received).
+    BlockingQueue<received_spdu> received(options.queue_capacity);
+    BlockingQueue<verified_spdu> verified(options.queue_capacity);
+
+    int num_workers = std::max(options.verification_workers, 1);
+    std::vector<std::thread> workers;
+    for(int i = 0; i < num_workers; i++) {
+        if(options.batch_verification)
+            workers.emplace_back(&Vehicle::verify_received_batches, this, std::ref(received), std::ref(verified),
+                                 std::cref(options));
+        else
+            workers.emplace_back(&Vehicle::verify_received_spdus, this, std::ref(received), std::ref(verified));
+    }
+    ResultLogger logger(options);
+    std::thread reporter(&Vehicle::report_verified_spdus, this, std::ref(received), std::ref(verified), tkgui,
+                         std::cref(options), std::ref(logger));
 
-    if ((sockfd2 = socket(AF_INET, SOCK_DGRAM, 0)) < 0) {
-        perror("socket creation failed");
-        exit(EXIT_FAILURE);
+    // this is to prevent a truly infinite loop
+    unsigned long received_message_counter = 0;
+    unsigned long rejected_frames[FRAME_ERROR] = {};
+
+    // with DSRC headers (when data is from SDR), every frame starts with an extra 57 bytes (57 + 304 = 361), which
+    // are received into a separate buffer so the SPDU lands directly in the work item
+    uint8_t header[DSRC_HEADER_LENGTH];
+    size_t header_length = test ? 0 : DSRC_HEADER_LENGTH;
+
+    while (received_message_counter < (unsigned long) num_msgs) {
+        received_spdu item;
+
+        frame_status status = receive_frame(sockfd, header, header_length, &item.spdu, sizeof(ecdsa_spdu));
+        if(status == FRAME_ERROR) {
+            perror("recvmsg failed");
+            continue;
+        }
+        if(status != FRAME_OK) {
+            rejected_frames[status]++;
+            logger.log(LOG_DEBUG, std::string("[receiver] rejected ") + frame_status_name(status) + " frame\n");
+            continue;
+        }
+        // for getting times when BSMs are received (security check for replay attacks)
+        item.received_time = now();
+        item.sequence = received_message_counter++;
+
+        received.push(item);
     }
 
-    memset(&servaddr2, 0, sizeof(servaddr2));
+    // let the workers finish what is queued, then the reporter
+    received.close();
+    for(auto &worker : workers) {
+        worker.join();
+    }
+    verified.close();
+    reporter.join();
 
-    servaddr2.sin_family = AF_INET;
-    servaddr2.sin_port = htons(9999);
-    servaddr2.sin_addr.s_addr = INADDR_ANY;
+    if(rejected_frames[FRAME_TRUNCATED] > 0 || rejected_frames[FRAME_OVERSIZED] > 0)
+        logger.log(LOG_WARNING, "[receiver] rejected " + std::to_string(rejected_frames[FRAME_TRUNCATED]) +
+                                " truncated and " + std::to_string(rejected_frames[FRAME_OVERSIZED]) +
+                                " oversized frames\n");
+    logger.close();
 
-    int n2, len2;
-    /***********************************/
+    close(sockfd);
+    exit(0);
 
+}
 
-    unsigned int len;
-    len = sizeof(cliaddr);
+void Vehicle::verify_received_spdus(BlockingQueue<received_spdu> &received, BlockingQueue<verified_spdu> &verified) {
 
-    ecdsa_spdu incoming_spdu;
+    received_spdu item;
+    while(received.pop(item)) {
+        int vehicle_id_number = item.spdu.vehicle_id;
+        uint8_t outcome = verify_message_ecdsa(item.spdu, item.received_time, vehicle_id_number);
+        verified.push({item.sequence, outcome, item.received_time, now(), item.spdu});
+    }
 
-    // this is to prevent a truly infinite loop
-    int received_message_counter = 0;
+}
 
-    // for getting times when BSMs are received (security check for replay attacks)
-    using timestamp = std::chrono::time_point<std::chrono::system_clock, std::chrono::microseconds>;
+/*
+ * Batched variant of verify_received_spdus: SPDUs are collected until `batch_size` have arrived or `batch_window_ms`
+ * has passed since the first one, and the signatures of the whole batch are verified together by a BatchVerifier.
+ * Results are identical to verifying every SPDU with verify_message_ecdsa.
+ */
+void Vehicle::verify_received_batches(BlockingQueue<received_spdu> &received, BlockingQueue<verified_spdu> &verified,
+                                      const receiver_options &options) {
+
+    struct pending_spdu {
+        bool checks_passed = false;
+        bool certificate_cached = false;
+        size_t certificate_signature = 0;
+        size_t message_signature = 0;
+        CertificateCache::digest certificate_digest;
+        KeyStore::key_pointer verification_key, certificate_verification_key;
+    };
+
+    BatchVerifier batch_verifier;
+    std::vector<received_spdu> batch;
+    std::vector<pending_spdu> pending;
+    size_t batch_size = std::max(options.batch_size, 1);
+
+    received_spdu item;
+    while(received.pop(item)) {
+        batch.clear();
+        batch.push_back(item);
+
+        auto window_end = std::chrono::steady_clock::now() + std::chrono::milliseconds(options.batch_window_ms);
+        while(batch.size() < batch_size) {
+            auto remaining = std::chrono::duration_cast<std::chrono::milliseconds>(
+                    window_end - std::chrono::steady_clock::now());
+            if(remaining.count() <= 0 || !received.pop(item, remaining))
+                break;
+            batch.push_back(item);
+        }
 
-    while (received_message_counter < num_msgs) {
-        if(test) {
-            recvfrom(sockfd, (struct ecdsa_spdu *) &incoming_spdu, sizeof(ecdsa_spdu), 0, (struct sockaddr *) &cliaddr,
-                     (socklen_t *) len);
+        pending.assign(batch.size(), pending_spdu());
+        for(size_t i = 0; i < batch.size(); i++) {
+            ecdsa_spdu &spdu = batch[i].spdu;
+            pending_spdu &p = pending[i];
+
+            p.verification_key = verification_keys->get(spdu.vehicle_id, false);
+            p.certificate_verification_key = verification_keys->get(spdu.vehicle_id, true);
+            if(!p.verification_key || !p.certificate_verification_key || !signature_lengths_valid(spdu))
+                continue;
+            p.checks_passed = true;
+
+            unsigned char certificate_hash[SHA256_DIGEST_LENGTH];
+            hash_certificate(spdu, p.certificate_verification_key.get(), certificate_hash, p.certificate_digest);
+            p.certificate_cached = verified_certificates->contains(p.certificate_digest);
+            if(!p.certificate_cached)
+                p.certificate_signature = batch_verifier.add(certificate_hash, spdu.data.certificate_signature,
+                                                             spdu.certificate_signature_buffer_length,
+                                                             p.certificate_verification_key.get());
+
+            unsigned char hash[SHA256_DIGEST_LENGTH];
+            sha256sum(&spdu.data.signedData.tbsData, sizeof(spdu.data.signedData.tbsData), hash);
+            p.message_signature = batch_verifier.add(hash, spdu.signature, spdu.signature_buffer_length,
+                                                     p.verification_key.get());
         }
-        else {
-            // with DSRC headers (when data is from SDR), we have an extra 57 bytes (304 + 57 = 361)
-            uint8_t buffer[361];
-            recvfrom(sockfd,  &buffer, 361, 0, (struct sockaddr *) &cliaddr,
-                     (socklen_t *) len);
-
-            uint8_t spdu_buffer[sizeof(incoming_spdu)];
-            for(int i = 360, j = sizeof(incoming_spdu) - 1; i > 57; i--, j--) {
-                spdu_buffer[j] = buffer[i];
+
+        std::vector<bool> results = batch_verifier.verify();
+
+        for(size_t i = 0; i < batch.size(); i++) {
+            pending_spdu &p = pending[i];
+            uint8_t outcome = 0;
+            if(p.checks_passed) {
+                bool cert_result = p.certificate_cached || results[p.certificate_signature];
+                if(cert_result && !p.certificate_cached)
+                    verified_certificates->insert(p.certificate_digest);
+                outcome = outcome_of(cert_result, results[p.message_signature],
+                                     is_recent(batch[i].spdu, batch[i].received_time));
             }
+            verified.push({batch[i].sequence, outcome, batch[i].received_time, now(), batch[i].spdu});
+        }
+    }
 
-            memcpy(&incoming_spdu, spdu_buffer, sizeof(incoming_spdu));
+}
 
-        }
-        timestamp received_time = std::chrono::time_point_cast<std::chrono::microseconds>(std::chrono::system_clock::now());
+void Vehicle::report_verified_spdus(BlockingQueue<received_spdu> &received, BlockingQueue<verified_spdu> &verified,
+                                    bool tkgui, const receiver_options &options, ResultLogger &logger) {
 
-        std::cout << incoming_spdu.vehicle_id << std::endl;
-        int vehicle_id_number = incoming_spdu.vehicle_id;
+    // forwards results to the GUI (port 9999) when running with --gui
+    GuiForwarder gui_forwarder(9999, options.gui_records_per_datagram,
+                               std::chrono::milliseconds(options.gui_max_datagram_delay_ms));
 
+    // with ordered results, SPDUs verified ahead of an earlier one wait here until it is done
+    std::map<unsigned long, verified_spdu> out_of_order;
+    unsigned long next_sequence = 0;
+    unsigned long reported = 0;
+    unsigned long valid = 0;
 
-        bool valid_spdu = verify_message_ecdsa(incoming_spdu, received_time, vehicle_id_number);
+    auto report = [&](verified_spdu &result) {
+        ecdsa_spdu &spdu = result.spdu;
+        int vehicle_id_number = spdu.vehicle_id;
+        bool valid_spdu = result.outcome & RESULT_VALID;
+        timestamp generated_time = spdu.data.signedData.tbsData.headerInfo.timestamp;
+        timestamp reported_time = now();
 
-        // forward to GUI if applicable
+        // forward to GUI if applicable, with the time the SPDU reached each stage (the forwarder sets forwarded_time)
         if(tkgui) {
-            packed_bsm_for_gui data_for_gui = {incoming_spdu.data.signedData.tbsData.message.latitude,
-                                               incoming_spdu.data.signedData.tbsData.message.longitude,
-                                               incoming_spdu.data.signedData.tbsData.message.elevation,
-                                               incoming_spdu.data.signedData.tbsData.message.speed,
-                                               incoming_spdu.data.signedData.tbsData.message.heading,
+            std::chrono::duration<float, std::milli> elapsed_time = result.received_time - generated_time;
+            packed_bsm_for_gui data_for_gui = {spdu.data.signedData.tbsData.message.latitude,
+                                               spdu.data.signedData.tbsData.message.longitude,
+                                               spdu.data.signedData.tbsData.message.elevation,
+                                               spdu.data.signedData.tbsData.message.speed,
+                                               spdu.data.signedData.tbsData.message.heading,
                                                valid_spdu,
-                                               true,
-                                               7,
-                                               (float) vehicle_id_number};
-            sendto(sockfd2, (struct packed_bsm_for_gui *) &data_for_gui, sizeof(data_for_gui),
-                    MSG_CONFIRM, (const struct sockaddr *) &servaddr2, sizeof(servaddr2));
+                                               (result.outcome & RESULT_RECENT) != 0,
+                                               elapsed_time.count(),
+                                               (float) vehicle_id_number,
+                                               generated_time.time_since_epoch().count(),
+                                               result.received_time.time_since_epoch().count(),
+                                               result.verified_time.time_since_epoch().count(),
+                                               0};
+            gui_forwarder.forward(data_for_gui);
+        }
+
+        // log results; the writer thread does the I/O
+        logger.record({result.sequence,
+                       generated_time.time_since_epoch().count(),
+                       result.received_time.time_since_epoch().count(),
+                       result.verified_time.time_since_epoch().count(),
+                       reported_time.time_since_epoch().count(),
+                       spdu.vehicle_id,
+                       result.outcome});
+        if(logger.enabled(LOG_DEBUG)) {
+            std::ostringstream out;
+            out << spdu.vehicle_id << "\n" << std::string(80, '-') << "\n";
+            print_spdu(spdu, valid_spdu, out);
+            print_bsm(spdu, out);
+            logger.log(LOG_DEBUG, out.str());
+        }
+        reported++;
+        if(valid_spdu)
+            valid++;
+    };
+
+    auto stats_interval = std::chrono::seconds(options.stats_interval_seconds);
+    auto next_stats = std::chrono::steady_clock::now() + stats_interval;
+
+    // wake up often enough to send partial GUI datagrams on time
+    auto pop_timeout = std::min(std::chrono::milliseconds(100),
+                                std::chrono::milliseconds(options.gui_max_datagram_delay_ms));
+
+    verified_spdu result;
+    while(!verified.drained()) {
+        if(verified.pop(result, pop_timeout)) {
+            if(!options.ordered_results) {
+                report(result);
+            }
+            else {
+                out_of_order.emplace(result.sequence, result);
+                for(auto next = out_of_order.find(next_sequence); next != out_of_order.end();
+                    next = out_of_order.find(next_sequence)) {
+                    report(next->second);
+                    out_of_order.erase(next);
+                    next_sequence++;
+                }
+            }
+            gui_forwarder.flush_if_due();
+        }
+        else {
+            // nothing arrived for a while, so do not hold back a partial datagram
+            gui_forwarder.flush();
         }
-        // print results
-        for(int i = 0; i < 80; i++) std::cout << "-"; std::cout << std::endl;
-        print_spdu(incoming_spdu, valid_spdu);
-        print_bsm(incoming_spdu);
-        received_message_counter++;
 
+        if(options.stats_interval_seconds > 0 && std::chrono::steady_clock::now() >= next_stats) {
+            std::ostringstream out;
+            out << "[receiver] queue depth: verification " << received.size() << "/" << received.get_capacity()
+                << ", reporting " << verified.size() << "/" << verified.get_capacity() << ", reordering "
+                << out_of_order.size() << "; reported " << reported << "\n";
+            logger.log(LOG_INFO, out.str());
+            next_stats += stats_interval;
+        }
     }
-    close(sockfd2);
-    exit(0);
+    gui_forwarder.flush();
+
+    std::ostringstream out;
+    out << "[receiver] done: " << reported << " SPDUs, " << valid << " valid, " << reported - valid << " invalid";
+    if(logger.get_dropped() > 0)
+        out << "; " << logger.get_dropped() << " log entries dropped";
+    logger.log(LOG_INFO, out.str() + "\n");
 
 }
 
 void Vehicle::generate_ecdsa_spdu(Vehicle::ecdsa_spdu &spdu, int timestep) {
+    generate_ecdsa_spdu(spdu, timestep, now());
+}
+
+void Vehicle::generate_ecdsa_spdu(Vehicle::ecdsa_spdu &spdu, int timestep, timestamp generated_time) {
     spdu.vehicle_id = this->number;
 
     // BSM
     spdu.data.signedData.tbsData.message = generate_bsm(timestep);
 
     // timestamp
-    using timestamp = std::chrono::time_point<std::chrono::system_clock, std::chrono::microseconds>;
-    timestamp ts = std::chrono::time_point_cast<std::chrono::microseconds>(std::chrono::system_clock::now());
-    spdu.data.signedData.tbsData.headerInfo.timestamp = ts;
+    spdu.data.signedData.tbsData.headerInfo.timestamp = generated_time;
 
-    spdu.data.signedData.cert = vehicle_certificate_ecdsa;
-
-    // sign the certificate
-    unsigned char certificate_digest[SHA256_DIGEST_LENGTH];
-    sha256sum(&spdu.data.signedData.cert,sizeof(spdu.data.signedData.cert), certificate_digest);
-    ecdsa_sign(certificate_digest, cert_private_ec_key, &certificate_buffer_length, certificate_signature);
+    // the certificate was signed once when the vehicle was created, so copy it byte for byte
+    memcpy(&spdu.data.signedData.cert, signed_certificate, sizeof(spdu.data.signedData.cert));
 
     // copy the certificate signature buffer and certificate signature into the SPDU
     spdu.certificate_signature_buffer_length = certificate_buffer_length;
@@ -194,53 +406,70 @@ void Vehicle::generate_ecdsa_spdu(Vehicle::ecdsa_spdu &spdu, int timestep) {
 
 
 bsm Vehicle::generate_bsm(int timestep) {
-    float latitude = this->timestep[timestep][0];
-    float longitude = this->timestep[timestep][1];
-    float elevation = this->timestep[timestep][2];
+    float latitude = trace->at(timestep, TRACE_X_COLUMN);
+    float longitude = trace->at(timestep, TRACE_Y_COLUMN);
+    float elevation = trace->at(timestep, TRACE_ELEVATION_COLUMN);
     float speed = 0;
     float heading = 0;
-    if(timestep != 0) {
-        speed = calculate_speed_kph(this->timestep[timestep - 1][0],
+    if(trace->has_motion_columns()) {
+        // compiled traces (trace_tool.py compile) carry every row's speed and heading
+        speed = trace->at(timestep, TRACE_SPEED_COLUMN);
+        heading = trace->at(timestep, TRACE_HEADING_COLUMN);
+    }
+    else if(timestep != 0) {
+        speed = calculate_speed_kph(trace->at(timestep - 1, TRACE_X_COLUMN),
                                     latitude,
-                                    this->timestep[timestep - 1][1],
+                                    trace->at(timestep - 1, TRACE_Y_COLUMN),
                                     longitude,
-                                    100);
+                                    (float) interval_ms);
 
-        heading = calculate_heading(this->timestep[timestep - 1][0],
+        heading = calculate_heading(trace->at(timestep - 1, TRACE_X_COLUMN),
                                     latitude,
-                                    this->timestep[timestep - 1][1],
+                                    trace->at(timestep - 1, TRACE_Y_COLUMN),
                                     longitude);
     }
     bsm new_bsm = {latitude, longitude, elevation, speed, heading};
     return new_bsm;
 }
 
-void Vehicle::print_bsm(Vehicle::ecdsa_spdu &spdu) {
-
-    std::cout << "BSM received!" << std::endl;
-    std::cout << "\tLocation:\t";
-    std::cout << spdu.data.signedData.tbsData.message.latitude;
-    std::cout << ", ";
-    std::cout << spdu.data.signedData.tbsData.message.longitude;
-    std::cout <<", ";
-    std::cout << spdu.data.signedData.tbsData.message.elevation;
-    std::cout << std::endl;
-    std::cout << "\tSpeed:\t\t" << spdu.data.signedData.tbsData.message.speed << std::endl;
-    std::cout << "\tHeading:\t" << spdu.data.signedData.tbsData.message.heading << std::endl;
+void Vehicle::print_bsm(Vehicle::ecdsa_spdu &spdu, std::ostream &out) {
+
+    out << "BSM received!\n";
+    out << "\tLocation:\t";
+    out << spdu.data.signedData.tbsData.message.latitude;
+    out << ", ";
+    out << spdu.data.signedData.tbsData.message.longitude;
+    out <<", ";
+    out << spdu.data.signedData.tbsData.message.elevation;
+    out << "\n";
+    out << "\tSpeed:\t\t" << spdu.data.signedData.tbsData.message.speed << "\n";
+    out << "\tHeading:\t" << spdu.data.signedData.tbsData.message.heading << "\n";
 }
 
 /*
  * This is largely a debugging function so we can print and view received data, e.g., to make sure that things are being
  * sent and received properly.
  */
-void Vehicle::print_spdu(Vehicle::ecdsa_spdu &spdu, bool valid) {
-    std::cout << "SPDU received!" << std::endl;
-    std::cout << "\tID:\t" << (int) spdu.vehicle_id << std::endl;
-    std::cout << "\tValid:\t";
-    valid ? std::cout << "TRUE" : std::cout << "FALSE";
-    std::cout << std::endl;
-
-    std::cout << "\tSent:\t" << std::chrono::system_clock::to_time_t(spdu.data.signedData.tbsData.headerInfo.timestamp) << std::endl;
+void Vehicle::print_spdu(Vehicle::ecdsa_spdu &spdu, bool valid, std::ostream &out) {
+    out << "SPDU received!\n";
+    out << "\tID:\t" << (int) spdu.vehicle_id << "\n";
+    out << "\tValid:\t";
+    valid ? out << "TRUE" : out << "FALSE";
+    out << "\n";
+
+    out << "\tSent:\t" << std::chrono::system_clock::to_time_t(spdu.data.signedData.tbsData.headerInfo.timestamp) << "\n";
+}
+
+void Vehicle::sign_certificate() {
+
+    // zero the padding bytes too, so the signed bytes are exactly the bytes sent in every SPDU
+    ecdsa_explicit_certificate *certificate;
+    memset(signed_certificate, 0, sizeof(signed_certificate));
+    certificate = new (signed_certificate) ecdsa_explicit_certificate();
+
+    unsigned char certificate_digest[SHA256_DIGEST_LENGTH];
+    sha256sum(certificate, sizeof(*certificate), certificate_digest);
+    ecdsa_sign(certificate_digest, cert_private_ec_key, &certificate_buffer_length, certificate_signature);
 }
 
 void Vehicle::sign_message_ecdsa(Vehicle::ecdsa_spdu &spdu) {
@@ -248,41 +477,111 @@ void Vehicle::sign_message_ecdsa(Vehicle::ecdsa_spdu &spdu) {
     unsigned char hash[SHA256_DIGEST_LENGTH];
     sha256sum(&spdu.data.signedData.tbsData, sizeof(spdu.data.signedData.tbsData), hash);
 
-    unsigned int signature_buffer_length = ECDSA_size(private_ec_key);
-    auto signature = (unsigned char*) OPENSSL_malloc(signature_buffer_length);
-    ecdsa_sign(hash, private_ec_key, &signature_buffer_length, signature);
+    // the SPDU has room for the largest DER-encoded P-256 signature, so sign straight into it
+    unsigned int signature_buffer_length = sizeof(spdu.signature);
+    ecdsa_sign(hash, private_ec_key, &signature_buffer_length, spdu.signature);
 
     spdu.signature_buffer_length = signature_buffer_length;
 
-    for(int i = 0; i < signature_buffer_length; i++) {
-        spdu.signature[i] = signature[i];
-    }
-
 }
 
-bool Vehicle::verify_message_ecdsa(Vehicle::ecdsa_spdu &spdu, std::chrono::time_point<std::chrono::system_clock, std::chrono::microseconds> received_time, int vehicle_id) {
+uint8_t Vehicle::verify_message_ecdsa(Vehicle::ecdsa_spdu &spdu, std::chrono::time_point<std::chrono::system_clock, std::chrono::microseconds> received_time, int vehicle_id) {
+
+    KeyStore::key_pointer verification_key = verification_keys->get(vehicle_id, false);
+    KeyStore::key_pointer certificate_verification_key = verification_keys->get(vehicle_id, true);
 
-    EC_KEY *verification_private_ec_key = nullptr, *verification_cert_private_ec_key = nullptr;
+    // a vehicle without keys cannot produce a valid SPDU
+    if(!verification_key || !certificate_verification_key)
+        return 0;
 
-    load_key(vehicle_id, false, verification_private_ec_key);
-    load_key(vehicle_id, true, verification_cert_private_ec_key);
+    if(!signature_lengths_valid(spdu))
+        return 0;
 
     // Verify certificate signature
-    unsigned char certificate_hash[SHA256_DIGEST_LENGTH];
-    sha256sum(&spdu.data.signedData.cert, sizeof(spdu.data.signedData.cert), certificate_hash);
-    bool cert_result = ecdsa_verify(certificate_hash, spdu.data.certificate_signature, &spdu.certificate_signature_buffer_length, verification_cert_private_ec_key);
+    bool cert_result = verify_certificate_ecdsa(spdu, certificate_verification_key.get());
 
     // Verify message signature
     unsigned char hash[SHA256_DIGEST_LENGTH];
     sha256sum(&spdu.data.signedData.tbsData, sizeof(spdu.data.signedData.tbsData), hash);
-    bool sig_result = ecdsa_verify(hash, spdu.signature, &spdu.signature_buffer_length, verification_private_ec_key);
+    bool sig_result = ecdsa_verify(hash, spdu.signature, &spdu.signature_buffer_length, verification_key.get());
 
-    // Verify time constraint: message is valid if less than 30 seconds (30000ms) have elapsed since transmission
-    std::chrono::duration<double, std::milli> elapsed_time =  received_time -  spdu.data.signedData.tbsData.headerInfo.timestamp;
-    bool recent = elapsed_time.count() < 30000;
+    // Verify time constraint
+    bool recent = is_recent(spdu, received_time);
 
     // Return result
-    return cert_result && sig_result && recent;
+    return outcome_of(cert_result, sig_result, recent);
+}
+
+// the RESULT_* bits of a verification
+uint8_t Vehicle::outcome_of(bool certificate_valid, bool signature_valid, bool recent) {
+    uint8_t outcome = 0;
+    if(certificate_valid)
+        outcome |= RESULT_CERTIFICATE_VALID;
+    if(signature_valid)
+        outcome |= RESULT_SIGNATURE_VALID;
+    if(recent)
+        outcome |= RESULT_RECENT;
+    if(certificate_valid && signature_valid && recent)
+        outcome |= RESULT_VALID;
+    return outcome;
+}
+
+/*
+ * Vehicles send the same certificate in every SPDU, so a certificate is only verified with ECDSA the first time it is
+ * seen. Later SPDUs carrying the same certificate, signature and signer key are accepted from the cache.
+ */
+bool Vehicle::verify_certificate_ecdsa(Vehicle::ecdsa_spdu &spdu, EC_KEY *certificate_verification_key) {
+
+    unsigned char certificate_hash[SHA256_DIGEST_LENGTH];
+    CertificateCache::digest certificate_digest;
+    hash_certificate(spdu, certificate_verification_key, certificate_hash, certificate_digest);
+
+    if(verified_certificates->contains(certificate_digest))
+        return true;
+
+    bool cert_result = ecdsa_verify(certificate_hash, spdu.data.certificate_signature,
+                                    &spdu.certificate_signature_buffer_length, certificate_verification_key);
+    if(cert_result)
+        verified_certificates->insert(certificate_digest);
+
+    return cert_result;
+}
+
+// computes the hash the certificate is signed over and the digest identifying it in the certificate cache
+void Vehicle::hash_certificate(Vehicle::ecdsa_spdu &spdu, EC_KEY *certificate_verification_key,
+                               unsigned char *certificate_hash, CertificateCache::digest &certificate_digest) {
+
+    sha256sum(&spdu.data.signedData.cert, sizeof(spdu.data.signedData.cert), certificate_hash);
+
+    // cache key: digest over the certificate hash, the certificate signature and the signer's public key
+    unsigned char cache_input[SHA256_DIGEST_LENGTH + sizeof(spdu.data.certificate_signature) + 65];
+    size_t cache_input_length = 0;
+    memcpy(cache_input, certificate_hash, SHA256_DIGEST_LENGTH);
+    cache_input_length += SHA256_DIGEST_LENGTH;
+    memcpy(cache_input + cache_input_length, spdu.data.certificate_signature, spdu.certificate_signature_buffer_length);
+    cache_input_length += spdu.certificate_signature_buffer_length;
+    cache_input_length += EC_POINT_point2oct(EC_KEY_get0_group(certificate_verification_key),
+                                             EC_KEY_get0_public_key(certificate_verification_key),
+                                             POINT_CONVERSION_UNCOMPRESSED, cache_input + cache_input_length,
+                                             sizeof(cache_input) - cache_input_length, nullptr);
+
+    sha256sum(cache_input, cache_input_length, certificate_digest.data());
+}
+
+// signature lengths come off the wire and must fit their buffers
+bool Vehicle::signature_lengths_valid(Vehicle::ecdsa_spdu &spdu) {
+    return spdu.certificate_signature_buffer_length <= sizeof(spdu.data.certificate_signature) &&
+           spdu.signature_buffer_length <= sizeof(spdu.signature);
+}
+
+Vehicle::timestamp Vehicle::now() {
+    return std::chrono::time_point_cast<std::chrono::microseconds>(std::chrono::system_clock::now());
+}
+
+// a message is valid if less than 30 seconds (30000ms) have elapsed since transmission
+bool Vehicle::is_recent(Vehicle::ecdsa_spdu &spdu, timestamp received_time) {
+    std::chrono::duration<double, std::milli> elapsed_time =  received_time -  spdu.data.signedData.tbsData.headerInfo.timestamp;
+    return elapsed_time.count() < 30000;
 }
 
 void Vehicle::load_key(int number,  bool certificate, EC_KEY *&key_to_store){
@@ -315,22 +614,5 @@ void Vehicle::load_key(int number,  bool certificate, EC_KEY *&key_to_store){
 }
 
 void Vehicle::load_trace(int number) {
-    std::string line;
-    std::string word;
-
-    std::fstream file("../trace_files/" + std::to_string(number) + ".csv", std::ios::in);
-    if(file.is_open()) {
-        while(getline(file, line)) {
-            timestep_data.clear();
-            std::stringstream str(line);
-            while(getline(str, word, ',')) {
-                timestep_data.push_back(std::stof(word));
-            }
-            timestep.push_back(timestep_data);
-        }
-    }
-    else {
-        perror(("Error opening trace file for vehicle " + std::to_string(number)).c_str());
-        exit(EXIT_FAILURE);
-    }
+    trace = Trace::load(number);
 }
@@ -2,11 +2,14 @@
 // Reuse permitted under the MIT License as specified in the LICENSE file within this project.
 
 #include <iostream>
+#include <memory>
 #include <thread>
 #include <boost/property_tree/ptree.hpp>
 #include <boost/property_tree/json_parser.hpp>
 
 #include "Vehicle.h"
+#include "SigningPool.h"
+#include "TransmitScheduler.h"
 #include "arguments.h"
 
 
@@ -44,21 +47,14 @@ int main(int argc, char *argv[]) {
         exit(EXIT_FAILURE);
     }
 
-    if(argc == 4) {
-        if (std::string(argv[3]) == "--test")
+    // optional flags, in either order
+    for(int i = 3; i < argc; i++) {
+        if(std::string(argv[i]) == "--test")
             args.test = true;
-        else {
-            std::cout << R"(Error: optional third argument can only be "--test")" << std::endl;
-            print_usage();
-            exit(EXIT_FAILURE);
-        }
-    }
-
-    if(argc == 5) {
-        if(std::string(argv[4]) == "--gui")
+        else if(std::string(argv[i]) == "--gui")
             args.gui = true;
-        else{
-            std::cout << R"(Error: optional fourth argument must be "--gui")" << std::endl;
+        else {
+            std::cout << R"(Error: optional arguments can only be "--test" and "--gui")" << std::endl;
             print_usage();
             exit(EXIT_FAILURE);
         }
@@ -67,8 +63,47 @@ int main(int argc, char *argv[]) {
     boost::property_tree::ptree tree;
     boost::property_tree::json_parser::read_json("../config.json",tree);
 
-    auto num_vehicles = tree.get<uint8_t>("scenario.numVehicles");
+    auto num_vehicles = tree.get<int>("scenario.numVehicles");
     auto num_msgs = tree.get<uint16_t>("scenario.numMessages");
+    auto update_interval_ms = tree.get<int>("scenario.updateIntervalMs", 100);
+
+    receiver_options receiver_opts;
+    receiver_opts.gui_records_per_datagram = tree.get<int>("gui.recordsPerDatagram",
+                                                           receiver_opts.gui_records_per_datagram);
+    receiver_opts.gui_max_datagram_delay_ms = tree.get<int>("gui.maxDatagramDelayMs",
+                                                            receiver_opts.gui_max_datagram_delay_ms);
+    receiver_opts.verification_workers = tree.get<int>("receiver.verificationWorkers",
+                                                       receiver_opts.verification_workers);
+    receiver_opts.ordered_results = tree.get<bool>("receiver.orderedResults", receiver_opts.ordered_results);
+    receiver_opts.queue_capacity = tree.get<int>("receiver.queueCapacity", receiver_opts.queue_capacity);
+    receiver_opts.stats_interval_seconds = tree.get<int>("receiver.statsIntervalSeconds",
+                                                         receiver_opts.stats_interval_seconds);
+    receiver_opts.batch_verification = tree.get<bool>("receiver.batchVerification", receiver_opts.batch_verification);
+    receiver_opts.batch_size = tree.get<int>("receiver.batchSize", receiver_opts.batch_size);
+    receiver_opts.batch_window_ms = tree.get<int>("receiver.batchWindowMs", receiver_opts.batch_window_ms);
+    receiver_opts.key_bundle = tree.get<std::string>("receiver.keyBundle", receiver_opts.key_bundle);
+    receiver_opts.log_level = tree.get<std::string>("logging.level", receiver_opts.log_level);
+    receiver_opts.results_log = tree.get<std::string>("logging.resultsLog", receiver_opts.results_log);
+    receiver_opts.results_format = tree.get<std::string>("logging.resultsFormat", receiver_opts.results_format);
+    receiver_opts.log_capacity = tree.get<int>("logging.capacity", receiver_opts.log_capacity);
+
+    transmitter_options transmitter_opts;
+    transmitter_opts.interval_ms = update_interval_ms;
+    transmitter_opts.scheduler = tree.get<bool>("transmitter.scheduler", transmitter_opts.scheduler);
+    transmitter_opts.event_loops = tree.get<int>("transmitter.eventLoops", transmitter_opts.event_loops);
+    transmitter_opts.jitter_ms = tree.get<int>("transmitter.jitterMs", transmitter_opts.jitter_ms);
+    transmitter_opts.stats_interval_seconds = tree.get<int>("transmitter.statsIntervalSeconds",
+                                                            transmitter_opts.stats_interval_seconds);
+    for(auto &vehicle_interval : tree.get_child("transmitter.vehicleIntervalsMs", boost::property_tree::ptree()))
+        transmitter_opts.vehicle_interval_ms[std::stoi(vehicle_interval.first)] =
+                vehicle_interval.second.get_value<int>();
+    transmitter_opts.batched_egress = tree.get<bool>("transmitter.batchedEgress", transmitter_opts.batched_egress);
+    transmitter_opts.senders = tree.get<int>("transmitter.senders", transmitter_opts.senders);
+    transmitter_opts.send_batch_size = tree.get<int>("transmitter.sendBatchSize", transmitter_opts.send_batch_size);
+    transmitter_opts.send_queue_capacity = tree.get<int>("transmitter.sendQueueCapacity",
+                                                         transmitter_opts.send_queue_capacity);
+    transmitter_opts.signer_workers = tree.get<int>("transmitter.signerWorkers", transmitter_opts.signer_workers);
+    transmitter_opts.sign_ahead_steps = tree.get<int>("transmitter.signAheadSteps", transmitter_opts.sign_ahead_steps);
 
     if(args.sim_mode == TRANSMITTER) {
         std::vector<Vehicle> vehicles;
@@ -79,20 +114,45 @@ int main(int argc, char *argv[]) {
             vehicles.emplace_back(Vehicle(i));
         }
 
-        // start a thread for each vehicle
-        for(int i = 0; i < num_vehicles; i++) {
-            workers.emplace_back(std::thread(vehicles.at(i).transmit_static, &vehicles.at(i), num_msgs, args.test));
+        // optionally, vehicles only sign their SPDUs and a few sender threads send them in batches
+        std::unique_ptr<BatchSender> sender;
+        if(transmitter_opts.batched_egress)
+            sender.reset(new BatchSender(Vehicle::transmit_address(args.test), transmitter_opts.senders,
+                                         transmitter_opts.send_batch_size, transmitter_opts.send_queue_capacity));
+
+        // optionally, a pool of signers prepares SPDUs ahead of time, which needs the scheduler's deadlines
+        std::unique_ptr<SigningPool> signer;
+        if(transmitter_opts.signer_workers > 0)
+            signer.reset(new SigningPool(transmitter_opts.signer_workers,
+                                         num_vehicles * std::max(transmitter_opts.sign_ahead_steps, 1)));
+
+        if(transmitter_opts.scheduler || signer) {
+            // a few event loops drive all vehicles
+            TransmitScheduler scheduler(vehicles, num_msgs, args.test, transmitter_opts, sender.get(), signer.get());
+            scheduler.run();
+        }
+        else {
+            // start a thread for each vehicle
+            for(int i = 0; i < num_vehicles; i++) {
+                workers.emplace_back(std::thread(vehicles.at(i).transmit_static, &vehicles.at(i), num_msgs, args.test,
+                                                 update_interval_ms, sender.get()));
+            }
+
+            // wait for each vehicle thread to finish
+            for(int i = 0; i < num_vehicles; i++) {
+                workers.at(i).join();
+            }
         }
 
-        // wait for each vehicle thread to finish
-        for(int i = 0; i < num_vehicles; i++) {
-            workers.at(i).join();
+        if(sender) {
+            sender->close();
+            std::cerr << "[egress] " << sender->summary() << std::endl;
         }
 
     }
     else if (args.sim_mode == RECEIVER) {
         Vehicle v1(0);
-        v1.receive(num_msgs * num_vehicles, args.test, args.gui);
+        v1.receive(num_msgs * num_vehicles, args.test, args.gui, receiver_opts);
     }
 
 
@@ -0,0 +1,339 @@
+#  Copyright (c) 2022. Geoff Twardokus
+#  Reuse permitted under the MIT License as specified in the LICENSE file within this project.
+
+"""Tools for V2Verifier vehicle traces
+
+Traces are stored either as CSV (one row per timestep: x, y, elevation, ...) or in the binary format read by
+include/Trace.h: a 24-byte header (magic "V2VT", format version, flags, vehicle ID, row count, column count, data
+offset) followed by every column as row_count little-endian float32 values. The binary format is loaded by mapping
+it into memory, without any parsing.
+
+    python3 trace_tool.py convert trace_files/*.csv
+
+"compile" additionally precomputes every timestep's speed and heading (optionally smoothed) so the transmitter
+only has to look them up. Compiled traces have exactly the columns x, y, elevation, speed, heading and the
+FLAG_MOTION_COLUMNS flag; "check" compares the derived columns with a direct port of the formulas in src/bsm.cpp,
+smoothed with the same window for smoothed traces.
+
+    python3 trace_tool.py compile trace_files/*.csv [--smooth 5]
+    python3 trace_tool.py check trace_files/*.bin [--smooth 5]
+"""
+
+import argparse
+import math
+import os
+import struct
+
+import numpy as np
+
+
+MAGIC = b"V2VT"
+VERSION = 1
+
+HEADER = struct.Struct("<4sHHIIII")
+
+# header flags (TRACE_FLAG_* in include/Trace.h)
+FLAG_MOTION_COLUMNS = 0x1   # columns 3 and 4 are the precomputed speed (km/h) and heading (degrees)
+FLAG_SMOOTHED = 0x2         # speed and heading were smoothed, so they no longer match the formulas exactly
+
+SPEED_COLUMN = 3
+HEADING_COLUMN = 4
+
+# the transmitter sends one BSM per trace row every 100 ms
+TIMESTEP_MSEC = 100
+
+
+class TraceFormatError(ValueError):
+    """Raised when a file is not a binary trace this module can read
+    """
+
+
+def read_csv(path: str) -> np.ndarray:
+    """Read a CSV trace
+
+    :param path: path to the CSV file
+    :type path: str
+    :return: the trace as a (rows, columns) float32 array
+    :rtype: np.ndarray
+    """
+    return np.loadtxt(path, delimiter=",", dtype=np.float32, ndmin=2)
+
+
+def write_binary(path: str, vehicle_id: int, trace: np.ndarray, flags: int = 0) -> None:
+    """Write a trace in the binary format
+
+    :param path: path of the binary trace to write
+    :type path: str
+    :param vehicle_id: the ID of the vehicle the trace belongs to
+    :type vehicle_id: int
+    :param trace: a (rows, columns) array; columns 0-2 must be x, y and elevation
+    :type trace: np.ndarray
+    :param flags: format flags stored in the header, defaults to 0
+    :type flags: int
+    """
+    trace = np.asarray(trace, dtype="<f4")
+    if trace.ndim != 2 or trace.shape[1] < 3:
+        raise TraceFormatError("a trace needs at least x, y and elevation columns")
+
+    rows, columns = trace.shape
+    with open(path, "wb") as trace_file:
+        trace_file.write(HEADER.pack(MAGIC, VERSION, flags, vehicle_id, rows, columns, HEADER.size))
+        # column-major: every column is contiguous
+        trace_file.write(np.ascontiguousarray(trace.T).tobytes())
+
+
+def read_binary(path: str) -> tuple:
+    """Memory-map a binary trace
+
+    :param path: path to the binary trace
+    :type path: str
+    :raises TraceFormatError: if the file is not a compatible binary trace
+    :return: the vehicle ID, the header flags and a read-only (rows, columns) float32 view of the trace
+    :rtype: tuple
+    """
+    with open(path, "rb") as trace_file:
+        header = trace_file.read(HEADER.size)
+        trace_file.seek(0, os.SEEK_END)
+        size = trace_file.tell()
+
+    if len(header) < HEADER.size:
+        raise TraceFormatError(f"{path} is too short to be a binary trace")
+
+    magic, version, flags, vehicle_id, rows, columns, data_offset = HEADER.unpack(header)
+    if magic != MAGIC:
+        raise TraceFormatError(f"{path} is not a binary trace")
+    if version != VERSION:
+        raise TraceFormatError(f"unsupported trace format version {version}")
+    if data_offset + rows * columns * 4 > size:
+        raise TraceFormatError(f"{path} is truncated")
+
+    values = np.memmap(path, dtype="<f4", mode="r", offset=data_offset, shape=(columns, rows))
+    return vehicle_id, flags, values.T
+
+
+def binary_path(csv_path: str) -> str:
+    """The binary trace path next to a CSV trace (trace_files/3.csv -> trace_files/3.bin)
+
+    :param csv_path: path to the CSV trace
+    :type csv_path: str
+    :return: the binary trace path
+    :rtype: str
+    """
+    return os.path.splitext(csv_path)[0] + ".bin"
+
+
+def vehicle_id_from_path(path: str) -> int:
+    """The vehicle ID a trace file belongs to, taken from its name (trace_files/<id>.csv)
+
+    :param path: path to the trace
+    :type path: str
+    :return: the vehicle ID
+    :rtype: int
+    """
+    return int(os.path.splitext(os.path.basename(path))[0])
+
+
+def motion_columns(x: np.ndarray, y: np.ndarray, time_msec: float = TIMESTEP_MSEC) -> tuple:
+    """Vectorized calculate_speed_kph and calculate_heading (src/bsm.cpp) over consecutive rows of a trace
+
+    The arithmetic follows the C++ types: differences are taken in float32, the distance in double, and the heading
+    in float32 before it is converted to degrees. The first row has speed and heading 0, as in Vehicle::generate_bsm.
+
+    :param x: x positions in meters
+    :type x: np.ndarray
+    :param y: y positions in meters
+    :type y: np.ndarray
+    :param time_msec: the time between rows in milliseconds, defaults to TIMESTEP_MSEC
+    :type time_msec: float
+    :return: speed in km/h and heading in degrees, as float32 arrays
+    :rtype: tuple
+    """
+    x = np.asarray(x, dtype=np.float32)
+    y = np.asarray(y, dtype=np.float32)
+
+    dx = np.diff(x)
+    dy = np.diff(y)
+    distance_km = np.sqrt(dx.astype(np.float64) ** 2 + dy.astype(np.float64) ** 2) / 1000
+    time_hours = float(np.float32(time_msec) / np.float32(60 * 60 * 1000))
+
+    speed = np.zeros(len(x), dtype=np.float32)
+    heading = np.zeros(len(x), dtype=np.float32)
+    speed[1:] = distance_km / time_hours
+    heading[1:] = np.arctan2(dy, dx).astype(np.float64) * 180 / math.pi
+    return speed, heading
+
+
+def smooth(speed: np.ndarray, heading: np.ndarray, window: int) -> tuple:
+    """Centered moving average of speed and heading; headings are averaged as unit vectors so they wrap correctly
+
+    :param speed: speed in km/h
+    :type speed: np.ndarray
+    :param heading: heading in degrees
+    :type heading: np.ndarray
+    :param window: the number of rows averaged (an odd number works best)
+    :type window: int
+    :return: the smoothed speed and heading, as float32 arrays
+    :rtype: tuple
+    """
+    kernel = np.ones(window)
+    counts = np.convolve(np.ones(len(speed)), kernel, mode="same")
+
+    def average(values):
+        return np.convolve(values, kernel, mode="same") / counts
+
+    radians = np.radians(heading.astype(np.float64))
+    smoothed_heading = np.degrees(np.arctan2(average(np.sin(radians)), average(np.cos(radians))))
+    return average(speed.astype(np.float64)).astype(np.float32), smoothed_heading.astype(np.float32)
+
+
+def compile_trace(trace: np.ndarray, smoothing_window: int = 0, time_msec: float = TIMESTEP_MSEC) -> tuple:
+    """Build a compiled trace: x, y, elevation and the precomputed speed and heading
+
+    :param trace: a (rows, columns) trace with at least x, y and elevation columns
+    :type trace: np.ndarray
+    :param smoothing_window: rows averaged when smoothing speed and heading, defaults to 0 (no smoothing)
+    :type smoothing_window: int
+    :param time_msec: the time between rows in milliseconds, defaults to TIMESTEP_MSEC
+    :type time_msec: float
+    :return: the compiled (rows, 5) float32 trace and its header flags
+    :rtype: tuple
+    """
+    trace = np.asarray(trace, dtype=np.float32)
+    speed, heading = motion_columns(trace[:, 0], trace[:, 1], time_msec)
+
+    flags = FLAG_MOTION_COLUMNS
+    if smoothing_window > 1:
+        speed, heading = smooth(speed, heading, smoothing_window)
+        flags |= FLAG_SMOOTHED
+
+    return np.column_stack((trace[:, :3], speed, heading)), flags
+
+
+def check_trace(trace: np.ndarray, flags: int, speed_tolerance: float = 1e-3, heading_tolerance: float = 1e-3,
+                time_msec: float = TIMESTEP_MSEC, smoothing_window: int = 0) -> list:
+    """Compare a compiled trace's speed and heading with a row-by-row port of the C++ formulas
+
+    For smoothed traces the port's results are smoothed with the window the trace was compiled with, which the header
+    does not record; without it, smoothed traces cannot be checked and are reported as such.
+
+    :param trace: a compiled (rows, 5) trace
+    :type trace: np.ndarray
+    :param flags: the trace's header flags
+    :type flags: int
+    :param speed_tolerance: the largest accepted speed difference in km/h, defaults to 1e-3
+    :type speed_tolerance: float
+    :param heading_tolerance: the largest accepted heading difference in degrees, defaults to 1e-3
+    :type heading_tolerance: float
+    :param time_msec: the time between rows in milliseconds, defaults to TIMESTEP_MSEC
+    :type time_msec: float
+    :param smoothing_window: rows averaged when the trace was compiled, defaults to 0; ignored for traces that are not
+        smoothed
+    :type smoothing_window: int
+    :return: descriptions of the rows that differ (empty if the trace is correct)
+    :rtype: list
+    """
+    if not flags & FLAG_MOTION_COLUMNS:
+        return ["trace has no precomputed speed and heading columns"]
+    if flags & FLAG_SMOOTHED and smoothing_window <= 1:
+        return ["speed and heading are smoothed and cannot be checked without the smoothing window"]
+
+    expected_speed = np.zeros(len(trace), dtype=np.float32)
+    expected_heading = np.zeros(len(trace), dtype=np.float32)
+    f32 = np.float32
+    for row in range(1, len(trace)):
+        x1, x2, y1, y2 = f32(trace[row - 1, 0]), f32(trace[row, 0]), f32(trace[row - 1, 1]), f32(trace[row, 1])
+        # calculate_speed_kph
+        distance_km = math.sqrt(float(x2 - x1) ** 2 + float(y2 - y1) ** 2) / 1000
+        time_hours = float(f32(time_msec) / f32(60 * 60 * 1000))
+        expected_speed[row] = f32(distance_km / time_hours)
+        # calculate_heading
+        expected_heading[row] = f32(math.atan2(float(y2 - y1), float(x2 - x1)) * 180 / math.pi)
+
+    if flags & FLAG_SMOOTHED:
+        expected_speed, expected_heading = smooth(expected_speed, expected_heading, smoothing_window)
+
+    errors = []
+    for row in range(len(trace)):
+        speed, heading = float(trace[row, SPEED_COLUMN]), float(trace[row, HEADING_COLUMN])
+        speed_error = abs(speed - float(expected_speed[row]))
+        # smoothed headings near due west may come out as -180 or 180
+        heading_error = abs((heading - float(expected_heading[row]) + 180) % 360 - 180)
+        if speed_error > speed_tolerance or heading_error > heading_tolerance:
+            errors.append(f"row {row}: speed {speed} (expected {float(expected_speed[row])}), "
+                          f"heading {heading} (expected {float(expected_heading[row])})")
+    return errors
+
+
+def read_any(path: str) -> tuple:
+    """Read a CSV or binary trace
+
+    :param path: path to the trace (.csv or binary)
+    :type path: str
+    :return: the vehicle ID, header flags (0 for CSV) and a (rows, columns) array
+    :rtype: tuple
+    """
+    if path.endswith(".csv"):
+        return vehicle_id_from_path(path), 0, read_csv(path)
+    return read_binary(path)
+
+
+def convert(csv_paths: list) -> None:
+    """Convert CSV traces to binary traces next to them
+
+    :param csv_paths: paths to CSV traces named <vehicle id>.csv
+    :type csv_paths: list
+    """
+    for csv_path in csv_paths:
+        trace = read_csv(csv_path)
+        write_binary(binary_path(csv_path), vehicle_id_from_path(csv_path), trace)
+        print(f"{csv_path} -> {binary_path(csv_path)}: {trace.shape[0]} rows, {trace.shape[1]} columns")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert and inspect V2Verifier vehicle traces")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    convert_command = commands.add_parser("convert", help="convert CSV traces to the binary trace format")
+    convert_command.add_argument("paths", nargs="+", help="CSV traces named <vehicle id>.csv")
+
+    compile_command = commands.add_parser("compile", help="write binary traces with precomputed speed and heading")
+    compile_command.add_argument("paths", nargs="+", help="CSV or binary traces")
+    compile_command.add_argument("--smooth", type=int, default=0, help="rows averaged to smooth speed and heading")
+
+    check_command = commands.add_parser("check", help="verify the speed and heading of compiled traces")
+    check_command.add_argument("paths", nargs="+", help="compiled binary traces")
+    check_command.add_argument("--interval-ms", type=float, default=TIMESTEP_MSEC,
+                               help="milliseconds between rows the traces were compiled for")
+    check_command.add_argument("--smooth", type=int, default=0,
+                               help="rows averaged when the traces were compiled (required for smoothed traces)")
+
+    info_command = commands.add_parser("info", help="describe binary traces")
+    info_command.add_argument("paths", nargs="+", help="binary traces")
+
+    args = parser.parse_args()
+
+    if args.command == "convert":
+        convert(args.paths)
+    elif args.command == "compile":
+        for path in args.paths:
+            vehicle_id, _, trace = read_any(path)
+            compiled, flags = compile_trace(trace, args.smooth)
+            # read_binary maps the input, so write to a temporary file and replace it afterwards
+            output = binary_path(path)
+            write_binary(output + ".tmp", vehicle_id, compiled, flags)
+            os.replace(output + ".tmp", output)
+            print(f"{path} -> {output}: {len(compiled)} rows, flags {flags:#x}")
+    elif args.command == "check":
+        failed = False
+        for path in args.paths:
+            vehicle_id, flags, trace = read_binary(path)
+            errors = check_trace(trace, flags, time_msec=args.interval_ms, smoothing_window=args.smooth)
+            print(f"{path}: {'OK' if not errors else str(len(errors)) + ' errors'}")
+            for error in errors[:10]:
+                print("    " + error)
+            failed = failed or bool(errors)
+        raise SystemExit(1 if failed else 0)
+    elif args.command == "info":
+        for path in args.paths:
+            vehicle_id, flags, trace = read_binary(path)
+            print(f"{path}: vehicle {vehicle_id}, {trace.shape[0]} rows, {trace.shape[1]} columns, flags {flags:#x}")